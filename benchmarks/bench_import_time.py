@@ -0,0 +1,64 @@
+""" Benchmark of the time taken by `import pond` in a fresh interpreter.
+
+Short-lived jobs pay the import time at each start. The benchmark reports the median wall time
+of `import pond` over several interpreters, and the heavy libraries it imported. With
+`--max-seconds`, it exits with an error if the median exceeds the limit, to guard against
+regressions in CI.
+
+Usage:
+
+    python benchmarks/bench_import_time.py --runs 10 --max-seconds 0.5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Root of the repository, where `pond` can be imported from
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Libraries that are only needed by some artifacts
+HEAVY_MODULES = ('numpy', 'pandas', 'pyarrow', 'PIL', 'matplotlib')
+
+IMPORT_CODE = f"""
+import sys
+import time
+start = time.perf_counter()
+import pond
+elapsed = time.perf_counter() - start
+heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(elapsed, ','.join(heavy))
+"""
+
+
+def time_import():
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_CODE],
+        check=True, capture_output=True, text=True, cwd=ROOT_DIR,
+    ).stdout.split()
+    elapsed = float(output[0])
+    heavy = output[1].split(',') if len(output) > 1 else []
+    return elapsed, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='Exit with an error if the median import time exceeds this limit')
+    args = parser.parse_args()
+
+    # The first import compiles the bytecode, it is not timed
+    time_import()
+    results = [time_import() for _ in range(args.runs)]
+    median = statistics.median(elapsed for elapsed, _ in results)
+    heavy = results[-1][1]
+    print(f'runs: {args.runs}, median: {median * 1000:.1f}ms, '
+          f'min: {min(elapsed for elapsed, _ in results) * 1000:.1f}ms, '
+          f'heavy modules imported: {", ".join(heavy) or "none"}')
+    if args.max_seconds is not None and median > args.max_seconds:
+        sys.exit(f'Import time {median:.3f}s exceeds the limit of {args.max_seconds:.3f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+""" Benchmark of the parsing throughput of version manifests, in each format.
+
+Jobs scanning the metadata of many versions spend most of their time parsing manifests. The
+benchmark parses the same typical manifest many times with the pure-Python YAML loader, the
+YAML loader used by `pond` (in C, if the LibYAML bindings are available), and as JSON, and
+reports the number of manifests parsed per second.
+
+Usage:
+
+    python benchmarks/bench_manifest_parsing.py --manifests 100000
+"""
+import argparse
+import datetime
+import json
+import time
+
+import yaml
+
+from pond.metadata.manifest import Manifest
+from pond.yaml import NoDatesSafeLoader, yaml_dump, yaml_load
+
+
+def typical_manifest():
+    """ Manifest of a version, as written by `Activity.write`. """
+    manifest = Manifest.from_nested_dict({
+        'version': {
+            'uri': 'pond://datastore/project/table/v123',
+            'filename': 'table_v123.parquet.zst',
+            'codec': 'zstd',
+            'date_time': datetime.datetime(2021, 2, 3, 4, 5, 6, 7),
+            'artifact_name': 'table',
+            'content_hash': 'sha256:' + '0123456789abcdef' * 4,
+        },
+        'user': {f'metric_{i}': i / 7 for i in range(10)},
+        'activity': {
+            'source': 'notebooks/train.ipynb',
+            'author': 'jdoe',
+            'inputs': ['pond://datastore/project/features/v12'],
+        },
+        'git': {
+            'sha': 'f' * 40,
+            'branch': 'main',
+            'remote': 'git@github.com:org/project.git',
+        },
+    })
+    return manifest.collect()
+
+
+def throughput(parse, source, n_manifests):
+    start = time.perf_counter()
+    for _ in range(n_manifests):
+        parse(source)
+    return n_manifests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--manifests', type=int, default=100_000)
+    args = parser.parse_args()
+
+    manifest = typical_manifest()
+    yaml_source = yaml_dump(manifest)
+    json_source = json.dumps(manifest, separators=(',', ':'))
+    parsers = [
+        ('yaml (pure Python)', lambda s: yaml.load(s, Loader=NoDatesSafeLoader), yaml_source),
+        ('yaml (pond)', yaml_load, yaml_source),
+        ('json', json.loads, json_source),
+    ]
+    for name, parse, source in parsers:
+        assert parse(source) == manifest
+        rate = throughput(parse, source, args.manifests)
+        print(f'{name:20} manifests: {args.manifests}, manifests/s: {rate:.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+""" Stress benchmark for the allocation of new version names under contention.
+
+Several processes write new versions of the same artifact concurrently, each allocating a new
+version name. The benchmark reports the number of allocations per second, and checks that no
+version name was allocated twice.
+
+Usage:
+
+    python benchmarks/bench_version_allocation.py --processes 32 --allocations 100
+"""
+import argparse
+from multiprocessing import Pool
+import tempfile
+import time
+
+from pond.artifact.dict_artifact import DictArtifact
+from pond.metadata.manifest import Manifest
+from pond.storage.file_datastore import FileDatastore
+from pond.version_name import SimpleVersionName
+from pond.versioned_artifact import VersionedArtifact
+
+
+def write_versions(base_path, n_allocations):
+    datastore = FileDatastore(id='bench', base_path=base_path)
+    versioned_artifact = VersionedArtifact(
+        artifact_name='artifact',
+        location='bench',
+        datastore=datastore,
+        artifact_class=DictArtifact,
+        version_name_class=SimpleVersionName,
+    )
+    manifest = Manifest()
+    names = []
+    for i in range(n_allocations):
+        version = versioned_artifact.write(data={'i': i}, manifest=manifest)
+        names.append(str(version.version_name))
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=32)
+    parser.add_argument('--allocations', type=int, default=100,
+                        help='Number of allocations per process')
+    parser.add_argument('--base-path', default=None,
+                        help='Datastore path, e.g. on a network file system. Default: temp dir')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.base_path) as base_path:
+        # Create the versioned artifact before starting the workers
+        write_versions(base_path, 0)
+
+        start = time.perf_counter()
+        with Pool(args.processes) as pool:
+            results = pool.starmap(write_versions, [(base_path, args.allocations)] * args.processes)
+        elapsed = time.perf_counter() - start
+
+    names = [name for result in results for name in result]
+    n_duplicates = len(names) - len(set(names))
+    print(f'processes: {args.processes}, allocations: {len(names)}, '
+          f'elapsed: {elapsed:.3f}s, allocations/s: {len(names) / elapsed:.1f}, '
+          f'duplicates: {n_duplicates}')
+
+
+if __name__ == '__main__':
+    main()
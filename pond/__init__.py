@@ -1,3 +1,4 @@
 # Importing the artifact has the side effect of registering the Artifacts
 import pond.artifact
 from pond.activity import Activity
+from pond.async_activity import AsyncActivity
@@ -1,8 +1,12 @@
-from typing import Any, Dict, Optional, Set, Type, Union
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
 
 from pond.artifact import Artifact
 from pond.artifact.artifact_registry import ArtifactRegistry, global_artifact_registry
-from pond.conventions import DataType, WriteMode
+from pond.artifact_cache import ArtifactCache
+from pond.codecs import get_codec
+from pond.conventions import DataType, DedupMode, ManifestFormat, WriteMode, version_uri
+from pond.exceptions import BulkOperationFailed
 from pond.metadata.metadata_source import MetadataSource
 from pond.metadata.dict import DictMetadataSource
 from pond.metadata.manifest import Manifest
@@ -22,7 +26,10 @@ class Activity:
                  datastore: Datastore,
                  author: str='NA',
                  version_name_class: Type[VersionName] = SimpleVersionName,
-                 artifact_registry: ArtifactRegistry = global_artifact_registry):
+                 artifact_registry: ArtifactRegistry = global_artifact_registry,
+                 artifact_cache: Optional[ArtifactCache] = None,
+                 serialization_executor: Optional[Executor] = None,
+                 manifest_format: ManifestFormat = ManifestFormat.YAML):
         """ Read and write artifacts with lineage and metadata.
 
         Activity is the main user-facing interface for pond. Most of the usages of `pond` only
@@ -48,6 +55,18 @@ class Activity:
             Registry object mapping data types and file formats to an artifact class able to
             read/write them. The artifact classes distributed with `pond` register automatically
             to the default value,  `global_artifact_registry`.
+        artifact_cache: ArtifactCache, optional
+            In-memory cache of the versions read by the activity. If None (default), versions are
+            always read from the datastore. A cache can be shared by several activities.
+        serialization_executor: Executor, optional
+            Executor where the artifacts are serialized and deserialized, typically a
+            `ProcessPoolExecutor` to take CPU-heavy (de)serialization off the calling thread and
+            outside of the GIL. If None (default), artifacts are (de)serialized in the calling
+            thread, while reading or writing the data file.
+        manifest_format: ManifestFormat
+            File format of the manifests of the versions of the artifacts created by the
+            activity. `ManifestFormat.JSON` is faster to read than the default YAML, e.g. for
+            jobs scanning the metadata of many versions. Existing artifacts keep their format.
         """
         self.source = source
         self.location = location
@@ -55,6 +74,9 @@ class Activity:
         self.author = author
         self.version_name_class = version_name_class
         self.artifact_registry = artifact_registry
+        self.artifact_cache = artifact_cache
+        self.serialization_executor = serialization_executor
+        self.manifest_format = manifest_format
 
         # History of all read versions, will be used as default
         # "inputs" for written tables. Feel free to empty it whenever needed.
@@ -62,9 +84,15 @@ class Activity:
         # Dict[TableRef, List[Version]]: History of all written versions
         self.write_history: Set[str] = set()
 
+        # Versioned artifacts already loaded, by artifact name. Their artifact class and version
+        # name class are resolved once, and reading a version does not need to load them again.
+        self._versioned_artifacts: Dict[str, VersionedArtifact] = {}
+
     def read_version(self,
                      name: str,
-                     version_name: Optional[Union[str, VersionName]] = None) -> Version:
+                     version_name: Optional[Union[str, VersionName]] = None,
+                     lazy: bool = False,
+                     **kwargs) -> Version:
         """ Read a version, given its name and version name.
 
         If no version name is specified, the latest version is read.
@@ -76,6 +104,14 @@ class Activity:
         version_name: str or VersionName
             Version name, given as a string (more common) or as VersionName instance. If None,
             the latest version name for the given artifact is used.
+        lazy: bool
+            If True, only the manifest of the version is read, e.g. to inspect its metadata. The
+            artifact is read the first time that `Version.artifact` is accessed, and kept by the
+            version. A lazy version is not put in the artifact cache, but a version already
+            cached is returned as it is.
+        kwargs: dict
+            Additional parameters for the reader of the artifact, e.g. `columns` to read a
+            subset of the columns of a Parquet DataFrame artifact.
 
         Return
         ------
@@ -87,19 +123,15 @@ class Activity:
         `read_artifact` -- Read an Artifact object, including artifact data and metadata
         `read` -- Read the data in an artifact
         """
-        versioned_artifact = VersionedArtifact.from_datastore(
-            artifact_name=name,
-            location=self.location,
-            datastore=self.datastore,
-        )
-        version = versioned_artifact.read(version_name=version_name)
+        version = self._read_version(name, version_name, lazy=lazy, **kwargs)
         version_id = version.get_uri(self.location, self.datastore)
         self.read_history.add(version_id)
         return version
 
     def read_artifact(self,
                       name: str,
-                      version_name: Optional[Union[str, VersionName]] = None) -> Any:
+                      version_name: Optional[Union[str, VersionName]] = None,
+                      **kwargs) -> Any:
         """ Read an artifact given its name and version name.
 
         If no version name is specified, the latest version is read.
@@ -111,6 +143,9 @@ class Activity:
         version_name: str or VersionName
             Version name, given as a string (more common) or as VersionName instance. If None,
             the latest version name for the given artifact is used.
+        kwargs: dict
+            Additional parameters for the reader of the artifact, e.g. `columns` to read a
+            subset of the columns of a Parquet DataFrame artifact.
 
         Return
         ------
@@ -122,12 +157,13 @@ class Activity:
         `read` -- Read the data in an artifact
         `read_version` -- Read a Version object, including the artifact object and version manifest
         """
-        version = self.read_version(name, version_name)
+        version = self.read_version(name, version_name, **kwargs)
         return version.artifact
 
     def read(self,
              name: str,
-             version_name: Optional[Union[str, VersionName]] = None) -> Any:
+             version_name: Optional[Union[str, VersionName]] = None,
+             **kwargs) -> Any:
         """ Read some data given its name and version name.
 
         If no version name is specified, the latest version is read.
@@ -139,6 +175,9 @@ class Activity:
         version_name: str or VersionName
             Version name, given as a string (more common) or as VersionName instance. If None,
             the latest version name for the given artifact is used.
+        kwargs: dict
+            Additional parameters for the reader of the artifact, e.g. `columns` to read a
+            subset of the columns of a Parquet DataFrame artifact.
 
         Return
         ------
@@ -150,9 +189,96 @@ class Activity:
         `read_artifact` -- Read an Artifact object, including artifact data and metadata
         `read_version` -- Read a Version object, including the artifact object and version manifest
         """
-        artifact = self.read_artifact(name, version_name)
+        artifact = self.read_artifact(name, version_name, **kwargs)
         return artifact.data
 
+    def read_many_versions(self,
+                           names: Iterable[Union[str, Tuple[str, Union[str, VersionName]]]],
+                           max_workers: Optional[int] = None,
+                           lazy: bool = False) -> List[Version]:
+        """ Read many versions concurrently.
+
+        The versions are resolved and their artifacts read on a pool of threads, which is
+        efficient when reading from high-latency storage.
+
+        Parameters
+        ----------
+        names: Iterable of str or (str, str or VersionName)
+            Artifacts to read. Each item is either an artifact name, to read the latest version,
+            or a tuple (artifact name, version name).
+        max_workers: int, optional
+            Maximum number of threads. If None, the default of `ThreadPoolExecutor` is used.
+        lazy: bool
+            If True, only the manifests are read, see `read_version`.
+
+        Raises
+        ------
+        BulkOperationFailed
+            If some of the reads failed. The exception contains the versions that were
+            read successfully (`results`), and the errors by input index (`errors`).
+
+        Return
+        ------
+        versions: List[Version]
+            The loaded Version objects, in the same order as `names`.
+
+        See Also
+        --------
+        `read_many` -- Read the data in many artifacts
+        `read_version` -- Read a Version object, including the artifact object and version manifest
+        """
+        items = [(item, None) if isinstance(item, str) else tuple(item) for item in names]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._read_version, name, version_name, lazy=lazy)
+                       for name, version_name in items]
+
+        versions, errors = _collect_results(futures)
+        for version in versions:
+            if version is not None:
+                self.read_history.add(version.get_uri(self.location, self.datastore))
+
+        if errors:
+            raise BulkOperationFailed(results=versions, errors=errors)
+        return versions
+
+    def read_many(self,
+                  names: Iterable[Union[str, Tuple[str, Union[str, VersionName]]]],
+                  max_workers: Optional[int] = None) -> List[Any]:
+        """ Read the data in many artifacts concurrently.
+
+        Parameters
+        ----------
+        names: Iterable of str or (str, str or VersionName)
+            Artifacts to read. Each item is either an artifact name, to read the latest version,
+            or a tuple (artifact name, version name).
+        max_workers: int, optional
+            Maximum number of threads. If None, the default of `ThreadPoolExecutor` is used.
+
+        Raises
+        ------
+        BulkOperationFailed
+            If some of the reads failed. The exception contains the data that was read
+            successfully (`results`), and the errors by input index (`errors`).
+
+        Return
+        ------
+        data: List[Any]
+            The loaded data, in the same order as `names`. The metadata is discarded.
+
+        See Also
+        --------
+        `read_many_versions` -- Read many Version objects
+        `read` -- Read the data in an artifact
+        """
+        try:
+            versions = self.read_many_versions(names, max_workers=max_workers)
+        except BulkOperationFailed as error:
+            results = [None if version is None else version.artifact.data
+                       for version in error.results]
+            raise BulkOperationFailed(results=results, errors=error.errors) from error
+        return [version.artifact.data for version in versions]
+
     # TODO version name is a string vs is a VersionName instance
     def write(self,
               data: DataType,
@@ -161,9 +287,223 @@ class Activity:
               format: Optional[str] = None,
               version_name: Optional[Union[str, VersionName]] = None,
               metadata: Optional[Dict[str, str]] = None,
-              write_mode: WriteMode = WriteMode.ERROR_IF_EXISTS) -> Version:
+              write_mode: WriteMode = WriteMode.ERROR_IF_EXISTS,
+              codec: Optional[str] = None,
+              level: Optional[int] = None,
+              dedup: DedupMode = DedupMode.NONE,
+              chunked: bool = False) -> Version:
+        """ Write some data to storage, as a new version of an artifact.
+
+        Parameters
+        ----------
+        data: DataType
+            The data to write.
+        name: str
+            Artifact name.
+        artifact_class: Type[Artifact], optional
+            Artifact class used to write the data. If None, it is looked up in the artifact
+            registry, from the type of the data and `format`.
+        format: str, optional
+            File format, used to look up the artifact class.
+        version_name: str or VersionName, optional
+            Version name. If None, a new version name is created.
+        metadata: Dict[str, str], optional
+            User metadata, stored with the version.
+        write_mode: WriteMode
+            Write mode, either WriteMode.ERROR_IF_EXISTS or WriteMode.OVERWRITE.
+        codec: str, optional
+            Compression codec of the data file: 'none', 'zlib', 'zstd', or 'lz4' (see
+            `pond.codecs`). The codec is stored in the version manifest, and used when reading
+            the version. If None, the data file is not compressed.
+        level: int, optional
+            Compression level. If None, the default level of the codec is used.
+        dedup: DedupMode
+            What to do if the data is identical to the latest version: write it anyway
+            (DedupMode.NONE, the default), skip the write and return the latest version
+            (DedupMode.SKIP), or write a new version linking to the data of the latest version
+            (DedupMode.LINK).
+        chunked: bool
+            If True, the data is stored in content-defined chunks shared by all the versions of
+            the artifact, so that versions with small differences are mostly stored once. See
+            `collect_garbage`.
+
+        Return
+        ------
+        version: Version
+            The written version, or the latest version if the write has been skipped.
+        """
         # todo: write mode
+        versioned_artifact, manifest = self._prepare_write(
+            data=data,
+            name=name,
+            artifact_class=artifact_class,
+            format=format,
+            metadata=metadata,
+            activity_metadata_source=self.get_metadata(),
+        )
+        version = versioned_artifact.write(
+            data=data,
+            manifest=manifest,
+            version_name=version_name,
+            write_mode=write_mode,
+            executor=self.serialization_executor,
+            codec=get_codec(codec, level),
+            dedup=dedup,
+            chunked=chunked,
+        )
+        self._record_write(version)
+        return version
+
+    def write_many(self,
+                   items: Iterable[Dict[str, Any]],
+                   max_workers: Optional[int] = None,
+                   atomic: bool = False) -> List[Version]:
+        """ Write many artifacts concurrently.
+
+        The artifacts are serialized and written on a pool of threads. All the versions share the
+        same activity metadata, collected once before writing.
+
+        Parameters
+        ----------
+        items: Iterable of dict
+            Artifacts to write. Each item is a dictionary of the arguments of `write`, e.g.
+            `{'data': df, 'name': 'predictions', 'metadata': {'split': 'test'}}`.
+        max_workers: int, optional
+            Maximum number of threads. If None, the default of `ThreadPoolExecutor` is used.
+        atomic: bool
+            If True, either all the versions are written, or none of them is: the versions are
+            first written to staging folders, and published only if all of them have been
+            written successfully. If publishing one of them fails, the versions already
+            published are removed, and the versions they replaced are restored. Note that
+            readers may see some of the versions before all of them are published.
+            Deduplication (`dedup`) is not supported in atomic mode.
+
+        Raises
+        ------
+        BulkOperationFailed
+            If some of the writes failed. The exception contains the versions that were
+            written successfully (`results`), and the errors by input index (`errors`). They are
+            recorded in the write history. In atomic mode, no version has been written, and
+            `results` only contains None.
+
+        Return
+        ------
+        versions: List[Version]
+            The written Version objects, in the same order as `items`.
+
+        See Also
+        --------
+        `write` -- Write one artifact
+        """
+        items = [dict(item) for item in items]
+        activity_metadata_source = self.get_metadata()
+        # Prepare serially, so that each versioned artifact is created once
+        prepared = []
+        for item in items:
+            versioned_artifact, manifest = self._prepare_write(
+                data=item['data'],
+                name=item['name'],
+                artifact_class=item.get('artifact_class'),
+                format=item.get('format'),
+                metadata=item.get('metadata'),
+                activity_metadata_source=activity_metadata_source,
+            )
+            kwargs = {
+                'data': item['data'],
+                'manifest': manifest,
+                'version_name': item.get('version_name'),
+                'write_mode': item.get('write_mode', WriteMode.ERROR_IF_EXISTS),
+                'executor': self.serialization_executor,
+                'codec': get_codec(item.get('codec'), item.get('level')),
+                'chunked': item.get('chunked', False),
+            }
+            dedup = item.get('dedup', DedupMode.NONE)
+            if atomic and dedup != DedupMode.NONE:
+                raise ValueError('Deduplication is not supported in atomic mode')
+            if not atomic:
+                kwargs['dedup'] = dedup
+            prepared.append((versioned_artifact, kwargs))
+
+        if atomic:
+            versions = self._write_many_atomic(prepared, max_workers=max_workers)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(versioned_artifact.write, **kwargs)
+                           for versioned_artifact, kwargs in prepared]
+            versions, errors = _collect_results(futures)
+            if errors:
+                # The successful writes are recorded, like the successful reads of `read_many`
+                for version in versions:
+                    if version is not None:
+                        self._record_write(version)
+                raise BulkOperationFailed(results=versions, errors=errors)
+
+        for version in versions:
+            self._record_write(version)
+        return versions
 
+    def get_metadata(self) -> MetadataSource:
+        """ Collect activity metadata. """
+        activity_metadata = {
+            'source': self.source,
+            'author': self.author,
+            'inputs': sorted(self.read_history),
+        }
+        return DictMetadataSource(name='activity', metadata=activity_metadata)
+
+    def collect_garbage(self, name: str) -> int:
+        """ Delete the chunks of an artifact that are not used by any of its versions anymore.
+
+        Chunks are shared by the versions written with `chunked=True`, and are not deleted with
+        the versions. The versions abandoned by interrupted writes are deleted too, see
+        `VersionedArtifact.collect_garbage`. This must not run while versions of the artifact
+        are being written.
+
+        Parameters
+        ----------
+        name: str
+            Artifact name.
+
+        Return
+        ------
+        int
+            Number of deleted chunks.
+        """
+        return self._get_versioned_artifact(name).collect_garbage()
+
+    def invalidate_cache(self, name: Optional[str] = None) -> None:
+        """ Forget the cached information about artifacts.
+
+        The activity caches the versioned artifacts it reads, assuming that their artifact class
+        and version name class do not change. Call this method if an artifact has been deleted
+        and created again by another process. The versions of the artifact are also removed from
+        the artifact cache, if any: call this method if a version has been overwritten by another
+        process.
+
+        Parameters
+        ----------
+        name: str, optional
+            Artifact name. If None, the cached information about all artifacts is forgotten.
+        """
+        if name is None:
+            self._versioned_artifacts.clear()
+            if self.artifact_cache is not None:
+                self.artifact_cache.clear()
+        else:
+            self._versioned_artifacts.pop(name, None)
+            if self.artifact_cache is not None:
+                artifact_uri = version_uri(self.datastore.id, self.location, name, '')
+                self.artifact_cache.invalidate(artifact_uri, prefix=True)
+
+    def _prepare_write(self,
+                       data: DataType,
+                       name: str,
+                       artifact_class: Optional[Type[Artifact]],
+                       format: Optional[str],
+                       metadata: Optional[Dict[str, str]],
+                       activity_metadata_source: MetadataSource,
+                       ) -> Tuple[VersionedArtifact, Manifest]:
+        """ Create the versioned artifact if needed, and the manifest of a new version. """
         if artifact_class is None:
             artifact_class = self.artifact_registry.get_artifact(
                 data_class=data.__class__,
@@ -176,32 +516,129 @@ class Activity:
             datastore=self.datastore,
             artifact_class=artifact_class,
             version_name_class=self.version_name_class,
+            manifest_format=self.manifest_format,
         )
+        # The versioned artifact might have just been created, load it again on the next read.
+        # The cached versions are still valid, an overwritten version is invalidated once written.
+        self._versioned_artifacts.pop(name, None)
 
         manifest = Manifest()
         if metadata is not None:
             user_metadata_source = DictMetadataSource(name='user', metadata=metadata)
             manifest.add_section(user_metadata_source)
-        activity_metadata_source = self.get_metadata()
         manifest.add_section(activity_metadata_source)
-        version = versioned_artifact.write(
-            data=data,
-            manifest=manifest,
-            version_name=version_name,
-            write_mode=write_mode,
-        )
+        return versioned_artifact, manifest
 
+    def _record_write(self, version: Version) -> None:
+        """ Record a written version in the write history. """
         version_uri = version.get_uri(self.location, self.datastore)
+        if self.artifact_cache is not None:
+            # In case the version has been overwritten
+            self.artifact_cache.invalidate(version_uri)
         self.write_history.add(version_uri)
+
+    def _write_many_atomic(self,
+                           prepared: List[Tuple[VersionedArtifact, Dict[str, Any]]],
+                           max_workers: Optional[int] = None) -> List[Version]:
+        """ Stage all the versions concurrently, and publish them only if all were staged. """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(versioned_artifact.stage, **kwargs)
+                       for versioned_artifact, kwargs in prepared]
+        staged, errors = _collect_results(futures)
+
+        if errors:
+            for (versioned_artifact, _), staged_version in zip(prepared, staged):
+                if staged_version is not None:
+                    versioned_artifact.discard(staged_version)
+            raise BulkOperationFailed(results=[None] * len(prepared), errors=errors)
+
+        # Keep the replaced versions until all versions are published, to be able to restore them
+        published = []
+        for index, ((versioned_artifact, _), staged_version) in enumerate(zip(prepared, staged)):
+            try:
+                replaced_location = versioned_artifact.publish(
+                    staged_version, delete_replaced=False)
+            except Exception as error:
+                for versioned_artifact_, staged_, replaced_location_ in reversed(published):
+                    versioned_artifact_.unpublish(staged_, replaced_location_)
+                for (versioned_artifact_, _), staged_ in zip(prepared[index:], staged[index:]):
+                    versioned_artifact_.discard(staged_)
+                raise BulkOperationFailed(results=[None] * len(prepared), errors={index: error})
+            published.append((versioned_artifact, staged_version, replaced_location))
+
+        for versioned_artifact, _, replaced_location in published:
+            if replaced_location is not None:
+                self.datastore.delete(replaced_location, recursive=True)
+        return [staged_version.version for staged_version in staged]
+
+    def _read_cached_version(self,
+                             versioned_artifact: VersionedArtifact,
+                             version_name: Optional[Union[str, VersionName]],
+                             lazy: bool = False) -> Version:
+        """ Read a version from the artifact cache, or from storage if it is not cached.
+
+        A lazy version read from storage is not cached, its artifact is not loaded yet.
+        """
+        if version_name is None:
+            version_name = versioned_artifact.latest_version_name()
+        elif isinstance(version_name, str):
+            version_name = versioned_artifact.version_name_class.from_string(version_name)
+        uri = version_uri(self.datastore.id, self.location, versioned_artifact.artifact_name,
+                          version_name)
+
+        version = self.artifact_cache.get(uri)
+        if version is None and lazy:
+            version = versioned_artifact.read(
+                version_name=version_name, executor=self.serialization_executor, lazy=True)
+        elif version is None:
+            version = versioned_artifact.read(
+                version_name=version_name, executor=self.serialization_executor)
+            self.artifact_cache.put(uri, version)
         return version
 
-    def get_metadata(self) -> MetadataSource:
-        """ Collect activity metadata. """
-        activity_metadata = {
-            'source': self.source,
-            'author': self.author,
-            'inputs': sorted(self.read_history),
-        }
-        return DictMetadataSource(name='activity', metadata=activity_metadata)
+    def _read_version(self,
+                      name: str,
+                      version_name: Optional[Union[str, VersionName]] = None,
+                      lazy: bool = False,
+                      **kwargs) -> Version:
+        """ Read a version, without recording it in the read history.
+
+        Partial reads (with reader parameters) bypass the artifact cache.
+        """
+        versioned_artifact = self._get_versioned_artifact(name)
+        if self.artifact_cache is None or kwargs:
+            version = versioned_artifact.read(
+                version_name=version_name, executor=self.serialization_executor, lazy=lazy,
+                **kwargs)
+        else:
+            version = self._read_cached_version(versioned_artifact, version_name, lazy=lazy)
+        return version
+
+    def _get_versioned_artifact(self, name: str) -> VersionedArtifact:
+        """ Load a versioned artifact from storage, or from the cache if already loaded. """
+        versioned_artifact = self._versioned_artifacts.get(name)
+        if versioned_artifact is None:
+            versioned_artifact = VersionedArtifact.from_datastore(
+                artifact_name=name,
+                location=self.location,
+                datastore=self.datastore,
+            )
+            self._versioned_artifacts[name] = versioned_artifact
+        return versioned_artifact
 
     # todo def export() to extract artifact data from a data store
+
+
+def _collect_results(futures: List[Future]) -> Tuple[List[Any], Dict[int, Exception]]:
+    """ Collect the results of futures, with None in place of the failed ones, and the errors
+    by index. """
+    results = []
+    errors = {}
+    for index, future in enumerate(futures):
+        try:
+            result = future.result()
+        except Exception as error:
+            errors[index] = error
+            result = None
+        results.append(result)
+    return results, errors
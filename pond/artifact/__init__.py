@@ -1,5 +1,57 @@
+import importlib
+
 from pond.artifact.artifact import Artifact
 from pond.artifact.artifact_registry import global_artifact_registry
-# Importing the artifacts also has the side effect of registering them
-from pond.artifact.pandas_dataframe_artifact import PandasDataFrameArtifact
-from pond.artifact.pil_image_artifact import PILImageArtifact
+
+# The artifacts register themselves when their module is imported. The modules are imported the
+# first time that their data class or class ID is looked up, so that `import pond` does not
+# import pandas, PIL, and matplotlib. The last artifact registered for a data class is its
+# default, CSV remains the default for DataFrames.
+global_artifact_registry.register_lazy(
+    'pond.artifact.pandas_dataframe_parquet_artifact',
+    data_class='pandas.DataFrame',
+    class_ids=['PandasDataFrameParquetArtifact'],
+)
+global_artifact_registry.register_lazy(
+    'pond.artifact.pandas_dataframe_artifact',
+    data_class='pandas.DataFrame',
+    class_ids=['PandasDataFrameArtifact'],
+)
+# NPZ is the default for numpy arrays
+global_artifact_registry.register_lazy(
+    'pond.artifact.chunked_array_artifact',
+    data_class='numpy.ndarray',
+    class_ids=['ChunkedArrayArtifact'],
+)
+global_artifact_registry.register_lazy(
+    'pond.artifact.numpy_array_npy_artifact',
+    data_class='numpy.ndarray',
+    class_ids=['NumpyArrayNpyArtifact'],
+)
+global_artifact_registry.register_lazy(
+    'pond.artifact.numpy_array_artifact',
+    data_class='numpy.ndarray',
+    class_ids=['NumpyArrayArtifact'],
+)
+global_artifact_registry.register_lazy(
+    'pond.artifact.pil_image_artifact',
+    data_class='PIL.Image.Image',
+    class_ids=['PILImageArtifact', 'MatplotlibFigureArtifact'],
+)
+global_artifact_registry.register_lazy(
+    'pond.artifact.pil_image_artifact',
+    data_class='matplotlib.figure.Figure',
+)
+
+_LAZY_ATTRIBUTES = {
+    'PandasDataFrameParquetArtifact': 'pond.artifact.pandas_dataframe_parquet_artifact',
+    'PandasDataFrameArtifact': 'pond.artifact.pandas_dataframe_artifact',
+    'PILImageArtifact': 'pond.artifact.pil_image_artifact',
+}
+
+
+def __getattr__(name):
+    # Import the artifact classes exported by this package on first access
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,5 +1,57 @@
 from abc import ABC, abstractmethod
-from typing import Type
+import hashlib
+import io
+from typing import Dict, Type
+
+from pond.artifact.artifact_registry import global_artifact_registry
+from pond.exceptions import InvalidArtifactClass
+
+
+# Algorithm of the content hash of the data files
+CONTENT_HASH_ALGORITHM = 'sha256'
+
+
+class _HashingWriter(io.BufferedIOBase):
+    """ Binary file-like object that computes the hash of the bytes written to another one.
+
+    It is a `BufferedIOBase`, so that writers recognize it as a binary file even if the wrapped
+    file is not a regular file, e.g. a file of a `MemoryDatastore`.
+    """
+
+    def __init__(self, file_):
+        super().__init__()
+        self._file = file_
+        self._hash = hashlib.new(CONTENT_HASH_ALGORITHM)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def flush(self):
+        # Also called when this object is garbage collected, after the wrapped file is closed
+        if not getattr(self._file, 'closed', False):
+            self._file.flush()
+
+    def tell(self):
+        return self._file.tell()
+
+    def hexdigest(self):
+        return f'{CONTENT_HASH_ALGORITHM}:{self._hash.hexdigest()}'
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+#: All the subclasses of `Artifact`, by class ID
+_ARTIFACT_CLASSES: Dict[str, Type['Artifact']] = {}
+
+
+def content_hash(data):
+    """ Content hash of a sequence of bytes, as returned by `Artifact.write_datastore`. """
+    return f'{CONTENT_HASH_ALGORITHM}:{hashlib.new(CONTENT_HASH_ALGORITHM, data).hexdigest()}'
 
 
 class Artifact(ABC):
@@ -20,16 +72,23 @@ class Artifact(ABC):
 
     @classmethod
     def subclass_from_id(cls, class_id: str) -> Type['Artifact']:
-        """ Find a subclass from its class ID. """
-        subclasses = cls.__subclasses__()
-        for subclass in subclasses:
-            if subclass.class_id() == class_id:
-                break
-        else:
-            # todo this exception is not defined here
+        """ Find a subclass, at any depth, from its class ID.
+
+        If the subclass is registered lazily in `global_artifact_registry`, its module is
+        imported.
+        """
+        subclass = _ARTIFACT_CLASSES.get(class_id)
+        if subclass is None and global_artifact_registry.load_class_id(class_id):
+            subclass = _ARTIFACT_CLASSES.get(class_id)
+        if subclass is None or not issubclass(subclass, cls):
             raise InvalidArtifactClass(class_id)
         return subclass
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # If several classes have the same ID, the last defined one is found
+        _ARTIFACT_CLASSES[cls.class_id()] = cls
+
     # --- Artifact public interface
 
     def __init__(self, data, metadata=None):
@@ -101,6 +160,133 @@ class Artifact(ABC):
             artifact.metadata = metadata
         return artifact
 
+    @classmethod
+    def read_datastore(cls, datastore, path, metadata=None, executor=None, codec=None,
+                       **kwargs):
+        """ Reads the artifact from a data store.
+
+        By default, the file is opened and read with `read_bytes`. Artifacts can override this
+        method to use other capabilities of the data store, e.g. to memory-map the file with
+        `Datastore.map`, or to read the artifact from several files.
+
+        Parameters
+        ----------
+        datastore: Datastore
+            The data store from which the artifact is read.
+        path: str
+            Path of the artifact data, relative to the root of the data store.
+        metadata: dict or None
+            The metadata for the artifact, see `read_bytes`.
+        executor: concurrent.futures.Executor, optional
+            If given, the file is read in memory, and the artifact is deserialized on this
+            executor, e.g. a process pool for CPU-heavy artifacts.
+        codec: pond.codecs.Codec, optional
+            If given, the file is read in memory and decompressed with this codec.
+        kwargs: dict
+            Parameters for the reader.
+
+        Returns
+        -------
+        artifact: Artifact
+            An instance of the artifact.
+        """
+        if executor is None and codec is None:
+            with datastore.open(path, 'rb') as f:
+                artifact = cls.read_bytes(f, metadata, **kwargs)
+            return artifact
+
+        data = datastore.read(path)
+        if codec is not None:
+            data = codec.decompress(data)
+        if executor is None:
+            return cls.from_bytes(data, metadata, **kwargs)
+        return executor.submit(cls.from_bytes, data, metadata, **kwargs).result()
+
+    def write_datastore(self, datastore, path, executor=None, codec=None, **kwargs):
+        """ Writes the artifact to a data store.
+
+        By default, the artifact is written to a file with `write_bytes`, and the hash of the
+        written bytes is computed while writing. Artifacts can override this method to use other
+        capabilities of the data store, e.g. to write the artifact to several files.
+
+        Parameters
+        ----------
+        datastore: Datastore
+            The data store to which the artifact is written.
+        path: str
+            Path of the artifact data, relative to the root of the data store.
+        executor: concurrent.futures.Executor, optional
+            If given, the artifact is serialized in memory on this executor, e.g. a process pool
+            for CPU-heavy artifacts, and then written to the data store.
+        codec: pond.codecs.Codec, optional
+            If given, the artifact is serialized in memory, and compressed with this codec.
+        kwargs: dict
+            Parameters for the writer.
+
+        Returns
+        -------
+        content_hash: str or None
+            Hash of the written file, e.g. 'sha256:1fa3...', or None if the artifact is not
+            written to a single file.
+        """
+        if executor is None and codec is None:
+            with datastore.open(path, 'wb') as f:
+                writer = _HashingWriter(f)
+                self.write_bytes(writer, **kwargs)
+            return writer.hexdigest()
+
+        if executor is None:
+            data = self.to_bytes(**kwargs)
+        else:
+            data = executor.submit(self.to_bytes, **kwargs).result()
+        if codec is not None:
+            data = codec.compress(data)
+        datastore.write(path, data)
+        return content_hash(data)
+
+    @classmethod
+    def from_bytes(cls, data, metadata=None, **kwargs):
+        """ Reads the artifact from a sequence of bytes.
+
+        This is useful to deserialize an artifact in another process, e.g. with a
+        `concurrent.futures.ProcessPoolExecutor`.
+
+        Parameters
+        ----------
+        data: bytes
+            The serialized artifact, as written by `write_bytes`.
+        metadata: dict or None
+            The metadata for the artifact, see `read_bytes`.
+        kwargs: dict
+            Parameters for the reader.
+
+        Returns
+        -------
+        artifact: Artifact
+            An instance of the artifact.
+        """
+        return cls.read_bytes(io.BytesIO(data), metadata, **kwargs)
+
+    def to_bytes(self, **kwargs):
+        """ Writes the artifact to a sequence of bytes.
+
+        This is useful to serialize an artifact in another process, e.g. with a
+        `concurrent.futures.ProcessPoolExecutor`.
+
+        Parameters
+        ----------
+        kwargs: dict
+            Parameters for the writer.
+
+        Returns
+        -------
+        data: bytes
+            The serialized artifact.
+        """
+        file_ = io.BytesIO()
+        self.write_bytes(file_, **kwargs)
+        return file_.getvalue()
+
     # todo why the kwargs
     def write(self, path, **kwargs):
         """ Writes the artifact to file.
@@ -1,22 +1,111 @@
 from collections import defaultdict, namedtuple
+import importlib
+import threading
+from typing import Iterable, Optional
 
 from pond.exceptions import ArtifactNotFound, FormatNotFound
 
 
 ArtifactRegistryItem = namedtuple('ArtifactRegistryItem', ['artifact_class', 'format'])
 
+# Entry point group of the third-party artifacts
+ARTIFACT_ENTRY_POINT_GROUP = 'pond.artifacts'
 
-# todo: handle subclasses of a data class
 
-class ArtifactRegistry:
-    """ Registry of data types to compatible artifact classes. """
+def _import_name(name: str):
+    """ The object with a fully qualified name, e.g. 'pandas.DataFrame', or None. """
+    module, _, attribute = name.rpartition('.')
+    try:
+        return getattr(importlib.import_module(module), attribute)
+    except (ImportError, AttributeError, ValueError):
+        return None
+
 
-    def __init__(self):
+class ArtifactRegistry:
+    """ Registry of data types to compatible artifact classes.
+
+    The artifacts registered for a data class are also compatible with its subclasses. The
+    lookups follow the method resolution order (MRO) of the data class, and their results are
+    cached until the next registration.
+
+    Artifacts can also be registered lazily, with `register_lazy`: the module defining an
+    artifact, and the library of its data type, are only imported when the artifact is needed.
+    A lazy registration is removed only once its module has been imported, so that threads
+    looking up the same artifact concurrently all wait for the import to complete.
+
+    Parameters
+    ----------
+    entry_point_group: str, optional
+        If set, the entry points of this group are registered lazily when the registry is
+        first used. Each entry point is named after the fully qualified name of a data class,
+        and refers to an artifact class, e.g. `pandas.DataFrame = my_package.module:MyArtifact`.
+    """
+
+    def __init__(self, entry_point_group: Optional[str] = None):
         self._register = defaultdict(list)
+        #: Modules to import before looking up a data class, by fully qualified name
+        self._lazy_by_data_class = defaultdict(list)
+        #: Module to import before looking up an artifact class, by class ID
+        self._lazy_by_class_id = {}
+        self._entry_point_group = entry_point_group
+        #: Results of `get_artifact`, by data class and format
+        self._cache = {}
+        #: Guards the registrations. The modules are imported without holding it: the import
+        #: system already serializes the imports of a module, and an artifact module imported
+        #: directly by another thread needs the lock to register itself.
+        self._lock = threading.RLock()
 
     def register(self, artifact_class, data_class, format=None):
+        # The lazy registrations of the data class made before the one of this artifact, if any,
+        # come first
+        self._load_lazy(data_class, until_module=artifact_class.__module__)
         item = ArtifactRegistryItem(artifact_class=artifact_class, format=format)
-        self._register[data_class].append(item)
+        with self._lock:
+            self._register[data_class].append(item)
+            self._cache.clear()
+
+    def register_lazy(self, module: str, data_class: str, class_ids: Iterable[str] = ()):
+        """ Register the artifacts of a module, without importing it.
+
+        The module is imported the first time that artifacts are looked up for `data_class`, or
+        that one of `class_ids` is looked up with `load_class_id`. On import, it must register
+        its artifacts in this registry with `register`, like the modules in `pond.artifact`
+        register themselves in `global_artifact_registry`.
+
+        Parameters
+        ----------
+        module: str
+            Name of the module defining and registering the artifacts.
+        data_class: str
+            Fully qualified name of the data class of the artifacts, as it is imported, e.g.
+            'pandas.DataFrame'.
+        class_ids: Iterable[str]
+            Class IDs of the artifacts defined in the module.
+        """
+        with self._lock:
+            self._lazy_by_data_class[data_class].append(module)
+            for class_id in class_ids:
+                self._lazy_by_class_id[class_id] = module
+            self._cache.clear()
+
+    def load_class_id(self, class_id: str) -> bool:
+        """ Import the module of a lazily registered artifact class, given its class ID.
+
+        Returns
+        -------
+        bool
+            True if a module has been imported.
+        """
+        self._load_entry_points()
+        with self._lock:
+            module = self._lazy_by_class_id.get(class_id)
+        if module is None:
+            return False
+        importlib.import_module(module)
+        with self._lock:
+            if self._lazy_by_class_id.get(class_id) == module:
+                del self._lazy_by_class_id[class_id]
+        return True
 
     def get_available_artifacts(self, data_class):
         """ Get all available artifacts for a given data class.
@@ -29,9 +118,16 @@ class ArtifactRegistry:
         Returns
         -------
         items: list of ArtifactRegistryItem
-            All registered (artifact, format) items compatible with data_class.
+            All registered (artifact, format) items compatible with data_class. If none is
+            registered for data_class itself, the items of its closest base class in the MRO.
         """
-        return self._register[data_class]
+        self._load_entry_points()
+        for class_ in getattr(data_class, '__mro__', (data_class,)):
+            self._load_lazy(class_)
+            items = self._register.get(class_)
+            if items:
+                return items
+        return []
 
     def get_artifact(self, data_class, format=None):
         """
@@ -51,6 +147,10 @@ class ArtifactRegistry:
             Artifact class
 
         """
+        key = (data_class, format)
+        if key in self._cache:
+            return self._cache[key]
+
         items = self.get_available_artifacts(data_class)
         if len(items) == 0:
             raise ArtifactNotFound(data_class)
@@ -65,7 +165,63 @@ class ArtifactRegistry:
             else:
                 raise FormatNotFound(data_class, format)
 
+        self._cache[key] = artifact_class
         return artifact_class
 
+    # --- ArtifactRegistry private interface
+
+    def _load_lazy(self, data_class, until_module: Optional[str] = None) -> None:
+        """ Import the modules registered lazily for a data class.
+
+        If `until_module` is one of them, e.g. because it is being imported, only the modules
+        registered before it are imported, and the ones after it remain lazy.
+        """
+        if not self._lazy_by_data_class:
+            return
+        # The package of the data class is already imported, resolving names in it is cheap
+        package = str(getattr(data_class, '__module__', '')).partition('.')[0]
+        with self._lock:
+            names = [name for name in self._lazy_by_data_class
+                     if name.partition('.')[0] == package]
+        for name in names:
+            if _import_name(name) is not data_class:
+                continue
+            with self._lock:
+                modules = list(self._lazy_by_data_class.get(name, []))
+            if until_module in modules:
+                modules = modules[:modules.index(until_module)]
+            for module in modules:
+                importlib.import_module(module)
+            # Only the imported modules, and the one being imported, are not lazy anymore
+            with self._lock:
+                remaining = [module for module in self._lazy_by_data_class.get(name, [])
+                             if module not in modules and module != until_module]
+                if remaining:
+                    self._lazy_by_data_class[name] = remaining
+                else:
+                    self._lazy_by_data_class.pop(name, None)
+
+    def _load_entry_points(self) -> None:
+        if self._entry_point_group is None:
+            return
+        # Other threads wait until the entry points are registered
+        with self._lock:
+            group = self._entry_point_group
+            if group is None:
+                return
+            # Imported here, it is slow to import and only needed once
+            from importlib import metadata as importlib_metadata
+            entry_points = importlib_metadata.entry_points()
+            if hasattr(entry_points, 'select'):
+                entry_points = entry_points.select(group=group)
+            else:
+                # Python < 3.10
+                entry_points = entry_points.get(group, [])
+            for entry_point in entry_points:
+                class_ids = [entry_point.attr] if entry_point.attr else []
+                self.register_lazy(entry_point.module, entry_point.name, class_ids=class_ids)
+            # Only once, scanning the installed packages is slow
+            self._entry_point_group = None
+
 
-global_artifact_registry = ArtifactRegistry()
+global_artifact_registry = ArtifactRegistry(entry_point_group=ARTIFACT_ENTRY_POINT_GROUP)
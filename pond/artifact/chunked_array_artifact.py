@@ -0,0 +1,232 @@
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from pond.artifact import Artifact
+from pond.artifact.artifact_registry import global_artifact_registry
+from pond.codecs import ZlibCodec, get_codec
+from pond.conventions import urijoinpath
+
+
+# Target size of the chunks, in bytes (uncompressed)
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+# Maximum number of chunks read or written at the same time
+CHUNK_IO_MAX_WORKERS = 16
+# Name of the index file, in the artifact folder
+CHUNKS_INDEX_FILENAME = 'index.json'
+CHUNKS_FORMAT_VERSION = 1
+
+
+def default_chunk_shape(shape: Tuple[int, ...], itemsize: int,
+                        chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Tuple[int, ...]:
+    """ Chunk shape of about `chunk_bytes` bytes, obtained by halving the largest dimension
+    until the chunk is small enough. """
+    chunk_shape = [max(size, 1) for size in shape]
+    while np.prod(chunk_shape) * itemsize > chunk_bytes and max(chunk_shape) > 1:
+        axis = int(np.argmax(chunk_shape))
+        chunk_shape[axis] = math.ceil(chunk_shape[axis] / 2)
+    return tuple(chunk_shape)
+
+
+def _normalize_selection(selection, shape: Tuple[int, ...]) -> Tuple[List[range], List[int]]:
+    """ Convert a selection (integers and slices, one per dimension) to a range of indices per
+    dimension, and the list of dimensions selected by an integer. """
+    if selection is None:
+        selection = ()
+    elif not isinstance(selection, tuple):
+        selection = (selection,)
+    if len(selection) > len(shape):
+        raise IndexError(f'Too many indices for an array with {len(shape)} dimensions')
+
+    ranges = []
+    dropped_axes = []
+    for axis, size in enumerate(shape):
+        item = selection[axis] if axis < len(selection) else slice(None)
+        if isinstance(item, slice):
+            ranges.append(range(*item.indices(size)))
+        elif isinstance(item, (int, np.integer)):
+            index = int(item) + size if item < 0 else int(item)
+            if not 0 <= index < size:
+                raise IndexError(f'Index {item} is out of bounds for axis {axis} of size {size}')
+            ranges.append(range(index, index + 1))
+            dropped_axes.append(axis)
+        else:
+            raise TypeError(f'Unsupported selection {item!r}: use integers and slices')
+    return ranges, dropped_axes
+
+
+class ChunkedArrayArtifact(Artifact):
+    """ Artifact for large N-dimensional numpy arrays, saved in compressed chunks.
+
+    The array is split in chunks of fixed shape, each compressed and written to a separate file
+    in the artifact folder, next to a small JSON index with the shape, dtype, and chunk shape of
+    the array. Chunks are written and read in parallel.
+
+    A part of the array can be read by passing a `selection` to the reader, e.g.
+    `activity.read('tensor', selection=np.s_[1000:2000, :, 3])`: only the chunks that intersect
+    the selection are read and decompressed. Selections are made of integers and slices, one per
+    dimension.
+
+    The array data is not stored in a single file: `read_bytes` and `write_bytes` are not
+    supported, the artifact is read from and written to a data store.
+    """
+
+    #: Target size of the chunks, in bytes
+    chunk_bytes = DEFAULT_CHUNK_BYTES
+
+    @classmethod
+    def read_datastore(cls, datastore, path, metadata=None, executor=None, codec=None,
+                       selection=None, **kwargs):
+        """ Read a chunked array, or a part of it.
+
+        Parameters
+        ----------
+        datastore: Datastore
+            The data store from which the artifact is read.
+        path: str
+            Path of the artifact folder, relative to the root of the data store.
+        metadata: dict or None
+            The metadata for the artifact, see `read_bytes`.
+        executor: concurrent.futures.Executor, optional
+            Ignored: the chunks are always read and decompressed on a thread pool (the codecs
+            release the GIL).
+        codec: pond.codecs.Codec, optional
+            Ignored: the codec of the chunks is stored in the index.
+        selection: tuple of int and slice, optional
+            Part of the array to read, e.g. `numpy.s_[10:20, 3]`. If None, the whole array is
+            read.
+        """
+        index = datastore.read_json(urijoinpath(path, CHUNKS_INDEX_FILENAME))
+        shape = tuple(index['shape'])
+        dtype = np.dtype(index['dtype'])
+        chunk_shape = tuple(index['chunks'])
+        chunks_codec = get_codec(index['compression'])
+        ranges, dropped_axes = _normalize_selection(selection, shape)
+
+        # Bounding box of the selection, and the chunks intersecting it
+        box_start = [min(r[0], r[-1]) if r else 0 for r in ranges]
+        box_stop = [max(r[0], r[-1]) + 1 if r else 0 for r in ranges]
+        data = np.empty([stop - start for start, stop in zip(box_start, box_stop)], dtype=dtype)
+        if data.size > 0:
+            chunk_indices = itertools.product(*(
+                range(start // size, (stop - 1) // size + 1)
+                for start, stop, size in zip(box_start, box_stop, chunk_shape)
+            ))
+
+            def read_chunk(chunk_index):
+                chunk_start = [i * size for i, size in zip(chunk_index, chunk_shape)]
+                chunk_stop = [min(start + size, total)
+                              for start, size, total in zip(chunk_start, chunk_shape, shape)]
+                chunk_size = [stop - start for start, stop in zip(chunk_start, chunk_stop)]
+                chunk = cls._read_chunk(
+                    datastore, path, chunk_index, dtype, chunk_size, chunks_codec)
+                # Intersection of the chunk with the bounding box
+                source = tuple(slice(max(b0, c0) - c0, min(b1, c1) - c0)
+                               for b0, b1, c0, c1 in zip(box_start, box_stop, chunk_start,
+                                                         chunk_stop))
+                target = tuple(slice(max(b0, c0) - b0, min(b1, c1) - b0)
+                               for b0, b1, c0, c1 in zip(box_start, box_stop, chunk_start,
+                                                         chunk_stop))
+                data[target] = chunk[source]
+
+            cls._map(read_chunk, chunk_indices)
+
+        # Apply the steps of the selection, and drop the dimensions selected by an integer
+        for axis, (r, start) in enumerate(zip(ranges, box_start)):
+            if r.step != 1:
+                data = np.take(data, np.asarray(r, dtype=np.intp) - start, axis=axis)
+        if dropped_axes:
+            data = data.squeeze(axis=tuple(dropped_axes))
+
+        if metadata is None:
+            metadata = index.get('metadata', {})
+        return cls(data, metadata=metadata)
+
+    def write_datastore(self, datastore, path, executor=None, codec=None, **kwargs):
+        """ Write the array in chunks, in parallel.
+
+        Parameters
+        ----------
+        datastore: Datastore
+            The data store to which the artifact is written.
+        path: str
+            Path of the artifact folder, relative to the root of the data store.
+        executor: concurrent.futures.Executor, optional
+            Ignored: the chunks are always compressed and written on a thread pool (the codecs
+            release the GIL).
+        codec: pond.codecs.Codec, optional
+            Codec used to compress each chunk. If None, zlib with the fastest compression level.
+        """
+        if codec is None:
+            codec = ZlibCodec(level=1)
+        data = np.asarray(self.data)
+        if data.dtype.hasobject:
+            raise TypeError('Arrays of Python objects are not supported')
+        chunk_shape = default_chunk_shape(data.shape, data.dtype.itemsize, self.chunk_bytes)
+
+        datastore.makedirs(path)
+        chunk_indices = itertools.product(*(
+            range(math.ceil(size / chunk_size))
+            for size, chunk_size in zip(data.shape, chunk_shape)
+        ))
+
+        def write_chunk(chunk_index):
+            selection = tuple(slice(i * size, (i + 1) * size)
+                              for i, size in zip(chunk_index, chunk_shape))
+            self._write_chunk(datastore, path, chunk_index, data[selection], codec)
+
+        self._map(write_chunk, chunk_indices)
+
+        # The pond convention is that all stored metadata is a string
+        metadata = {str(k): str(v) for k, v in self.metadata.items()}
+        index = {
+            'format_version': CHUNKS_FORMAT_VERSION,
+            'shape': list(data.shape),
+            'dtype': data.dtype.str,
+            'chunks': list(chunk_shape),
+            'compression': codec.name,
+            'metadata': metadata,
+        }
+        datastore.write_json(urijoinpath(path, CHUNKS_INDEX_FILENAME), index)
+        # The artifact is stored in several files
+        return None
+
+    @classmethod
+    def _read_bytes(cls, file_, **kwargs):
+        raise NotImplementedError('Chunked arrays can only be read from a data store')
+
+    def write_bytes(self, file_, **kwargs):
+        raise NotImplementedError('Chunked arrays can only be written to a data store')
+
+    @staticmethod
+    def filename(basename):
+        return basename + '.chunks'
+
+    # --- ChunkedArrayArtifact private interface
+
+    @staticmethod
+    def _chunk_location(path, chunk_index):
+        return urijoinpath(path, '.'.join(str(i) for i in chunk_index) or '0')
+
+    @classmethod
+    def _read_chunk(cls, datastore, path, chunk_index, dtype, shape, codec):
+        compressed = datastore.read(cls._chunk_location(path, chunk_index))
+        return np.frombuffer(codec.decompress(compressed), dtype=dtype).reshape(shape)
+
+    @classmethod
+    def _write_chunk(cls, datastore, path, chunk_index, chunk, codec):
+        compressed = codec.compress(np.ascontiguousarray(chunk).tobytes())
+        datastore.write(cls._chunk_location(path, chunk_index), compressed)
+
+    @staticmethod
+    def _map(func, items):
+        """ Call `func` on all items, in parallel. """
+        with ThreadPoolExecutor(max_workers=CHUNK_IO_MAX_WORKERS) as executor:
+            list(executor.map(func, items))
+
+
+global_artifact_registry.register(
+    artifact_class=ChunkedArrayArtifact, data_class=np.ndarray, format='chunked')
@@ -0,0 +1,112 @@
+import io
+import json
+import struct
+
+import numpy as np
+
+from pond.artifact import Artifact
+from pond.artifact.artifact_registry import global_artifact_registry
+from pond.conventions import TXT_ENCODING
+
+
+# The metadata is appended to the .npy file, followed by its length and this marker
+NPY_METADATA_MARKER = b'POND\x00NPY'
+_METADATA_LENGTH_FORMAT = '<Q'
+_TRAILER_SIZE = struct.calcsize(_METADATA_LENGTH_FORMAT) + len(NPY_METADATA_MARKER)
+
+
+def _array_from_buffer(buffer):
+    """ Create an array viewing the data in a .npy buffer, without copying it.
+
+    Returns the array, and the offset of the end of the array data in the buffer.
+    """
+    major_version = buffer[6]
+    if major_version == 1:
+        header_length_format = '<H'
+    else:
+        header_length_format = '<I'
+    header_start = 8 + struct.calcsize(header_length_format)
+    header_length, = struct.unpack(header_length_format, buffer[8:header_start])
+    header_end = header_start + header_length
+
+    header = io.BytesIO(bytes(buffer[:header_end]))
+    version = np.lib.format.read_magic(header)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+
+    count = int(np.prod(shape))
+    data = np.frombuffer(buffer, dtype=dtype, count=count, offset=header_end)
+    data = data.reshape(shape, order='F' if fortran_order else 'C')
+    return data, header_end + count * dtype.itemsize
+
+
+def _metadata_from_buffer(buffer, data_end):
+    """ Read the metadata appended to a .npy buffer, if any. """
+    if len(buffer) - data_end < _TRAILER_SIZE or buffer[-len(NPY_METADATA_MARKER):] != \
+            NPY_METADATA_MARKER:
+        return {}
+    length_end = len(buffer) - len(NPY_METADATA_MARKER)
+    length_start = length_end - struct.calcsize(_METADATA_LENGTH_FORMAT)
+    metadata_length, = struct.unpack(_METADATA_LENGTH_FORMAT, buffer[length_start:length_end])
+    metadata = bytes(buffer[length_start - metadata_length:length_start])
+    return json.loads(metadata.decode(TXT_ENCODING))
+
+
+class NumpyArrayNpyArtifact(Artifact):
+    """ Artifact for numpy arrays, saved uncompressed in .npy format.
+
+    When read from a data store that supports memory mapping (e.g. `FileDatastore`), the array is
+    a read-only view on the memory-mapped file: no data is loaded until it is accessed, and
+    several processes reading the same array share the page cache instead of each holding a
+    private copy. Use `numpy.array(data)` to get a writeable copy.
+
+    The metadata is appended to the .npy file, after the array data. The file can still be
+    loaded with `numpy.load`.
+
+    Arrays of Python objects are not supported.
+    """
+
+    @classmethod
+    def read_datastore(cls, datastore, path, metadata=None, executor=None, codec=None,
+                       **kwargs):
+        """ Read a numpy array from a .npy file, memory-mapped by the data store if possible.
+
+        The array is not copied, and there is nothing to deserialize: `executor` is ignored.
+        Compressed files cannot be memory-mapped, and are read in memory.
+        """
+        if codec is not None:
+            return super().read_datastore(datastore, path, metadata=metadata, codec=codec)
+        artifact = cls._from_buffer(datastore.map(path))
+        if metadata is not None:
+            artifact.metadata = metadata
+        return artifact
+
+    @classmethod
+    def _read_bytes(cls, file_, **kwargs):
+        """ Read a numpy array from a .npy binary file. """
+        return cls._from_buffer(file_.read())
+
+    @classmethod
+    def _from_buffer(cls, buffer):
+        data, data_end = _array_from_buffer(buffer)
+        metadata = _metadata_from_buffer(buffer, data_end)
+        return cls(data, metadata=metadata)
+
+    def write_bytes(self, file_, **kwargs):
+        np.lib.format.write_array(file_, np.asanyarray(self.data), allow_pickle=False)
+        # The pond convention is that all stored metadata is a string
+        metadata = {str(k): str(v) for k, v in self.metadata.items()}
+        metadata = json.dumps(metadata).encode(TXT_ENCODING)
+        file_.write(metadata)
+        file_.write(struct.pack(_METADATA_LENGTH_FORMAT, len(metadata)))
+        file_.write(NPY_METADATA_MARKER)
+
+    @staticmethod
+    def filename(basename):
+        return basename + '.npy'
+
+
+global_artifact_registry.register(
+    artifact_class=NumpyArrayNpyArtifact, data_class=np.ndarray, format='npy')
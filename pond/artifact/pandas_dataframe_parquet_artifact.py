@@ -0,0 +1,67 @@
+import json
+
+import pandas as pd
+
+from pond.artifact import Artifact
+from pond.artifact.artifact_registry import global_artifact_registry
+from pond.conventions import TXT_ENCODING
+
+
+# Key of the user metadata in the Parquet key-value metadata
+PARQUET_METADATA_KEY = b'pond.metadata'
+
+
+class PandasDataFrameParquetArtifact(Artifact):
+    """ Artifact for Pandas DataFrames, saved in Apache Parquet format.
+
+    Parquet is a columnar format: the dtypes are preserved, and a subset of the columns or of the
+    rows can be read without loading the whole table. The user metadata is stored in the Parquet
+    key-value metadata.
+
+    Requires `pyarrow` (`pip install pond[parquet]`).
+    """
+
+    @classmethod
+    def _read_bytes(cls, file_, columns=None, filters=None, **kwargs):
+        """ Read a Pandas DataFrame artifact from a Parquet file.
+
+        Parameters
+        ----------
+        file_: file-like object
+            A file-like object from which the artifact is read, opened in binary mode.
+        columns: list of str, optional
+            If given, only these columns are read. The index is always read.
+        filters: list of tuples, optional
+            Row filters, e.g. `[('year', '>=', 2020)]`. Row groups that do not match the filters
+            are skipped. See `pyarrow.parquet.read_table` for the syntax.
+        kwargs: dict
+            Additional parameters for `pyarrow.parquet.read_table`.
+        """
+        import pyarrow.parquet as pq
+
+        kwargs.setdefault('use_pandas_metadata', True)
+        table = pq.read_table(file_, columns=columns, filters=filters, **kwargs)
+        schema_metadata = table.schema.metadata or {}
+        metadata = json.loads(schema_metadata.get(PARQUET_METADATA_KEY, b'{}').decode(TXT_ENCODING))
+        data = table.to_pandas()
+        return cls(data, metadata)
+
+    def write_bytes(self, file_, **kwargs):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(self.data)
+        # The pond convention is that all stored metadata is a string
+        metadata = {str(k): str(v) for k, v in self.metadata.items()}
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[PARQUET_METADATA_KEY] = json.dumps(metadata).encode(TXT_ENCODING)
+        table = table.replace_schema_metadata(schema_metadata)
+        pq.write_table(table, file_, **kwargs)
+
+    @staticmethod
+    def filename(basename):
+        return basename + '.parquet'
+
+
+global_artifact_registry.register(
+    artifact_class=PandasDataFrameParquetArtifact, data_class=pd.DataFrame, format='parquet')
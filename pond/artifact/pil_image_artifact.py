@@ -1,4 +1,4 @@
-from matplotlib.pyplot import Figure
+from matplotlib.figure import Figure
 from PIL import Image
 from PIL.PngImagePlugin import PngInfo
 
@@ -67,6 +67,7 @@ class MatplotlibFigureArtifact(Artifact):
         pil.write_bytes(file_, **kwargs)
 
 
-global_artifact_registry.register(artifact_class=PILImageArtifact, data_class=Image, format='png')
+global_artifact_registry.register(
+    artifact_class=PILImageArtifact, data_class=Image.Image, format='png')
 global_artifact_registry.register(artifact_class=MatplotlibFigureArtifact, data_class=Figure,
                                   format='png')
@@ -0,0 +1,185 @@
+from collections import OrderedDict, namedtuple
+import sys
+import threading
+from typing import Any, Optional
+
+from pond.version import Version
+
+
+ArtifactCacheStats = namedtuple(
+    'ArtifactCacheStats', ['hits', 'misses', 'evictions', 'size_bytes', 'n_items'])
+
+# Default memory budget of the cache
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _measured_size(data: Any) -> Optional[int]:
+    """ Exact memory size of NumPy arrays, Pandas objects, and PIL images, or None. """
+    memory_usage = getattr(data, 'memory_usage', None)
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(deep=True)
+            return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+        except TypeError:
+            pass
+    nbytes = getattr(data, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = getattr(data, 'size', None)
+    getbands = getattr(data, 'getbands', None)
+    if isinstance(size, tuple) and callable(getbands):
+        width, height = size
+        return width * height * len(getbands())
+    return None
+
+
+def data_size(data: Any) -> int:
+    """ Estimate the memory size of the data of an artifact, in bytes.
+
+    NumPy arrays and Pandas DataFrames are measured exactly (`nbytes` and `memory_usage`), PIL
+    images from their pixel size. Dicts, lists, tuples, and sets are measured recursively, with
+    `sys.getsizeof` for the other objects. Objects referenced several times are counted once.
+    """
+    size = 0
+    seen = set()
+    # Iterative, deeply nested data does not exhaust the recursion limit
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        measured = _measured_size(obj)
+        if measured is not None:
+            size += measured
+            continue
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
+
+
+class ArtifactCache:
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """ In-memory cache of the versions read from storage, keyed by version URI.
+
+        Versions are immutable once written, so a version read once can be served from memory
+        afterwards. When the memory budget is exceeded, the least recently used versions are
+        evicted. Versions larger than the whole budget are not cached.
+
+        The cached objects are shared by all readers: modifying the data of a cached artifact
+        in place modifies it for all subsequent reads.
+
+        The cache is thread-safe, and can be shared by several activities.
+
+        Overwriting a version (`WriteMode.OVERWRITE`) breaks the immutability. An `Activity`
+        invalidates the cached version when it writes it; versions overwritten by other processes
+        are not detected, and need to be invalidated explicitly (see `invalidate`).
+
+        Parameters
+        ----------
+        max_bytes: int
+            Memory budget of the cache, in bytes. The size of a version is estimated from the
+            size of its artifact data (see `data_size`).
+        """
+        self.max_bytes = max_bytes
+        self._versions: OrderedDict = OrderedDict()
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    # --- ArtifactCache public interface
+
+    def get(self, uri: str) -> Optional[Version]:
+        """ Get a cached version, and mark it as recently used.
+
+        Parameters
+        ----------
+        uri: str
+            URI of the version.
+
+        Returns
+        -------
+        Optional[Version]
+            The cached version, or None if the version is not cached.
+        """
+        with self._lock:
+            item = self._versions.get(uri)
+            if item is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._versions.move_to_end(uri)
+            version, _ = item
+            return version
+
+    def put(self, uri: str, version: Version) -> None:
+        """ Add a version to the cache, evicting the least recently used versions if needed.
+
+        Parameters
+        ----------
+        uri: str
+            URI of the version.
+        version: Version
+            The version, including its artifact.
+        """
+        size = data_size(version.artifact.data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(uri)
+            self._versions[uri] = (version, size)
+            self._size_bytes += size
+            while self._size_bytes > self.max_bytes:
+                evicted_uri = next(iter(self._versions))
+                self._remove(evicted_uri)
+                self._evictions += 1
+
+    def invalidate(self, uri: str, prefix: bool = False) -> None:
+        """ Remove a version from the cache.
+
+        Parameters
+        ----------
+        uri: str
+            URI of the version.
+        prefix: bool
+            If True, remove all versions whose URI starts with `uri`, e.g. all the versions of an
+            artifact.
+        """
+        with self._lock:
+            if prefix:
+                uris = [cached_uri for cached_uri in self._versions if cached_uri.startswith(uri)]
+            else:
+                uris = [uri]
+            for uri_ in uris:
+                self._remove(uri_)
+
+    def clear(self) -> None:
+        """ Remove all versions from the cache. """
+        with self._lock:
+            self._versions.clear()
+            self._size_bytes = 0
+
+    def stats(self) -> ArtifactCacheStats:
+        """ Cache statistics: number of hits, misses, and evictions, and current size. """
+        with self._lock:
+            return ArtifactCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size_bytes=self._size_bytes,
+                n_items=len(self._versions),
+            )
+
+    # --- ArtifactCache private interface
+
+    def _remove(self, uri: str) -> None:
+        item = self._versions.pop(uri, None)
+        if item is not None:
+            self._size_bytes -= item[1]
@@ -0,0 +1,177 @@
+import asyncio
+from concurrent.futures import Executor
+import functools
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
+
+from pond.activity import Activity
+from pond.artifact import Artifact
+from pond.artifact.artifact_registry import ArtifactRegistry, global_artifact_registry
+from pond.artifact_cache import ArtifactCache
+from pond.conventions import DataType, DedupMode, ManifestFormat, WriteMode
+from pond.exceptions import BulkOperationFailed
+from pond.metadata.metadata_source import MetadataSource
+from pond.storage.async_datastore import DEFAULT_MAX_WORKERS, ExecutorAsyncDatastore
+from pond.storage.datastore import Datastore
+from pond.version import Version
+from pond.version_name import SimpleVersionName, VersionName
+
+
+class AsyncActivity:
+
+    def __init__(self,
+                 source: str,
+                 location: str,
+                 datastore: Datastore,
+                 author: str = 'NA',
+                 version_name_class: Type[VersionName] = SimpleVersionName,
+                 artifact_registry: ArtifactRegistry = global_artifact_registry,
+                 artifact_cache: Optional[ArtifactCache] = None,
+                 serialization_executor: Optional[Executor] = None,
+                 executor: Optional[Executor] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 manifest_format: ManifestFormat = ManifestFormat.YAML):
+        """ Read and write artifacts with lineage and metadata, from an asyncio event loop.
+
+        AsyncActivity has the same interface as `Activity`, with coroutines in place of the read
+        and write methods. The blocking data store operations run on a bounded thread pool, and
+        the CPU-heavy serialization of the artifacts can be moved to a process pool with
+        `serialization_executor`, so that the event loop is never blocked.
+
+        The parameters are the same as for `Activity`, plus:
+
+        Parameters
+        ----------
+        executor: Executor, optional
+            Executor running the blocking operations. If None, a `ThreadPoolExecutor` with
+            `max_workers` threads is created.
+        max_workers: int
+            Maximum number of threads, if `executor` is None. It bounds the number of reads and
+            writes running at the same time, and the number of threads used by `write_many`.
+        """
+        self.activity = Activity(
+            source=source,
+            location=location,
+            datastore=datastore,
+            author=author,
+            version_name_class=version_name_class,
+            artifact_registry=artifact_registry,
+            artifact_cache=artifact_cache,
+            serialization_executor=serialization_executor,
+            manifest_format=manifest_format,
+        )
+        #: Asynchronous interface of the data store, sharing the executor of the activity
+        self.datastore = ExecutorAsyncDatastore(
+            datastore, executor=executor, max_workers=max_workers)
+        self.executor = self.datastore.executor
+        self.max_workers = max_workers
+
+    @property
+    def location(self) -> str:
+        return self.activity.location
+
+    @property
+    def read_history(self) -> Set[str]:
+        return self.activity.read_history
+
+    @property
+    def write_history(self) -> Set[str]:
+        return self.activity.write_history
+
+    # --- AsyncActivity public interface
+
+    async def read_version(self,
+                           name: str,
+                           version_name: Optional[Union[str, VersionName]] = None,
+                           **kwargs) -> Version:
+        """ Read a version, given its name and version name, see `Activity.read_version`. """
+        return await self._run(self.activity.read_version, name, version_name, **kwargs)
+
+    async def read_artifact(self,
+                            name: str,
+                            version_name: Optional[Union[str, VersionName]] = None,
+                            **kwargs) -> Any:
+        """ Read an artifact given its name and version name, see `Activity.read_artifact`. """
+        version = await self.read_version(name, version_name, **kwargs)
+        return version.artifact
+
+    async def read(self,
+                   name: str,
+                   version_name: Optional[Union[str, VersionName]] = None,
+                   **kwargs) -> Any:
+        """ Read some data given its name and version name, see `Activity.read`. """
+        artifact = await self.read_artifact(name, version_name, **kwargs)
+        return artifact.data
+
+    async def read_many(self,
+                        names: Iterable[Union[str, Tuple[str, Union[str, VersionName]]]],
+                        ) -> List[Any]:
+        """ Read the data in many artifacts concurrently, see `Activity.read_many`.
+
+        The number of concurrent reads is bounded by the executor of the activity.
+        """
+        items = [(item, None) if isinstance(item, str) else tuple(item) for item in names]
+        results = await asyncio.gather(
+            *(self.read(name, version_name) for name, version_name in items),
+            return_exceptions=True,
+        )
+        errors = {index: result for index, result in enumerate(results)
+                  if isinstance(result, Exception)}
+        if errors:
+            results = [None if index in errors else result
+                       for index, result in enumerate(results)]
+            raise BulkOperationFailed(results=results, errors=errors)
+        return results
+
+    async def write(self,
+                    data: DataType,
+                    name: str,
+                    artifact_class: Optional[Type[Artifact]] = None,
+                    format: Optional[str] = None,
+                    version_name: Optional[Union[str, VersionName]] = None,
+                    metadata: Optional[Dict[str, str]] = None,
+                    write_mode: WriteMode = WriteMode.ERROR_IF_EXISTS,
+                    codec: Optional[str] = None,
+                    level: Optional[int] = None,
+                    dedup: DedupMode = DedupMode.NONE,
+                    chunked: bool = False) -> Version:
+        """ Write some data to storage, see `Activity.write`. """
+        return await self._run(
+            self.activity.write,
+            data=data,
+            name=name,
+            artifact_class=artifact_class,
+            format=format,
+            version_name=version_name,
+            metadata=metadata,
+            write_mode=write_mode,
+            codec=codec,
+            level=level,
+            dedup=dedup,
+            chunked=chunked,
+        )
+
+    async def write_many(self,
+                         items: Iterable[Dict[str, Any]],
+                         atomic: bool = False) -> List[Version]:
+        """ Write many artifacts concurrently, see `Activity.write_many`. """
+        return await self._run(
+            self.activity.write_many,
+            items,
+            max_workers=self.max_workers,
+            atomic=atomic,
+        )
+
+    def get_metadata(self) -> MetadataSource:
+        """ Collect activity metadata. """
+        return self.activity.get_metadata()
+
+    def invalidate_cache(self, name: Optional[str] = None) -> None:
+        """ Forget the cached information about artifacts, see `Activity.invalidate_cache`. """
+        self.activity.invalidate_cache(name)
+
+    # --- AsyncActivity private interface
+
+    async def _run(self, func: Callable, *args, **kwargs) -> Any:
+        """ Run a blocking function on the executor, without blocking the event loop. """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
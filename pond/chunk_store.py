@@ -0,0 +1,324 @@
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
+import io
+import posixpath
+from typing import TYPE_CHECKING, Iterator, List, Optional, Set, Tuple
+
+from pond.codecs import Codec, NoneCodec, get_codec
+from pond.conventions import chunk_location, urijoinpath
+from pond.storage.datastore import Datastore
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Bounds and average of the size of the chunks, in bytes (uncompressed)
+DEFAULT_MIN_CHUNK_BYTES = 64 * 1024
+DEFAULT_AVG_CHUNK_BYTES = 256 * 1024
+DEFAULT_MAX_CHUNK_BYTES = 1024 * 1024
+# Maximum number of chunks compressed and written at the same time
+CHUNK_IO_MAX_WORKERS = 16
+# Size of the blocks of data in which boundaries are searched, to bound memory usage
+BOUNDARY_SEARCH_BLOCK_BYTES = 1024 * 1024
+# Number of bytes contributing to the rolling hash
+ROLLING_HASH_WINDOW = 32
+# Extension of the chunk list files, in place of the data files of the versions
+CHUNK_LIST_EXTENSION = '.chunklist'
+CHUNK_LIST_FORMAT_VERSION = 1
+
+
+# numpy is imported on first use, `import pond` does not need it
+@functools.lru_cache(maxsize=None)
+def _gear_table() -> 'np.ndarray':
+    """ Random 32-bit value for each byte value, derived from a hash to be stable forever. """
+    import numpy as np
+    return np.array(
+        [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], 'little') for i in range(256)],
+        dtype=np.uint32,
+    )
+
+
+def _rolling_hash(block: 'np.ndarray') -> 'np.ndarray':
+    """ Gear hash of the `ROLLING_HASH_WINDOW` bytes ending at each position of `block`.
+
+    The hash at position i is `sum(GEAR[block[i - k]] << k for k in range(32))`, modulo 2**32,
+    computed by doubling the window at each step instead of rolling byte by byte.
+    """
+    import numpy as np
+    hashes = np.take(_gear_table(), block)
+    width = 1
+    while width < ROLLING_HASH_WINDOW:
+        # The shifted values are computed in a temporary array before being added
+        hashes[width:] += hashes[:-width] << np.uint32(width)
+        width *= 2
+    return hashes
+
+
+def chunk_boundaries(data, min_size: int = DEFAULT_MIN_CHUNK_BYTES,
+                     avg_size: int = DEFAULT_AVG_CHUNK_BYTES,
+                     max_size: int = DEFAULT_MAX_CHUNK_BYTES) -> List[int]:
+    """ Split a sequence of bytes in content-defined chunks.
+
+    A chunk ends where the rolling hash of the last bytes matches a pattern, so that the
+    boundaries depend on the local content only: inserting or removing bytes in the data moves
+    the boundaries close to the change, and all the other chunks are unchanged.
+
+    Parameters
+    ----------
+    data: bytes-like
+        The data to split.
+    min_size: int
+        Minimum size of the chunks, except the last one.
+    avg_size: int
+        Average distance between boundaries, after the minimum size. Must be a power of 2.
+    max_size: int
+        Maximum size of the chunks.
+
+    Returns
+    -------
+    List[int]
+        The end offset of each chunk, the last one being the size of the data.
+    """
+    if avg_size & (avg_size - 1) or not 0 < min_size <= max_size:
+        raise ValueError('The average chunk size must be a power of 2, and '
+                         '0 < min_size <= max_size')
+    import numpy as np
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    size = len(buffer)
+    bits = avg_size.bit_length() - 1
+    # The high bits of the hash depend on the whole window
+    mask = np.uint32(((1 << bits) - 1) << (32 - bits))
+
+    candidates = []
+    for start in range(0, size, BOUNDARY_SEARCH_BLOCK_BYTES):
+        stop = min(start + BOUNDARY_SEARCH_BLOCK_BYTES, size)
+        overlap = min(start, ROLLING_HASH_WINDOW - 1)
+        hashes = _rolling_hash(buffer[start - overlap:stop])[overlap:]
+        candidates.extend((np.flatnonzero((hashes & mask) == 0) + start + 1).tolist())
+
+    boundaries = []
+    chunk_start = 0
+    for candidate in candidates + [size]:
+        while candidate - chunk_start > max_size:
+            chunk_start += max_size
+            boundaries.append(chunk_start)
+        if candidate - chunk_start >= min_size or (candidate == size and candidate > chunk_start):
+            boundaries.append(candidate)
+            chunk_start = candidate
+    return boundaries
+
+
+class ChunkStore:
+
+    def __init__(self,
+                 datastore: Datastore,
+                 location: str,
+                 codec: Optional[Codec] = None,
+                 min_size: int = DEFAULT_MIN_CHUNK_BYTES,
+                 avg_size: int = DEFAULT_AVG_CHUNK_BYTES,
+                 max_size: int = DEFAULT_MAX_CHUNK_BYTES):
+        """ Stores files as lists of content-defined chunks, each chunk being stored once.
+
+        The data is split with `chunk_boundaries`, and each chunk is stored under `location`,
+        named after the hash of its content. A file is replaced by its list of chunks. Files that
+        differ only in a few places (e.g., successive versions of a large table) share most of
+        their chunks: only the modified chunks are written and stored.
+
+        Chunks are never deleted when a file is deleted: call `collect_garbage` to delete the
+        chunks not referenced by any file.
+
+        Parameters
+        ----------
+        datastore: Datastore
+            Data store where the chunks and the chunk lists are written.
+        location: str
+            Root location of the chunks in the data store.
+        codec: Codec, optional
+            Codec used to compress each chunk. If None, the chunks are not compressed. The same
+            chunk compressed with different codecs is stored once per codec.
+        min_size, avg_size, max_size: int
+            Size of the chunks, see `chunk_boundaries`.
+        """
+        self.datastore = datastore
+        self.location = location
+        self.codec = get_codec(codec)
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+
+    # --- ChunkStore public interface
+
+    def write(self, path: str, data) -> List[Tuple[str, int]]:
+        """ Store a sequence of bytes, as a chunk list file at `path`.
+
+        Only the chunks that are not stored yet are written. The chunk list file is written
+        last, after all its chunks.
+
+        Parameters
+        ----------
+        path: str
+            Path of the chunk list file, relative to the root of the data store.
+        data: bytes-like
+            The data to store.
+
+        Returns
+        -------
+        List[Tuple[str, int]]
+            The chunks of the data: name of the chunk, and uncompressed size.
+        """
+        view = memoryview(data).cast('B')
+        boundaries = chunk_boundaries(view, self.min_size, self.avg_size, self.max_size)
+        starts = [0] + boundaries[:-1]
+        pieces = [view[start:stop] for start, stop in zip(starts, boundaries)]
+        names = [hashlib.sha256(piece).hexdigest() + self.codec.extension for piece in pieces]
+
+        # Identical chunks inside the same data are written once
+        unique_chunks = dict(zip(names, pieces))
+        # The stored chunks are found with a single request, instead of one per chunk
+        stats = self.datastore.stat_many(
+            [self._chunk_location(name) for name in unique_chunks])
+        new_chunks = {name: piece for (name, piece), stat in zip(unique_chunks.items(), stats)
+                      if stat is None}
+        with ThreadPoolExecutor(max_workers=CHUNK_IO_MAX_WORKERS) as executor:
+            list(executor.map(lambda item: self._write_chunk(*item), new_chunks.items()))
+
+        chunks = [(name, len(piece)) for name, piece in zip(names, pieces)]
+        chunk_list = {
+            'format_version': CHUNK_LIST_FORMAT_VERSION,
+            'codec': self.codec.name,
+            'size': len(view),
+            'chunks': [list(chunk) for chunk in chunks],
+        }
+        self.datastore.write_json(path, chunk_list)
+        return chunks
+
+    def open(self, path: str) -> io.BufferedReader:
+        """ Open a chunk list file, as a seekable binary file with the content of the data.
+
+        The chunks are read one at a time, when the file is read.
+
+        Parameters
+        ----------
+        path: str
+            Path of the chunk list file, relative to the root of the data store.
+        """
+        chunk_list = self.datastore.read_json(path)
+        raw = _ChunkReader(self, chunk_list['chunks'], get_codec(chunk_list['codec']))
+        return io.BufferedReader(raw)
+
+    def read(self, path: str) -> bytes:
+        """ Read the data stored as a chunk list file at `path`. """
+        chunk_list = self.datastore.read_json(path)
+        codec = get_codec(chunk_list['codec'])
+        return b''.join(self._read_chunk(name, codec) for name, _ in chunk_list['chunks'])
+
+    def iter_chunks(self, path: str) -> Iterator[bytes]:
+        """ Iterate over the chunks of the data stored as a chunk list file at `path`. """
+        chunk_list = self.datastore.read_json(path)
+        codec = get_codec(chunk_list['codec'])
+        for name, _ in chunk_list['chunks']:
+            yield self._read_chunk(name, codec)
+
+    def referenced_chunks(self, path: str) -> Set[str]:
+        """ Names of the chunks of the chunk list file at `path`. """
+        chunk_list = self.datastore.read_json(path)
+        return {name for name, _ in chunk_list['chunks']}
+
+    def collect_garbage(self, referenced: Set[str]) -> int:
+        """ Delete the chunks that are not referenced.
+
+        This must not run at the same time as writes to the chunk store: a concurrent write
+        could refer to an existing chunk while it is deleted.
+
+        Parameters
+        ----------
+        referenced: Set[str]
+            Names of the chunks to keep, i.e. of all the chunks of all the chunk lists in the
+            chunk store (see `referenced_chunks`).
+
+        Returns
+        -------
+        int
+            Number of deleted chunks.
+        """
+        try:
+            chunk_paths = self.datastore.list(self.location, recursive=True)
+        except FileNotFoundError:
+            return 0
+        n_deleted = 0
+        for chunk_path in chunk_paths:
+            name = posixpath.basename(chunk_path)
+            # Hidden files are temporary files being written
+            if name.startswith('.') or name in referenced:
+                continue
+            self.datastore.delete(urijoinpath(self.location, chunk_path))
+            n_deleted += 1
+        return n_deleted
+
+    # --- ChunkStore private interface
+
+    def _chunk_location(self, name: str) -> str:
+        return chunk_location(self.location, name)
+
+    def _read_chunk(self, name: str, codec: Codec) -> bytes:
+        return codec.decompress(self.datastore.read(self._chunk_location(name)))
+
+    def _write_chunk(self, name: str, piece: memoryview) -> None:
+        # Writes are atomic: concurrent writers of the same chunk write the same content
+        data = piece if isinstance(self.codec, NoneCodec) else self.codec.compress(piece)
+        self.datastore.write(self._chunk_location(name), bytes(data))
+
+
+class _ChunkReader(io.RawIOBase):
+    """ Seekable binary file reading the chunks of a chunk list on demand. """
+
+    def __init__(self, chunk_store: ChunkStore, chunks: List[Tuple[str, int]], codec: Codec):
+        super().__init__()
+        self._chunk_store = chunk_store
+        self._codec = codec
+        self._names = [name for name, _ in chunks]
+        #: Offset of the start of each chunk in the data
+        self._offsets = [0]
+        for _, size in chunks:
+            self._offsets.append(self._offsets[-1] + size)
+        self._position = 0
+        self._current_index = None
+        self._current_chunk = b''
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._offsets[-1] + offset
+        else:
+            raise ValueError(f'Invalid whence ({whence})')
+        if position < 0:
+            raise ValueError(f'Negative seek position {position}')
+        self._position = position
+        return position
+
+    def readinto(self, buffer):
+        if self._position >= self._offsets[-1]:
+            return 0
+        index = bisect_right(self._offsets, self._position) - 1
+        if index != self._current_index:
+            self._current_chunk = self._chunk_store._read_chunk(self._names[index], self._codec)
+            self._current_index = index
+        start = self._position - self._offsets[index]
+        n_bytes = min(len(buffer), len(self._current_chunk) - start)
+        buffer[:n_bytes] = self._current_chunk[start:start + n_bytes]
+        self._position += n_bytes
+        return n_bytes
@@ -0,0 +1,149 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Type, Union
+import zlib
+
+from pond.exceptions import CodecNotFound
+
+
+# Payloads larger than this are compressed with several threads by the zstd codec
+ZSTD_MULTITHREAD_MIN_BYTES = 8 * 1024 * 1024
+
+
+class Codec(ABC):
+    """ Compresses and decompresses the data files of the versions.
+
+    The name of the codec used to write a version is stored in its manifest, so that the version
+    is read with the right codec.
+
+    Parameters
+    ----------
+    level: int, optional
+        Compression level. If None, the default level of the codec is used.
+    """
+
+    #: Name of the codec, stored in the version manifest
+    name: str
+    #: Extension added to the data filename
+    extension: str
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = level
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        pass
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        pass
+
+
+class NoneCodec(Codec):
+    """ No compression. """
+
+    name = 'none'
+    extension = ''
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCodec(Codec):
+    """ zlib compression, from the Python standard library. """
+
+    name = 'zlib'
+    extension = '.zlib'
+
+    def compress(self, data: bytes) -> bytes:
+        level = -1 if self.level is None else self.level
+        return zlib.compress(data, level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCodec(Codec):
+    """ Zstandard compression, fast with a good compression ratio.
+
+    Payloads larger than `ZSTD_MULTITHREAD_MIN_BYTES` are compressed using all CPU cores.
+
+    Requires `zstandard` (`pip install pond[codecs]`).
+    """
+
+    name = 'zstd'
+    extension = '.zst'
+
+    def compress(self, data: bytes) -> bytes:
+        import zstandard
+
+        level = 3 if self.level is None else self.level
+        threads = -1 if len(data) >= ZSTD_MULTITHREAD_MIN_BYTES else 0
+        return zstandard.ZstdCompressor(level=level, threads=threads).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        import zstandard
+
+        # Frames written with multiple threads do not always record the content size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+class Lz4Codec(Codec):
+    """ LZ4 compression, very fast with a lower compression ratio.
+
+    Requires `lz4` (`pip install pond[codecs]`).
+    """
+
+    name = 'lz4'
+    extension = '.lz4'
+
+    def compress(self, data: bytes) -> bytes:
+        import lz4.frame
+
+        level = 0 if self.level is None else self.level
+        return lz4.frame.compress(data, compression_level=level)
+
+    def decompress(self, data: bytes) -> bytes:
+        import lz4.frame
+
+        return lz4.frame.decompress(data)
+
+
+#: Available codecs, by name
+CODECS: Dict[str, Type[Codec]] = {
+    codec_class.name: codec_class for codec_class in [NoneCodec, ZlibCodec, ZstdCodec, Lz4Codec]
+}
+
+
+def get_codec(codec: Optional[Union[str, Codec]], level: Optional[int] = None) -> Codec:
+    """ Get a codec, given its name.
+
+    Parameters
+    ----------
+    codec: str or Codec, optional
+        Name of the codec, e.g. 'zstd'. If None, no compression is used. If a Codec instance is
+        given, it is returned as is.
+    level: int, optional
+        Compression level. If None, the default level of the codec is used.
+
+    Raises
+    ------
+    CodecNotFound
+        If there is no codec with the given name.
+
+    Returns
+    -------
+    Codec
+        The codec.
+    """
+    if isinstance(codec, Codec):
+        return codec
+    if codec is None:
+        codec = NoneCodec.name
+    try:
+        codec_class = CODECS[codec]
+    except KeyError:
+        raise CodecNotFound(codec)
+    return codec_class(level=level)
@@ -1,6 +1,7 @@
 from enum import Enum, unique
 from typing import TypeVar
 
+from pond.exceptions import InvalidVersionName
 from pond.version_name import VersionName
 
 
@@ -17,10 +18,40 @@ class WriteMode(str, Enum):
     ERROR_IF_EXISTS = 'errorifexists'
 
 
+@unique
+class DedupMode(str, Enum):
+    """Deduplication of new versions identical to the latest version"""
+
+    #: New versions are always written
+    NONE = 'none'
+    #: No new version is written, the latest version is returned instead
+    SKIP = 'skip'
+    #: A new version is written, its data file is a link to the data file of the latest version
+    LINK = 'link'
+
+
+@unique
+class ManifestFormat(str, Enum):
+    """File format of the manifests of the versions"""
+
+    #: Human-readable YAML (this is the default)
+    YAML = 'yaml'
+    #: Compact JSON, faster to parse, e.g. for jobs scanning many versions
+    JSON = 'json'
+
+
 MANIFEST_FILENAME = 'manifest.yml'
+JSON_MANIFEST_FILENAME = 'manifest.json'
+VERSIONS_LIST_FILENAME = 'versions.json'
 METADATA_DIRNAME = '_pond'
 TXT_ENCODING = 'utf-8'
-VERSIONS_LOCK_FILENAME = '_VERSIONS_LOCK'
+VERSIONS_INDEX_FILENAME = 'index.json'
+VERSIONS_LOG_FILENAME = 'versions.log'
+LATEST_VERSION_FILENAME = 'latest'
+RESERVED_VERSIONS_DIRNAME = 'reserved'
+STAGING_DIRNAME = 'staging'
+TRASH_DIRNAME = 'trash'
+CHUNKS_DIRNAME = 'chunks'
 
 
 def urijoinpath(*parts: str) -> str:
@@ -37,18 +68,120 @@ def version_location(location: str, version_name: VersionName) -> str:
     return urijoinpath(location, str(version_name))
 
 
-def versions_lock_file_location(location: str) -> str:
-    return urijoinpath(location, METADATA_DIRNAME, VERSIONS_LOCK_FILENAME)
+def versions_index_location(versions_location: str) -> str:
+    """ Index of committed versions, with respect to a versioned artifact root. """
+    return urijoinpath(versions_location, METADATA_DIRNAME, VERSIONS_INDEX_FILENAME)
+
+
+def versions_log_location(versions_location: str) -> str:
+    """ Log of committed versions, with respect to a versioned artifact root. """
+    return urijoinpath(versions_location, METADATA_DIRNAME, VERSIONS_LOG_FILENAME)
+
+
+def latest_version_location(versions_location: str) -> str:
+    """ Pointer to the latest version, with respect to a versioned artifact root. """
+    return urijoinpath(versions_location, METADATA_DIRNAME, LATEST_VERSION_FILENAME)
+
+
+def reservations_location(versions_location: str) -> str:
+    """ Folder of the version name reservations, with respect to a versioned artifact root. """
+    return urijoinpath(versions_location, METADATA_DIRNAME, RESERVED_VERSIONS_DIRNAME)
+
+
+def version_reservation_location(versions_location: str, version_name: VersionName) -> str:
+    """ Marker reserving a version name, with respect to a versioned artifact root. """
+    return urijoinpath(reservations_location(versions_location), str(version_name))
+
+
+def staging_location(versions_location: str) -> str:
+    """ Folder of the staged versions, with respect to a versioned artifact root. """
+    return urijoinpath(versions_location, METADATA_DIRNAME, STAGING_DIRNAME)
+
+
+def version_staging_location(versions_location: str, version_name: VersionName,
+                             token: str) -> str:
+    """ Folder where a version is written before being published.
+
+    `token` makes the location unique for each write of the version.
+    """
+    return urijoinpath(staging_location(versions_location), f'{version_name}.{token}')
+
+
+def trash_location(versions_location: str) -> str:
+    """ Folder of the replaced versions, with respect to a versioned artifact root. """
+    return urijoinpath(versions_location, METADATA_DIRNAME, TRASH_DIRNAME)
+
+
+def version_trash_location(versions_location: str, version_name: VersionName, token: str) -> str:
+    """ Folder where a replaced version is moved before being deleted.
+
+    `token` makes the location unique for each replacement of the version.
+    """
+    return urijoinpath(trash_location(versions_location), f'{version_name}.{token}')
+
+
+def chunk_store_location(versions_location: str) -> str:
+    """ Root of the chunks of the versions stored in chunks, with respect to a versioned artifact
+    root. """
+    return urijoinpath(versions_location, METADATA_DIRNAME, CHUNKS_DIRNAME)
+
+
+def chunk_location(chunk_store_location: str, chunk_name: str) -> str:
+    """ Location of a chunk, in a sub-folder named after the first characters of its name. """
+    return urijoinpath(chunk_store_location, chunk_name[:2], chunk_name)
 
 
 def version_data_location(version_location: str, data_filename: str) -> str:
     return urijoinpath(version_location, data_filename)
 
 
+def is_immutable_location(path: str) -> bool:
+    """ Whether a file never changes once written, according to the storage layout.
+
+    Only the files of published versions, in `<artifact>/<version name>/...` (data files and
+    manifests), and the chunks, in `<artifact>/_pond/chunks/...`, are immutable, unless a version
+    is overwritten. Every other file is mutable: the index of versions, the reservations, the
+    staging and trash folders, the manifest of the versioned artifacts, and any file outside of
+    the storage layout.
+    """
+    parts = path.strip('/').split('/')
+    if METADATA_DIRNAME in parts:
+        metadata_index = parts.index(METADATA_DIRNAME)
+        if parts[metadata_index + 1:metadata_index + 2] == [CHUNKS_DIRNAME]:
+            # <artifact>/_pond/chunks/<prefix>/<chunk name>
+            return metadata_index >= 1 and len(parts) == metadata_index + 4
+    else:
+        metadata_index = len(parts)
+    # The version folder is inside an artifact folder, and outside of the metadata folders
+    for index in range(1, min(metadata_index, len(parts) - 1)):
+        if _is_version_folder_name(parts[index]):
+            version_files = parts[index + 1:]
+            return (METADATA_DIRNAME not in version_files
+                    or version_files in ([METADATA_DIRNAME, MANIFEST_FILENAME],
+                                         [METADATA_DIRNAME, JSON_MANIFEST_FILENAME]))
+    return False
+
+
+def _is_version_folder_name(name: str) -> bool:
+    """ Whether a name is a version name, as written in the names of the version folders. """
+    try:
+        return str(VersionName.from_string(name)) == name
+    except InvalidVersionName:
+        return False
+
+
 #todo: use or remove
-def version_manifest_location(version_location: str) -> str:
+def version_manifest_location(version_location: str,
+                              manifest_format: ManifestFormat = ManifestFormat.YAML) -> str:
     """ Manifest location with respect to a version root. """
-    return urijoinpath(version_location, METADATA_DIRNAME, MANIFEST_FILENAME)
+    return urijoinpath(version_location, METADATA_DIRNAME, manifest_filename(manifest_format))
+
+
+def manifest_filename(manifest_format: ManifestFormat) -> str:
+    """ Filename of the manifests of the versions, its extension identifies the format. """
+    if ManifestFormat(manifest_format) == ManifestFormat.JSON:
+        return JSON_MANIFEST_FILENAME
+    return MANIFEST_FILENAME
 
 
 def version_uri(datastore_id: str, location: str, artifact_name: str, version_name: VersionName):
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import Any, Dict, List, Type
 
 
 class IncompatibleVersionName(Exception):
@@ -14,6 +14,12 @@ class InvalidVersionName(Exception):
         super().__init__(f'Invalid version name: {version_name}.')
 
 
+class InvalidArtifactClass(Exception):
+
+    def __init__(self, class_id: str):
+        super().__init__(f'Invalid artifact class: {class_id}.')
+
+
 class VersionDoesNotExist(Exception):
 
     def __init__(self, artifact_location: str, version_name: str):
@@ -26,6 +32,12 @@ class VersionAlreadyExists(Exception):
         super().__init__(f'Version already exists:  {version_uri}.')
 
 
+class ArtifactHasNoVersion(Exception):
+
+    def __init__(self, artifact_location: str):
+        super().__init__(f'Artifact at "{artifact_location}" has no version.')
+
+
 class ArtifactVersionsIsLocked(Exception):
 
     def __init__(self, artifact_location: str):
@@ -33,6 +45,27 @@ class ArtifactVersionsIsLocked(Exception):
             f'Cannot create the new artifact version "{artifact_location}" because it is locked.')
 
 
+class BulkOperationFailed(Exception):
+
+    def __init__(self, results: List[Any], errors: Dict[int, Exception]):
+        """ Some of the operations in a bulk read or write failed.
+
+        Parameters
+        ----------
+        results: List[Any]
+            Results of the operations, in the order of the inputs. The results of the failed
+            operations are None.
+        errors: Dict[int, Exception]
+            The exceptions raised by the failed operations, by input index.
+        """
+        self.results = results
+        self.errors = errors
+        first_index = min(errors)
+        super().__init__(
+            f'{len(errors)} of {len(results)} operations failed, '
+            f'the first at index {first_index}: {errors[first_index]!r}')
+
+
 class FormatNotFound(Exception):
     def __init__(self, data_class, format):
         super().__init__(
@@ -45,3 +78,8 @@ class ArtifactNotFound(Exception):
         super().__init__(
             f"No artifact compatible with data type '{data_class.__name__}'."
         )
+
+
+class CodecNotFound(Exception):
+    def __init__(self, codec_name):
+        super().__init__(f"Codec '{codec_name}' not found.")
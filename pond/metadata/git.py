@@ -1,11 +1,18 @@
 import os
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import git
 
 from pond.metadata.metadata_source import MetadataSource
 
 
+#: Git metadata collected by this process, by git directory: the files it was read from, their
+#: signature when they were read, and the metadata
+_git_metadata_cache: Dict[str, Tuple[List[str], list, dict]] = {}
+
+BRANCH_REF_PREFIX = 'refs/heads/'
+
+
 def git_repo_name(repo):
     """ Try to infer the name of a git repository.
 
@@ -21,6 +28,48 @@ def git_repo_name(repo):
     return name
 
 
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """ Changes when a file is modified or replaced, None if the file does not exist. """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def read_ref(common_dir: str, ref: str) -> Optional[str]:
+    """ Read the SHA of a ref, e.g. 'refs/heads/main', without running git.
+
+    The ref is read from its loose ref file if it exists, or else from the packed refs.
+
+    Returns
+    -------
+    Optional[str]
+        The SHA, or None if the ref does not exist or is a symbolic ref.
+    """
+    loose_ref = _read_file(os.path.join(common_dir, *ref.split('/')))
+    if loose_ref is not None:
+        sha = loose_ref.strip()
+        return None if sha.startswith('ref:') else sha
+    packed_refs = _read_file(os.path.join(common_dir, 'packed-refs')) or ''
+    for line in packed_refs.splitlines():
+        # Comments, and peeled tags
+        if line.startswith(('#', '^')):
+            continue
+        sha, _, name = line.strip().partition(' ')
+        if name == ref:
+            return sha
+    return None
+
+
 class GitMetadataSource(MetadataSource):
 
     def __init__(self, git_repo: Optional[git.Repo] = None):
@@ -30,6 +79,11 @@ class GitMetadataSource(MetadataSource):
 
         The collected metadata is the current SHA in the repository.
 
+        The metadata is read directly from the files of the repository, and cached by the
+        process until the HEAD, the ref of the current branch, or the configuration of the
+        repository change. GitPython is used instead in the cases not handled directly, e.g. a
+        detached HEAD.
+
         Parameters
         ----------
         git_repo: git.Repo
@@ -49,6 +103,64 @@ class GitMetadataSource(MetadataSource):
         return 'git'
 
     def collect(self):
+        git_dir = getattr(self.repo, 'git_dir', None)
+        if not isinstance(git_dir, str):
+            return self._collect_with_gitpython()
+
+        cached = _git_metadata_cache.get(git_dir)
+        if cached is not None:
+            paths, signature, metadata = cached
+            if [_file_signature(path) for path in paths] == signature:
+                return dict(metadata)
+
+        metadata = self._collect_from_files(git_dir, self.repo.common_dir)
+        if metadata is None:
+            return self._collect_with_gitpython()
+        return dict(metadata)
+
+    # --- GitMetadataSource private interface
+
+    def _collect_from_files(self, git_dir: str, common_dir: str) -> Optional[dict]:
+        """ Read the metadata from the files of the repository, and cache it.
+
+        The signature of each file is taken before reading it: if the file changes afterwards,
+        the signature differs the next time.
+
+        Returns
+        -------
+        Optional[dict]
+            The metadata, or None if the HEAD is not a branch, or its ref cannot be read.
+        """
+        head_path = os.path.join(git_dir, 'HEAD')
+        head_signature = _file_signature(head_path)
+        head = (_read_file(head_path) or '').strip()
+        if not head.startswith('ref:'):
+            return None
+        ref = head[len('ref:'):].strip()
+        if not ref.startswith(BRANCH_REF_PREFIX):
+            return None
+
+        paths = [
+            head_path,
+            os.path.join(common_dir, *ref.split('/')),
+            os.path.join(common_dir, 'packed-refs'),
+            # The "origin" remote
+            os.path.join(common_dir, 'config'),
+        ]
+        signature = [head_signature] + [_file_signature(path) for path in paths[1:]]
+        sha = read_ref(common_dir, ref)
+        if sha is None:
+            return None
+
+        metadata = {
+            'sha': sha,
+            'name': git_repo_name(self.repo),
+            'branch': ref[len(BRANCH_REF_PREFIX):],
+        }
+        _git_metadata_cache[git_dir] = (paths, signature, metadata)
+        return metadata
+
+    def _collect_with_gitpython(self):
         sha = self.repo.head.object.hexsha
         name = git_repo_name(self.repo)
         active_branch_name = self.repo.active_branch.name
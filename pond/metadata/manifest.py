@@ -24,6 +24,24 @@ class Manifest:
         manifest_dict = datastore.read_yaml(manifest_location)
         return cls.from_nested_dict(manifest_dict)
 
+    @classmethod
+    def from_file(cls, manifest_location, datastore):
+        """ Read a manifest, in the format given by the extension of its file.
+
+        Parameters
+        ----------
+        manifest_location: str
+            Location of the manifest in the data store, a JSON file if it ends with '.json',
+            or a YAML file otherwise.
+        datastore: Datastore
+            Data store where the manifest is read.
+        """
+        if manifest_location.endswith('.json'):
+            manifest_dict = datastore.read_json(manifest_location)
+        else:
+            manifest_dict = datastore.read_yaml(manifest_location)
+        return cls.from_nested_dict(manifest_dict)
+
     @classmethod
     def from_nested_dict(cls, manifest_dict: dict):
         manifest = cls()
@@ -39,6 +57,14 @@ class Manifest:
         metadata = self.collect()
         datastore.write_yaml(manifest_location, metadata)
 
+    def to_file(self, manifest_location, datastore):
+        """ Write the manifest, in the format given by the extension of its file (see
+        `from_file`). """
+        if manifest_location.endswith('.json'):
+            datastore.write_json(manifest_location, self.collect())
+        else:
+            self.to_yaml(manifest_location, datastore)
+
     def add_section(self, metadata_source):
         """
 
@@ -0,0 +1,183 @@
+from abc import ABC, abstractmethod
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+import functools
+from typing import Any, Callable, IO, Optional
+
+from pond.conventions import TXT_ENCODING
+from pond.storage.datastore import Datastore
+
+
+# Default maximum number of threads running the blocking data store operations
+DEFAULT_MAX_WORKERS = 32
+
+
+class AsyncFile:
+
+    def __init__(self, open_file: Callable[[], IO[Any]], run: Callable):
+        """ Asynchronous wrapper around a file-like object opened by a data store.
+
+        Use it as an asynchronous context manager:
+
+            async with datastore.open(path, 'rb') as f:
+                data = await f.read()
+
+        Parameters
+        ----------
+        open_file: Callable
+            Function opening the file-like object.
+        run: Callable
+            Coroutine function running a blocking function with its arguments off the event
+            loop, e.g. `ExecutorAsyncDatastore._run`.
+        """
+        self._open_file = open_file
+        self._run = run
+        self._file: Optional[IO[Any]] = None
+
+    async def __aenter__(self) -> 'AsyncFile':
+        self._file = await self._run(self._open_file)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def read(self, size: int = -1) -> Any:
+        return await self._run(self._file.read, size)
+
+    async def write(self, data: Any) -> int:
+        return await self._run(self._file.write, data)
+
+    async def seek(self, offset: int, whence: int = 0) -> int:
+        return await self._run(self._file.seek, offset, whence)
+
+    async def tell(self) -> int:
+        return await self._run(self._file.tell)
+
+    async def close(self) -> None:
+        if self._file is not None:
+            await self._run(self._file.close)
+            self._file = None
+
+
+class AsyncDatastore(ABC):
+    """ Asynchronous interface of a data store, to be used from an asyncio event loop.
+
+    The methods mirror the ones of `Datastore`, as coroutines that do not block the event loop.
+
+    Parameters
+    ----------
+    id: str
+        Unique identifier for the datastore. This is used in the URI for each versioned
+        artifact to uniquely identify the artifact.
+    """
+
+    # -- AsyncDatastore class interface
+
+    def __init__(self, id: str):
+        self.id = id
+
+    # -- Abstract interface
+
+    @abstractmethod
+    def open(self, path: str, mode: str) -> AsyncFile:
+        """ Open an asynchronous file-like object, see `Datastore.open`.
+
+        The returned object is an asynchronous context manager.
+        """
+        pass
+
+    @abstractmethod
+    async def read(self, path: str) -> bytes:
+        """ Read a sequence of bytes from the data store, see `Datastore.read`. """
+        pass
+
+    @abstractmethod
+    async def write(self, path: str, data: bytes) -> None:
+        """ Write a sequence of bytes to the data store, see `Datastore.write`. """
+        pass
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        """ Returns True if the file exists, see `Datastore.exists`. """
+        pass
+
+    @abstractmethod
+    async def delete(self, path: str, recursive: bool = False) -> None:
+        """ Deletes a file or directory, see `Datastore.delete`. """
+        pass
+
+    @abstractmethod
+    async def makedirs(self, path: str) -> None:
+        """ Creates the specified directory if needed, see `Datastore.makedirs`. """
+        pass
+
+    # -- Read/write utility methods
+
+    async def read_string(self, path: str) -> str:
+        """ Read a string from a file, see `Datastore.read_string`. """
+        return (await self.read(path)).decode(TXT_ENCODING)
+
+    async def write_string(self, path: str, content: str) -> None:
+        """ Write a string to a file, see `Datastore.write_string`. """
+        await self.write(path, content.encode(TXT_ENCODING))
+
+
+class ExecutorAsyncDatastore(AsyncDatastore):
+
+    def __init__(self,
+                 datastore: Datastore,
+                 executor: Optional[Executor] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
+        """ Asynchronous adapter of a synchronous data store.
+
+        The blocking operations of the data store run on a bounded thread pool, so that the
+        event loop is free to serve other requests in the meantime.
+
+        Parameters
+        ----------
+        datastore: Datastore
+            The synchronous data store, e.g. a `FileDatastore`.
+        executor: Executor, optional
+            Executor running the blocking operations. It can be shared with other adapters. If
+            None, a `ThreadPoolExecutor` with `max_workers` threads is created.
+        max_workers: int
+            Maximum number of threads, if `executor` is None.
+        """
+        super().__init__(id=datastore.id)
+        self.datastore = datastore
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.executor = executor
+
+    # -- AsyncDatastore interface
+
+    def open(self, path: str, mode: str) -> AsyncFile:
+        return AsyncFile(functools.partial(self.datastore.open, path, mode), self._run)
+
+    async def read(self, path: str) -> bytes:
+        return await self._run(self.datastore.read, path)
+
+    async def write(self, path: str, data: bytes) -> None:
+        await self._run(self.datastore.write, path, data)
+
+    async def exists(self, path: str) -> bool:
+        return await self._run(self.datastore.exists, path)
+
+    async def delete(self, path: str, recursive: bool = False) -> None:
+        await self._run(self.datastore.delete, path, recursive=recursive)
+
+    async def makedirs(self, path: str) -> None:
+        await self._run(self.datastore.makedirs, path)
+
+    async def read_string(self, path: str) -> str:
+        return await self._run(self.datastore.read_string, path)
+
+    async def write_string(self, path: str, content: str) -> None:
+        await self._run(self.datastore.write_string, path, content)
+
+    # -- ExecutorAsyncDatastore private interface
+
+    async def _run(self, func: Callable, *args, **kwargs) -> Any:
+        """ Run a blocking function on the executor, without blocking the event loop. """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,370 @@
+from collections import namedtuple
+import io
+import mmap
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, IO, Iterator, List, Optional, Sequence
+from urllib.parse import quote
+
+from pond.conventions import TXT_ENCODING, is_immutable_location
+from pond.storage.datastore import (
+    Buffer,
+    DEFAULT_STREAM_BUFFER_BYTES,
+    Datastore,
+    FileStat,
+)
+from pond.storage.utils import temporary_path
+
+
+CachingDatastoreStats = namedtuple('CachingDatastoreStats', ['hits', 'misses', 'evictions'])
+
+# Default disk budget of the cache
+DEFAULT_CACHE_MAX_BYTES = 10 * 1024 * 1024 * 1024
+# The total size of the cache is checked each time this fraction of the budget has been added
+EVICTION_CHECK_FRACTION = 0.05
+# Files are evicted until the cache uses this fraction of the budget
+EVICTION_TARGET_FRACTION = 0.9
+# Buffer size used to copy files to the cache
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+def _is_read_mode(mode: str) -> bool:
+    return 'r' in mode and '+' not in mode
+
+
+class CachingDatastore(Datastore):
+    """ Read-through cache of the immutable files of another data store, on a local disk.
+
+    The files of published versions (data files and manifests) and the chunks are immutable
+    (see `pond.conventions.is_immutable_location`): they are copied to the cache directory the
+    first time they are read, and read from there afterwards. When the cache exceeds its disk
+    budget, the least recently read files are evicted.
+
+    The mutable files, e.g. the index of versions, are always read from the wrapped data store,
+    or from a short-lived in-memory cache if `metadata_ttl` is set. All the writes go to the
+    wrapped data store.
+
+    Several processes on the same host can share the cache directory: the files are added to the
+    cache atomically, and the evictions of a process do not break the reads of the others.
+
+    Overwriting a version (`WriteMode.OVERWRITE`) breaks the immutability: the cached version is
+    invalidated when it is overwritten through this data store, but not when it is overwritten
+    by other processes. Use `invalidate` in that case.
+
+    Parameters
+    ----------
+    datastore: Datastore
+        The data store to cache, e.g. a `FileDatastore` on a network file system. The caching
+        data store has the same id, so that the URIs of the versions are unchanged.
+    cache_dir: str
+        Directory of the cache, on a local disk.
+    max_bytes: int
+        Disk budget of the cache directory, in bytes. Files larger than the budget are not
+        cached.
+    metadata_ttl: float
+        Time, in seconds, during which mutable files read from the wrapped data store are kept
+        in memory. The default, 0, reads them from the wrapped data store every time.
+    is_immutable: Callable[[str], bool]
+        Whether a path refers to an immutable file, which can be cached on disk.
+    """
+
+    def __init__(self,
+                 datastore: Datastore,
+                 cache_dir: str,
+                 max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 metadata_ttl: float = 0.0,
+                 is_immutable: Callable[[str], bool] = is_immutable_location):
+        super().__init__(datastore.id)
+        self.datastore = datastore
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.metadata_ttl = metadata_ttl
+        self.is_immutable = is_immutable
+
+        #: Root of the cached files of this data store, in the cache directory
+        self.cache_path = os.path.join(cache_dir, quote(datastore.id, safe=''))
+        os.makedirs(self.cache_path, exist_ok=True)
+        #: Mutable files read recently, as path -> (expiration time, content)
+        self._metadata = {}
+        self._bytes_since_eviction_check = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    # -- Datastore interface
+
+    def open(self, path: str, mode: str) -> IO[Any]:
+        if not _is_read_mode(mode):
+            self.invalidate(path)
+            return self.datastore.open(path, mode)
+        if self.is_immutable(path):
+            local_path = self._fetch(path)
+            if local_path is not None:
+                try:
+                    return open(local_path, mode)
+                except FileNotFoundError:
+                    # Evicted by another process in the meantime
+                    pass
+            return self.datastore.open(path, mode)
+        if self.metadata_ttl > 0:
+            file_ = io.BytesIO(self._read_mutable(path))
+            return file_ if 'b' in mode else io.TextIOWrapper(file_, encoding=TXT_ENCODING)
+        return self.datastore.open(path, mode)
+
+    def read(self, path: str) -> bytes:
+        if self.is_immutable(path):
+            local_path = self._fetch(path)
+            if local_path is not None:
+                try:
+                    with open(local_path, 'rb') as f:
+                        return f.read()
+                except FileNotFoundError:
+                    pass
+            return self.datastore.read(path)
+        return self._read_mutable(path)
+
+    def write(self, path: str, data: bytes) -> None:
+        self.invalidate(path)
+        self.datastore.write(path, data)
+
+    def append(self, path: str, data: bytes) -> int:
+        self.invalidate(path)
+        return self.datastore.append(path, data)
+
+    def rename(self, src: str, dst: str) -> None:
+        self.datastore.rename(src, dst)
+        self.invalidate(src)
+        self.invalidate(dst)
+
+    def link(self, src: str, dst: str) -> None:
+        self.datastore.link(src, dst)
+        self.invalidate(dst)
+
+    def list(self, path: str, recursive: bool = False) -> List[str]:
+        return self.datastore.list(path, recursive=recursive)
+
+    def stat_many(self, paths: Sequence[str]) -> List[Optional[FileStat]]:
+        return self.datastore.stat_many(paths)
+
+    def exists(self, path: str) -> bool:
+        if self.is_immutable(path) and os.path.isfile(self._local_path(path)):
+            return True
+        return self.datastore.exists(path)
+
+    def delete(self, path: str, recursive: bool = False) -> None:
+        self.datastore.delete(path, recursive=recursive)
+        self.invalidate(path)
+
+    def makedirs(self, path: str) -> None:
+        self.datastore.makedirs(path)
+
+    def create_exclusive(self, path: str, data: bytes = b'') -> bool:
+        return self.datastore.create_exclusive(path, data)
+
+    def map(self, path: str) -> Buffer:
+        """ Memory-map a cached immutable file, read-only. Other files are read in memory. """
+        if self.is_immutable(path):
+            local_path = self._fetch(path)
+            if local_path is not None:
+                try:
+                    with open(local_path, 'rb') as f:
+                        if os.fstat(f.fileno()).st_size == 0:
+                            return b''
+                        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except FileNotFoundError:
+                    pass
+            return self.datastore.map(path)
+        return self._read_mutable(path)
+
+    # -- Partial read interface
+
+    def size(self, path: str) -> int:
+        if self.is_immutable(path):
+            try:
+                return os.stat(self._local_path(path)).st_size
+            except FileNotFoundError:
+                pass
+        return self.datastore.size(path)
+
+    def read_range(self, path: str, offset: int, length: Optional[int] = None) -> bytes:
+        """ Read a range of bytes, from the cache if the file is cached.
+
+        Files that are not cached yet are not added to the cache: only the range is read from
+        the wrapped data store.
+        """
+        if self.is_immutable(path):
+            local_path = self._local_path(path)
+            try:
+                with open(local_path, 'rb') as f:
+                    if offset < 0:
+                        f.seek(max(f.seek(0, io.SEEK_END) + offset, 0))
+                    else:
+                        f.seek(offset)
+                    data = f.read(-1 if length is None else length)
+            except FileNotFoundError:
+                pass
+            else:
+                with self._lock:
+                    self._hits += 1
+                return data
+        return self.datastore.read_range(path, offset, length)
+
+    def stream(self, path: str, buffer_size: int = DEFAULT_STREAM_BUFFER_BYTES
+               ) -> Iterator[bytes]:
+        if self.is_immutable(path):
+            local_path = self._fetch(path)
+            if local_path is not None:
+                try:
+                    f = open(local_path, 'rb', buffering=0)
+                except FileNotFoundError:
+                    pass
+                else:
+                    with f:
+                        while True:
+                            block = f.read(buffer_size)
+                            if not block:
+                                return
+                            yield block
+        yield from self.datastore.stream(path, buffer_size)
+
+    # -- CachingDatastore public interface
+
+    def invalidate(self, path: str) -> None:
+        """ Remove a file, or all the files in a directory, from the cache.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        """
+        prefix = path.rstrip('/') + '/'
+        with self._lock:
+            for cached_path in list(self._metadata):
+                if cached_path == path or cached_path.startswith(prefix):
+                    del self._metadata[cached_path]
+        local_path = self._local_path(path)
+        if os.path.isdir(local_path):
+            shutil.rmtree(local_path, ignore_errors=True)
+        else:
+            try:
+                os.remove(local_path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        """ Remove all the files of this data store from the cache. """
+        with self._lock:
+            self._metadata.clear()
+        shutil.rmtree(self.cache_path, ignore_errors=True)
+        os.makedirs(self.cache_path, exist_ok=True)
+
+    def stats(self) -> CachingDatastoreStats:
+        """ Cache statistics of this process: hits, misses, and evictions of immutable files. """
+        with self._lock:
+            return CachingDatastoreStats(
+                hits=self._hits, misses=self._misses, evictions=self._evictions)
+
+    # -- CachingDatastore private interface
+
+    def _local_path(self, path: str) -> str:
+        return os.path.join(self.cache_path, *path.strip('/').split('/'))
+
+    def _fetch(self, path: str) -> Optional[str]:
+        """ Copy a file to the cache if needed, and return its local path.
+
+        Returns None if the file is too large to be cached.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist in the wrapped data store.
+        """
+        local_path = self._local_path(path)
+        try:
+            # The modification time of the cached files is their last access time
+            os.utime(local_path)
+        except FileNotFoundError:
+            pass
+        else:
+            with self._lock:
+                self._hits += 1
+            return local_path
+
+        with self._lock:
+            self._misses += 1
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        tmp_path = temporary_path(local_path)
+        try:
+            with self.datastore.open(path, 'rb') as source, open(tmp_path, 'xb') as target:
+                shutil.copyfileobj(source, target, COPY_BUFFER_BYTES)
+                size = target.tell()
+            if size > self.max_bytes:
+                os.remove(tmp_path)
+                return None
+            os.replace(tmp_path, local_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._bytes_since_eviction_check += size
+            check = self._bytes_since_eviction_check >= self.max_bytes * EVICTION_CHECK_FRACTION
+            if check:
+                self._bytes_since_eviction_check = 0
+        if check:
+            self._evict()
+        return local_path
+
+    def _evict(self) -> None:
+        """ Delete the least recently read files, if the cache directory exceeds its budget.
+
+        All the files in the cache directory are considered, including the ones added by other
+        processes and other data stores.
+        """
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                # Hidden files are temporary files being written
+                if name.startswith('.'):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, file_path))
+
+        total_bytes = sum(size for _, size, _ in files)
+        if total_bytes <= self.max_bytes:
+            return
+        target_bytes = self.max_bytes * EVICTION_TARGET_FRACTION
+        n_evictions = 0
+        for _, size, file_path in sorted(files):
+            if total_bytes <= target_bytes:
+                break
+            try:
+                os.remove(file_path)
+                n_evictions += 1
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+        with self._lock:
+            self._evictions += n_evictions
+
+    def _read_mutable(self, path: str) -> bytes:
+        """ Read a mutable file, from the in-memory cache if it has not expired. """
+        if self.metadata_ttl <= 0:
+            return self.datastore.read(path)
+        now = time.monotonic()
+        with self._lock:
+            item = self._metadata.get(path)
+        if item is not None and item[0] > now:
+            return item[1]
+        data = self.datastore.read(path)
+        with self._lock:
+            self._metadata[path] = (now + self.metadata_ttl, data)
+        return data
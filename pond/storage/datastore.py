@@ -1,11 +1,26 @@
 from abc import ABC, abstractmethod
+from collections import namedtuple
+import io
 import json
-from typing import Any, IO
+import mmap
+import posixpath
+from typing import Any, IO, Iterator, List, Optional, Sequence, Union
 
 from pond.conventions import TXT_ENCODING
 from pond.yaml import yaml_dump, yaml_load
 
 
+#: Objects supporting the buffer protocol, returned by `Datastore.map`
+Buffer = Union[bytes, memoryview, mmap.mmap]
+
+#: Information about a file, returned by `Datastore.stat_many`. `mtime` is the modification
+#: time in seconds since the epoch, or None if the data store does not know it.
+FileStat = namedtuple('FileStat', ['size', 'mtime', 'is_dir'])
+
+# Default size of the blocks returned by `Datastore.stream`
+DEFAULT_STREAM_BUFFER_BYTES = 1024 * 1024
+
+
 class Datastore(ABC):
     """ Versioned storage for the artifacts.
 
@@ -122,6 +137,283 @@ class Datastore(ABC):
         """
         ...
 
+    def append(self, path: str, data: bytes) -> int:
+        """ Append a sequence of bytes at the end of a file.
+
+        The file is created if it does not exist. Concrete datastores should override this method
+        so that concurrent appends of small records are not interleaved.
+
+        Intermediate directories that do not exist will be created.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        data: bytes
+            Sequence of bytes to append at `path`.
+
+        Returns
+        -------
+        int
+            The size of the file just after `data` has been appended.
+        """
+        self.makedirs(posixpath.dirname(path))
+        with self.open(path, 'ab') as f:
+            f.write(data)
+            return f.tell()
+
+    def rename(self, src: str, dst: str) -> None:
+        """ Rename a file or a directory.
+
+        Versions are written in a staging directory, and renamed to their final location to be
+        published. Concrete datastores should implement the renaming atomically, so that readers
+        never see a partially written version. Data stores that do not support renaming raise
+        NotImplementedError, which is the default: the files of the versions are then copied
+        and deleted, which is not atomic.
+
+        Intermediate directories of `dst` that do not exist will be created.
+
+        Parameters
+        ----------
+        src: str
+            Path relative to the root of the data store, of the file or directory to rename.
+        dst: str
+            Path relative to the root of the data store, of the new name.
+
+        Raises
+        ------
+        FileNotFoundError
+            If `src` does not exist.
+        FileExistsError
+            If `dst` already exists.
+        NotImplementedError
+            If the data store does not support renaming.
+        """
+        raise NotImplementedError(f'{self.__class__.__name__} does not support renaming')
+
+    def link(self, src: str, dst: str) -> None:
+        """ Create a new name for an existing file, without copying its content (a hard link).
+
+        This is used to store identical versions only once. Data stores that do not support
+        links raise NotImplementedError, which is the default.
+
+        Intermediate directories of `dst` that do not exist will be created.
+
+        Parameters
+        ----------
+        src: str
+            Path relative to the root of the data store, of the existing file.
+        dst: str
+            Path relative to the root of the data store, of the new name.
+
+        Raises
+        ------
+        FileNotFoundError
+            If `src` does not exist.
+        FileExistsError
+            If `dst` already exists.
+        NotImplementedError
+            If the data store does not support links.
+        """
+        raise NotImplementedError(f'{self.__class__.__name__} does not support links')
+
+    # -- Listing interface
+
+    def list(self, path: str, recursive: bool = False) -> List[str]:
+        """ List the content of a directory.
+
+        Data stores that do not support listing raise NotImplementedError, which is the default.
+        Versions can still be written and replaced, but some maintenance operations are not
+        supported, e.g. the garbage collection of chunks.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store, of the directory.
+        recursive: bool
+            If False, the names of the files and directories in the directory are listed. If
+            True, the paths of all the files under the directory, at any depth, are listed,
+            relative to the directory (e.g. "v1/_pond/manifest.yml").
+
+        Returns
+        -------
+        List[str]
+            The names or relative paths, in arbitrary order.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the directory does not exist.
+        NotImplementedError
+            If the data store does not support listing.
+        """
+        raise NotImplementedError(f'{self.__class__.__name__} does not support listing')
+
+    def stat_many(self, paths: Sequence[str]) -> List[Optional[FileStat]]:
+        """ Get the size and modification time of many files at once.
+
+        Data stores should override this method to get the information in as few requests as
+        possible. The default implementation gets the size of each file with `size`, and does
+        not know the modification times.
+
+        Parameters
+        ----------
+        paths: Sequence[str]
+            Paths relative to the root of the data store.
+
+        Returns
+        -------
+        List[Optional[FileStat]]
+            The information about each path, in the same order as `paths`, or None for the paths
+            that do not exist.
+        """
+        stats = []
+        for path in paths:
+            try:
+                stats.append(FileStat(size=self.size(path), mtime=None, is_dir=False))
+            except IsADirectoryError:
+                stats.append(FileStat(size=0, mtime=None, is_dir=True))
+            except FileNotFoundError:
+                stats.append(None)
+        return stats
+
+    # -- Concurrency interface
+
+    def create_exclusive(self, path: str, data: bytes = b'') -> bool:
+        """ Create a file, only if it does not exist yet.
+
+        This is used to reserve names (e.g., new version names) when several processes write to
+        the same location. Concrete datastores should override this method with an atomic
+        implementation, so that exactly one of several concurrent calls on the same path succeeds.
+        The default implementation checks and writes in two separate steps, and is not safe in
+        case of concurrency.
+
+        Intermediate directories that do not exist will be created.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        data: bytes
+            Sequence of bytes to write at `path`, if the file is created.
+
+        Returns
+        -------
+        bool
+            True if the file has been created, False if it already existed.
+        """
+        if self.exists(path):
+            return False
+        self.write(path, data)
+        return True
+
+    # -- Zero-copy interface
+
+    def map(self, path: str) -> Buffer:
+        """ Map the content of a file in memory, read-only.
+
+        Data stores on a local file system should override this method to memory-map the file,
+        so that its content is loaded lazily, and shared through the page cache by all the
+        processes reading it. The default implementation reads the whole file.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+
+        Returns
+        -------
+        Buffer
+            A read-only object supporting the buffer protocol, e.g. `mmap.mmap` or `bytes`.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist.
+        """
+        return self.read(path)
+
+    # -- Partial read interface
+
+    def size(self, path: str) -> int:
+        """ Size of a file, in bytes.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+
+        Returns
+        -------
+        int
+            The size of the file.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist.
+        """
+        with self.open(path, 'rb') as f:
+            return f.seek(0, io.SEEK_END)
+
+    def read_range(self, path: str, offset: int, length: Optional[int] = None) -> bytes:
+        """ Read a range of bytes from a file, without reading the whole file.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        offset: int
+            Position of the first byte to read. If negative, it is counted from the end of the
+            file, e.g. -8 to read the last 8 bytes.
+        length: int, optional
+            Maximum number of bytes to read. If None, the file is read until its end.
+
+        Returns
+        -------
+        bytes
+            The bytes read, shorter than `length` if the end of the file is reached.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist.
+        """
+        with self.open(path, 'rb') as f:
+            if offset < 0:
+                f.seek(max(f.seek(0, io.SEEK_END) + offset, 0))
+            else:
+                f.seek(offset)
+            return f.read(-1 if length is None else length)
+
+    def stream(self, path: str, buffer_size: int = DEFAULT_STREAM_BUFFER_BYTES
+               ) -> Iterator[bytes]:
+        """ Read a file as a sequence of blocks, without holding the whole file in memory.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        buffer_size: int
+            Maximum size of the blocks, in bytes.
+
+        Returns
+        -------
+        Iterator[bytes]
+            The content of the file, in blocks of at most `buffer_size` bytes.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist.
+        """
+        with self.open(path, 'rb') as f:
+            while True:
+                block = f.read(buffer_size)
+                if not block:
+                    return
+                yield block
+
     # -- Read/write utility methods
 
     def read_string(self, path: str) -> str:
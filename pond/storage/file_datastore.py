@@ -1,8 +1,19 @@
+from collections import defaultdict
+import errno
+import mmap
 import os
+import posixpath
+import stat as stat_module
 from shutil import rmtree
-from typing import Any, IO
+from typing import Any, IO, Iterator, List, Optional, Sequence
 
-from pond.storage.datastore import Datastore
+from pond.storage.datastore import Buffer, DEFAULT_STREAM_BUFFER_BYTES, Datastore, FileStat
+from pond.storage.utils import temporary_path
+
+
+def _file_stat(stat: os.stat_result) -> FileStat:
+    return FileStat(
+        size=stat.st_size, mtime=stat.st_mtime, is_dir=stat_module.S_ISDIR(stat.st_mode))
 
 
 class FileDatastore(Datastore):
@@ -45,9 +56,230 @@ class FileDatastore(Datastore):
         return data
 
     def write(self, path: str, data: bytes) -> None:
+        """ Write a sequence of bytes to the data store.
+
+        The bytes are written to a temporary file, which then atomically replaces `path`. Readers
+        see either the previous content or the new one, never a partially written file.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        data: bytes
+            Sequence of bytes to write at `path`.
+        """
         self.makedirs(os.path.dirname(path))
-        with self.open(path, 'wb') as f:
-            f.write(data)
+        complete_path = os.path.join(self.base_path, path)
+        tmp_path = temporary_path(complete_path)
+        fd = os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, complete_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def append(self, path: str, data: bytes) -> int:
+        """ Append a sequence of bytes at the end of a file.
+
+        The file is opened with `O_APPEND` and `data` is written with a single system call, so
+        that concurrent appends of small records are not interleaved on local file systems.
+
+        Intermediate directories that do not exist will be created.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        data: bytes
+            Sequence of bytes to append at `path`.
+
+        Returns
+        -------
+        int
+            The size of the file just after `data` has been appended.
+        """
+        complete_path = os.path.join(self.base_path, path)
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        try:
+            fd = os.open(complete_path, flags, 0o666)
+        except FileNotFoundError:
+            self.makedirs(os.path.dirname(path))
+            fd = os.open(complete_path, flags, 0o666)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            return os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+
+    def rename(self, src: str, dst: str) -> None:
+        """ Rename a file or a directory.
+
+        The renaming is atomic if `src` and `dst` are on the same file system. Files are renamed
+        by creating a hard link, which fails if `dst` exists, and then deleting `src`. Like
+        `os.rename`, a directory replaces an existing empty directory `dst`.
+
+        Intermediate directories of `dst` that do not exist will be created.
+
+        Parameters
+        ----------
+        src: str
+            Path relative to the root of the data store, of the file or directory to rename.
+        dst: str
+            Path relative to the root of the data store, of the new name.
+
+        Raises
+        ------
+        FileNotFoundError
+            If `src` does not exist.
+        FileExistsError
+            If `dst` already exists.
+        """
+        complete_src = os.path.join(self.base_path, src)
+        complete_dst = os.path.join(self.base_path, dst)
+        self.makedirs(os.path.dirname(dst))
+        if not os.path.isdir(complete_src):
+            # `os.rename` would replace an existing file, a hard link cannot
+            try:
+                os.link(complete_src, complete_dst)
+            except FileExistsError:
+                raise FileExistsError(f'Cannot rename {src}, {dst} already exists')
+            except FileNotFoundError:
+                raise
+            except OSError:
+                # The file system does not support hard links
+                if os.path.exists(complete_dst):
+                    raise FileExistsError(f'Cannot rename {src}, {dst} already exists')
+                os.rename(complete_src, complete_dst)
+            else:
+                os.unlink(complete_src)
+            return
+        try:
+            os.rename(complete_src, complete_dst)
+        except OSError as error:
+            if error.errno in (errno.EEXIST, errno.ENOTEMPTY):
+                raise FileExistsError(f'Cannot rename {src}, {dst} already exists') from error
+            raise
+
+    def link(self, src: str, dst: str) -> None:
+        """ Create a hard link to an existing file.
+
+        Intermediate directories of `dst` that do not exist will be created.
+
+        Parameters
+        ----------
+        src: str
+            Path relative to the root of the data store, of the existing file.
+        dst: str
+            Path relative to the root of the data store, of the new name.
+
+        Raises
+        ------
+        FileNotFoundError
+            If `src` does not exist.
+        FileExistsError
+            If `dst` already exists.
+        OSError
+            If the file system does not support hard links, e.g. across devices.
+        """
+        self.makedirs(os.path.dirname(dst))
+        os.link(os.path.join(self.base_path, src), os.path.join(self.base_path, dst))
+
+    # -- Listing interface
+
+    def list(self, path: str, recursive: bool = False) -> List[str]:
+        """ List the content of a directory, with `os.scandir`.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store, of the directory.
+        recursive: bool
+            If False, the names of the files and directories in the directory are listed. If
+            True, the paths of all the files under the directory, at any depth, are listed,
+            relative to the directory.
+
+        Returns
+        -------
+        List[str]
+            The names or relative paths, in arbitrary order.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the directory does not exist.
+        """
+        complete_path = os.path.join(self.base_path, path)
+        if not recursive:
+            with os.scandir(complete_path) as entries:
+                return [entry.name for entry in entries]
+
+        names = []
+        directories = ['']
+        while directories:
+            directory = directories.pop()
+            with os.scandir(os.path.join(complete_path, directory)) as entries:
+                for entry in entries:
+                    name = posixpath.join(directory, entry.name)
+                    # The entry type usually comes with the listing, without another system call
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(name)
+                    else:
+                        names.append(name)
+        return names
+
+    def stat_many(self, paths: Sequence[str]) -> List[Optional[FileStat]]:
+        """ Get the size and modification time of many files at once.
+
+        The paths in the same directory are looked up in a single listing of the directory with
+        `os.scandir`, instead of one `stat` call per path, some of which fail.
+
+        Parameters
+        ----------
+        paths: Sequence[str]
+            Paths relative to the root of the data store.
+
+        Returns
+        -------
+        List[Optional[FileStat]]
+            The information about each path, in the same order as `paths`, or None for the paths
+            that do not exist.
+        """
+        stats: List[Optional[FileStat]] = [None] * len(paths)
+        by_directory = defaultdict(lambda: defaultdict(list))
+        for index, path in enumerate(paths):
+            directory, name = posixpath.split(path.rstrip('/'))
+            by_directory[directory][name].append(index)
+
+        for directory, indices_by_name in by_directory.items():
+            complete_directory = os.path.join(self.base_path, directory)
+            if len(indices_by_name) == 1:
+                (name, indices), = indices_by_name.items()
+                try:
+                    stat = os.stat(os.path.join(complete_directory, name))
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+                for index in indices:
+                    stats[index] = _file_stat(stat)
+                continue
+            try:
+                with os.scandir(complete_directory) as entries:
+                    for entry in entries:
+                        indices = indices_by_name.get(entry.name)
+                        if indices is None:
+                            continue
+                        try:
+                            file_stat = _file_stat(entry.stat())
+                        except FileNotFoundError:
+                            continue
+                        for index in indices:
+                            stats[index] = file_stat
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        return stats
 
     def exists(self, path: str) -> bool:
         """ Returns True if the file exists.
@@ -85,3 +317,159 @@ class FileDatastore(Datastore):
         """
         complete_path = os.path.join(self.base_path, path)
         os.makedirs(complete_path, exist_ok=True)
+
+    # -- Concurrency interface
+
+    def create_exclusive(self, path: str, data: bytes = b'') -> bool:
+        """ Create a file, only if it does not exist yet.
+
+        The file is created atomically with `O_CREAT | O_EXCL`, so that exactly one of several
+        concurrent calls on the same path succeeds.
+
+        Intermediate directories that do not exist will be created.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        data: bytes
+            Sequence of bytes to write at `path`, if the file is created.
+
+        Returns
+        -------
+        bool
+            True if the file has been created, False if it already existed.
+        """
+        self.makedirs(os.path.dirname(path))
+        complete_path = os.path.join(self.base_path, path)
+        try:
+            fd = os.open(complete_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return True
+
+    # -- Zero-copy interface
+
+    def map(self, path: str) -> Buffer:
+        """ Memory-map a file, read-only.
+
+        The content of the file is loaded lazily, and shared through the page cache by all the
+        processes mapping it.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+
+        Returns
+        -------
+        Buffer
+            The memory-mapped file, or `b''` for an empty file (which cannot be mapped).
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist.
+        """
+        with self.open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # -- Partial read interface
+
+    def size(self, path: str) -> int:
+        """ Size of a file, in bytes.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+
+        Returns
+        -------
+        int
+            The size of the file.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist.
+        """
+        return os.stat(os.path.join(self.base_path, path)).st_size
+
+    def read_range(self, path: str, offset: int, length: Optional[int] = None) -> bytes:
+        """ Read a range of bytes from a file, with `pread`.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        offset: int
+            Position of the first byte to read. If negative, it is counted from the end of the
+            file.
+        length: int, optional
+            Maximum number of bytes to read. If None, the file is read until its end.
+
+        Returns
+        -------
+        bytes
+            The bytes read, shorter than `length` if the end of the file is reached.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist.
+        """
+        fd = os.open(os.path.join(self.base_path, path), os.O_RDONLY)
+        try:
+            if offset < 0 or length is None:
+                file_size = os.fstat(fd).st_size
+                if offset < 0:
+                    offset = max(file_size + offset, 0)
+                if length is None:
+                    length = max(file_size - offset, 0)
+            blocks = []
+            while length > 0:
+                block = os.pread(fd, length, offset)
+                if not block:
+                    break
+                blocks.append(block)
+                offset += len(block)
+                length -= len(block)
+        finally:
+            os.close(fd)
+        return blocks[0] if len(blocks) == 1 else b''.join(blocks)
+
+    def stream(self, path: str, buffer_size: int = DEFAULT_STREAM_BUFFER_BYTES
+               ) -> Iterator[bytes]:
+        """ Read a file as a sequence of blocks, without holding the whole file in memory.
+
+        The file is read without intermediate buffering: each block is read directly into a new
+        bytes object.
+
+        Parameters
+        ----------
+        path: str
+            Path relative to the root of the data store.
+        buffer_size: int
+            Maximum size of the blocks, in bytes.
+
+        Returns
+        -------
+        Iterator[bytes]
+            The content of the file, in blocks of at most `buffer_size` bytes.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist.
+        """
+        with open(os.path.join(self.base_path, path), 'rb', buffering=0) as f:
+            while True:
+                block = f.read(buffer_size)
+                if not block:
+                    return
+                yield block
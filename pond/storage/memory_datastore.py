@@ -0,0 +1,335 @@
+import io
+import threading
+import time
+from typing import Any, Dict, IO, Iterator, List, Optional, Sequence, Set, Union
+
+from pond.conventions import TXT_ENCODING
+from pond.storage.datastore import Buffer, DEFAULT_STREAM_BUFFER_BYTES, Datastore, FileStat
+from pond.storage.utils import MemoryFile, normalize_path
+
+
+class MemoryDatastore(Datastore):
+    """ Datastore keeping all the files in memory.
+
+    Nothing is written to disk, which makes it fast and free of side effects: use it in tests,
+    benchmarks, and pipelines whose intermediate artifacts do not need to be kept. Use
+    `flush` to copy the files to another data store, e.g. to keep the final artifacts of a
+    pipeline, and `snapshot` to save the current state.
+
+    The content of the files is stored as immutable `bytes`: reading a file (`read`, `open`, or
+    `map`) does not copy it. Files opened for writing are stored when they are closed. Files
+    grown with `append` are stored in a `bytearray` instead, so that appending does not copy
+    them: reading them copies their content.
+
+    The directories keep an index of their entries, so that listing, renaming, and deleting a
+    directory costs in proportion to its content, not to the number of files in the data store.
+
+    The data store is thread-safe. All operations, including `rename` and `create_exclusive`,
+    are atomic.
+
+    Parameters
+    ----------
+    id: str
+        Unique identifier for the datastore. This is used in the URI for each versioned
+        artifact to uniquely identify the artifact.
+    """
+
+    def __init__(self, id: str):
+        super().__init__(id)
+        self._files: Dict[str, Union[bytes, bytearray]] = {}
+        #: Modification time of the files
+        self._mtimes: Dict[str, float] = {}
+        #: Paths of the direct entries (files and directories) of each directory
+        self._dirs: Dict[str, Set[str]] = {'': set()}
+        self._lock = threading.RLock()
+
+    # -- Datastore interface
+
+    def open(self, path: str, mode: str) -> IO[Any]:
+        path = normalize_path(path)
+        if 'r' in mode:
+            data = self.read(path)
+            if '+' in mode:
+                file_ = MemoryFile(self, path, data)
+            else:
+                # BytesIO shares the immutable bytes until they are modified
+                file_ = io.BytesIO(data)
+        elif 'w' in mode:
+            file_ = MemoryFile(self, path)
+        elif 'a' in mode:
+            with self._lock:
+                data = bytes(self._files.get(path, b''))
+            file_ = MemoryFile(self, path, data, append=True)
+        elif 'x' in mode:
+            if self.exists(path):
+                raise FileExistsError(f'File exists: {path}')
+            file_ = MemoryFile(self, path)
+        else:
+            raise ValueError(f'Invalid mode: {mode}')
+        if 'b' not in mode:
+            file_ = io.TextIOWrapper(file_, encoding=TXT_ENCODING)
+        return file_
+
+    def read(self, path: str) -> bytes:
+        path = normalize_path(path)
+        with self._lock:
+            data = self._content(path)
+            # A growing file is copied, the buffer changes with the next append
+            return bytes(data) if isinstance(data, bytearray) else data
+
+    def write(self, path: str, data: bytes) -> None:
+        path = normalize_path(path)
+        # Bytes are immutable, and stored as is. Other buffers are copied.
+        data = bytes(data)
+        with self._lock:
+            if path in self._dirs:
+                raise IsADirectoryError(f'Is a directory: {path}')
+            self._add_entry(path)
+            self._files[path] = data
+            self._mtimes[path] = time.time()
+
+    def append(self, path: str, data: bytes) -> int:
+        path = normalize_path(path)
+        with self._lock:
+            buffer = self._files.get(path)
+            if not isinstance(buffer, bytearray):
+                if path in self._dirs:
+                    raise IsADirectoryError(f'Is a directory: {path}')
+                # Copied once, and then grown in place
+                buffer = bytearray(buffer or b'')
+                self._add_entry(path)
+                self._files[path] = buffer
+            buffer += data
+            self._mtimes[path] = time.time()
+            return len(buffer)
+
+    def rename(self, src: str, dst: str) -> None:
+        src = normalize_path(src)
+        dst = normalize_path(dst)
+        with self._lock:
+            if self._exists(dst):
+                raise FileExistsError(f'Cannot rename {src}, {dst} already exists')
+            if src in self._files:
+                self._remove_entry(src)
+                self._add_entry(dst)
+                self._files[dst] = self._files.pop(src)
+                self._mtimes[dst] = self._mtimes.pop(src)
+            elif src in self._dirs:
+                descendants = self._descendants(src)
+                self._remove_entry(src)
+                self._add_entry(dst)
+
+                def renamed(path):
+                    return dst + path[len(src):]
+
+                for path in [src] + descendants:
+                    if path in self._files:
+                        self._files[renamed(path)] = self._files.pop(path)
+                        self._mtimes[renamed(path)] = self._mtimes.pop(path)
+                    else:
+                        self._dirs[renamed(path)] = {
+                            renamed(entry) for entry in self._dirs.pop(path)}
+            else:
+                raise FileNotFoundError(f'No such file or directory: {src}')
+
+    def link(self, src: str, dst: str) -> None:
+        """ Create a new name for an existing file, sharing its content. """
+        src = normalize_path(src)
+        dst = normalize_path(dst)
+        with self._lock:
+            if self._exists(dst):
+                raise FileExistsError(f'Cannot link {src}, {dst} already exists')
+            self.write(dst, self.read(src))
+
+    def list(self, path: str, recursive: bool = False) -> List[str]:
+        path = normalize_path(path)
+        prefix = path + '/' if path else ''
+        with self._lock:
+            if path not in self._dirs:
+                raise FileNotFoundError(f'No such directory: {path}')
+            if recursive:
+                return [child[len(prefix):] for child in self._descendants(path)
+                        if child in self._files]
+            return [child[len(prefix):] for child in self._dirs[path]]
+
+    def stat_many(self, paths: Sequence[str]) -> List[Optional[FileStat]]:
+        stats = []
+        with self._lock:
+            for path in paths:
+                path = normalize_path(path)
+                if path in self._files:
+                    stats.append(FileStat(
+                        size=len(self._files[path]), mtime=self._mtimes[path], is_dir=False))
+                elif path in self._dirs:
+                    stats.append(FileStat(size=0, mtime=None, is_dir=True))
+                else:
+                    stats.append(None)
+        return stats
+
+    def exists(self, path: str) -> bool:
+        with self._lock:
+            return self._exists(normalize_path(path))
+
+    def delete(self, path: str, recursive: bool = False) -> None:
+        path = normalize_path(path)
+        with self._lock:
+            if path in self._files:
+                self._remove_entry(path)
+                del self._files[path]
+                del self._mtimes[path]
+            elif path in self._dirs:
+                if not recursive:
+                    raise IsADirectoryError(f'Is a directory: {path}')
+                for child in self._descendants(path):
+                    if child in self._files:
+                        del self._files[child]
+                        del self._mtimes[child]
+                    else:
+                        del self._dirs[child]
+                if path:
+                    self._remove_entry(path)
+                    del self._dirs[path]
+                else:
+                    self._dirs[path] = set()
+
+    def makedirs(self, path: str) -> None:
+        path = normalize_path(path)
+        with self._lock:
+            if path in self._files:
+                raise FileExistsError(f'File exists: {path}')
+            self._dirs.setdefault(path, set())
+            self._add_entry(path)
+
+    # -- Concurrency interface
+
+    def create_exclusive(self, path: str, data: bytes = b'') -> bool:
+        path = normalize_path(path)
+        with self._lock:
+            if self._exists(path):
+                return False
+            self.write(path, data)
+            return True
+
+    # -- Zero-copy interface
+
+    def map(self, path: str) -> Buffer:
+        """ A read-only view on the content of a file, without copying it.
+
+        Files grown with `append` are copied.
+        """
+        return memoryview(self.read(path))
+
+    # -- Partial read interface
+
+    def size(self, path: str) -> int:
+        path = normalize_path(path)
+        with self._lock:
+            return len(self._content(path))
+
+    def read_range(self, path: str, offset: int, length: Optional[int] = None) -> bytes:
+        path = normalize_path(path)
+        with self._lock:
+            data = self._content(path)
+            if offset < 0:
+                offset = max(len(data) + offset, 0)
+            stop = len(data) if length is None else offset + length
+            # Only the range is copied
+            if isinstance(data, bytearray):
+                return bytes(data[offset:stop])
+            return bytes(memoryview(data)[offset:stop])
+
+    def stream(self, path: str, buffer_size: int = DEFAULT_STREAM_BUFFER_BYTES
+               ) -> Iterator[bytes]:
+        view = memoryview(self.read(path))
+        for offset in range(0, len(view), buffer_size):
+            yield bytes(view[offset:offset + buffer_size])
+
+    # -- MemoryDatastore public interface
+
+    def snapshot(self) -> 'MemoryDatastore':
+        """ A copy of the data store, in its current state.
+
+        The content of the files is not copied: it is immutable, and shared by the two data
+        stores. Only the files grown with `append` are copied.
+        """
+        with self._lock:
+            snapshot = MemoryDatastore(self.id)
+            snapshot._files = {
+                path: bytes(data) if isinstance(data, bytearray) else data
+                for path, data in self._files.items()
+            }
+            snapshot._mtimes = dict(self._mtimes)
+            snapshot._dirs = {path: set(entries) for path, entries in self._dirs.items()}
+        return snapshot
+
+    def flush(self, datastore: Datastore, path: str = '') -> None:
+        """ Copy all the files in a directory to another data store.
+
+        The files are written at the same paths in `datastore`, and existing files are
+        overwritten.
+
+        Parameters
+        ----------
+        datastore: Datastore
+            The data store where the files are written, e.g. a `FileDatastore`.
+        path: str
+            Path of the directory to copy. By default, all the files are copied.
+        """
+        path = normalize_path(path)
+        with self._lock:
+            if path in self._files:
+                file_paths = [path]
+            elif path in self._dirs:
+                file_paths = [child for child in self._descendants(path) if child in self._files]
+            else:
+                file_paths = []
+            files = {file_path: self.read(file_path) for file_path in file_paths}
+        for file_path, data in files.items():
+            datastore.write(file_path, data)
+
+    @property
+    def size_bytes(self) -> int:
+        """ Total size of the files, in bytes. """
+        with self._lock:
+            return sum(len(data) for data in self._files.values())
+
+    # -- MemoryDatastore private interface
+
+    def _content(self, path: str) -> Union[bytes, bytearray]:
+        """ The stored content of a file, not copied. """
+        try:
+            return self._files[path]
+        except KeyError:
+            if path in self._dirs:
+                raise IsADirectoryError(f'Is a directory: {path}')
+            raise FileNotFoundError(f'No such file: {path}')
+
+    def _add_entry(self, path: str) -> None:
+        """ Add a path to the entries of its parent directory, creating the missing parents. """
+        while path:
+            parent = path.rpartition('/')[0]
+            entries = self._dirs.get(parent)
+            if entries is not None:
+                # The parent directory is already in the entries of its own parent
+                entries.add(path)
+                return
+            self._dirs[parent] = {path}
+            path = parent
+
+    def _remove_entry(self, path: str) -> None:
+        """ Remove a path from the entries of its parent directory. """
+        self._dirs[path.rpartition('/')[0]].discard(path)
+
+    def _exists(self, path: str) -> bool:
+        return path in self._files or path in self._dirs
+
+    def _descendants(self, path: str) -> List[str]:
+        """ All the paths under a directory, at any depth. """
+        descendants = []
+        stack = [path]
+        while stack:
+            for entry in self._dirs.get(stack.pop(), ()):
+                descendants.append(entry)
+                if entry in self._dirs:
+                    stack.append(entry)
+        return descendants
@@ -0,0 +1,499 @@
+from contextlib import contextmanager
+import io
+import itertools
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, IO, Iterator, List, Optional, Sequence
+import weakref
+
+from pond.conventions import TXT_ENCODING
+from pond.storage.datastore import Buffer, DEFAULT_STREAM_BUFFER_BYTES, Datastore, FileStat
+from pond.storage.utils import MemoryFile, normalize_path, parent_paths
+
+
+# Time to wait for the database lock held by other connections, in seconds
+SQLITE_BUSY_TIMEOUT = 60.0
+# Maximum number of parameters of a query
+SQLITE_MAX_PARAMETERS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT NOT NULL UNIQUE,
+    data BLOB NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+
+def _close_connection(connections: Dict[int, sqlite3.Connection], lock: threading.Lock,
+                      key: int) -> None:
+    """ Close a connection of a `SqliteDatastore`, if it has not been closed yet. """
+    with lock:
+        connection = connections.pop(key, None)
+    if connection is not None:
+        connection.close()
+
+
+def _subtree_range(path: str):
+    """ Bounds of the paths under a directory: `lower <= path < upper`, upper None for the root.
+
+    '0' is the character following '/': all the paths starting with 'a/' are between 'a/' and
+    'a0'.
+    """
+    if not path:
+        return '', None
+    return path + '/', path + '0'
+
+
+class _BlobReader(io.RawIOBase):
+    """ Binary file reading a file of a `SqliteDatastore` incrementally.
+
+    The reader has its own connection, with a read transaction: the file is read as it was when
+    it has been opened, even if it is modified in the meantime.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, rowid: int, size: int,
+                 owns_connection: bool):
+        super().__init__()
+        self._connection = connection
+        self._rowid = rowid
+        self._size = size
+        self._owns_connection = owns_connection
+        self._position = 0
+        # Incremental blob I/O is available from Python 3.11
+        self._blob = None
+        if hasattr(connection, 'blobopen'):
+            self._blob = connection.blobopen('files', 'data', rowid, readonly=True)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f'Invalid whence ({whence})')
+        if position < 0:
+            raise ValueError(f'Negative seek position {position}')
+        self._position = position
+        return position
+
+    def readinto(self, buffer):
+        n_bytes = max(min(len(buffer), self._size - self._position), 0)
+        if n_bytes == 0:
+            return 0
+        if self._blob is not None:
+            self._blob.seek(self._position)
+            data = self._blob.read(n_bytes)
+        else:
+            data, = self._connection.execute(
+                'SELECT substr(data, ?, ?) FROM files WHERE rowid = ?',
+                (self._position + 1, n_bytes, self._rowid),
+            ).fetchone()
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            if self._blob is not None:
+                self._blob.close()
+            if self._owns_connection:
+                self._connection.execute('COMMIT')
+                self._connection.close()
+        super().close()
+
+
+class SqliteDatastore(Datastore):
+    """ Datastore keeping all the files in a single SQLite database file.
+
+    Each version of an artifact is made of several small files (data file, manifest, index).
+    With many small artifacts, storing them as separate files on a file system exhausts the
+    inodes, and makes backups and listings slow. This data store keeps them as rows of a SQLite
+    database, in write-ahead log (WAL) mode: readers do not block writers, and the database can
+    be shared by several threads and processes on the same host.
+
+    Files are read in a single query with `open`, or incrementally with `stream`, from a
+    consistent snapshot of the database.
+    Listings, and recursive deletes and renames, are range queries on the indexed paths.
+
+    Every operation is a transaction. Use `transaction` to group many writes in a single
+    transaction, which is much faster than committing each of them.
+
+    Parameters
+    ----------
+    id: str
+        Unique identifier for the datastore. This is used in the URI for each versioned
+        artifact to uniquely identify the artifact.
+    path: str
+        Path of the database file. It is created if it does not exist.
+    """
+
+    def __init__(self, id: str, path: str):
+        super().__init__(id)
+        self.path = path
+        self._local = threading.local()
+        #: Open connections, by a unique key
+        self._connections: Dict[int, sqlite3.Connection] = {}
+        self._connection_keys = itertools.count()
+        self._connections_lock = threading.Lock()
+        self._connection().executescript(_SCHEMA)
+
+    # -- Datastore interface
+
+    def open(self, path: str, mode: str) -> IO[Any]:
+        path = normalize_path(path)
+        if 'r' in mode and '+' not in mode:
+            # A single query on the connection of the thread. The file is read as it was when
+            # it has been opened, even if it is modified in the meantime.
+            file_ = io.BytesIO(self.read(path))
+        elif 'r' in mode:
+            file_ = MemoryFile(self, path, self.read(path))
+        elif 'w' in mode:
+            file_ = MemoryFile(self, path)
+        elif 'a' in mode:
+            try:
+                data = self.read(path)
+            except FileNotFoundError:
+                data = b''
+            file_ = MemoryFile(self, path, data, append=True)
+        elif 'x' in mode:
+            if self.exists(path):
+                raise FileExistsError(f'File exists: {path}')
+            file_ = MemoryFile(self, path)
+        else:
+            raise ValueError(f'Invalid mode: {mode}')
+        if 'b' not in mode:
+            file_ = io.TextIOWrapper(file_, encoding=TXT_ENCODING)
+        return file_
+
+    def read(self, path: str) -> bytes:
+        path = normalize_path(path)
+        row = self._connection().execute(
+            'SELECT data FROM files WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            self._raise_not_a_file(path)
+        return row[0]
+
+    def write(self, path: str, data: bytes) -> None:
+        self._connection().execute(
+            'INSERT INTO files (path, data, mtime) VALUES (?, ?, ?) '
+            'ON CONFLICT (path) DO UPDATE SET data = excluded.data, mtime = excluded.mtime',
+            (normalize_path(path), data, time.time()),
+        )
+
+    def append(self, path: str, data: bytes) -> int:
+        path = normalize_path(path)
+        with self.transaction() as connection:
+            row = connection.execute('SELECT data FROM files WHERE path = ?', (path,)).fetchone()
+            data = (b'' if row is None else row[0]) + bytes(data)
+            self.write(path, data)
+        return len(data)
+
+    def rename(self, src: str, dst: str) -> None:
+        src = normalize_path(src)
+        dst = normalize_path(dst)
+        with self.transaction() as connection:
+            if self._exists(connection, dst):
+                raise FileExistsError(f'Cannot rename {src}, {dst} already exists')
+            if self._is_file(connection, src):
+                connection.execute('UPDATE files SET path = ? WHERE path = ?', (dst, src))
+            elif self._exists(connection, src):
+                lower, upper = _subtree_range(src)
+                for table in ('files', 'directories'):
+                    connection.execute(
+                        f'UPDATE {table} SET path = ? || substr(path, ?) '
+                        f'WHERE path >= ? AND path < ?',
+                        (dst, len(src) + 1, lower, upper),
+                    )
+                connection.execute(
+                    'UPDATE directories SET path = ? WHERE path = ?', (dst, src))
+            else:
+                raise FileNotFoundError(f'No such file or directory: {src}')
+
+    def link(self, src: str, dst: str) -> None:
+        """ Copy a file inside the database: SQLite does not support links. """
+        src = normalize_path(src)
+        dst = normalize_path(dst)
+        with self.transaction() as connection:
+            if self._exists(connection, dst):
+                raise FileExistsError(f'Cannot link {src}, {dst} already exists')
+            cursor = connection.execute(
+                'INSERT INTO files (path, data, mtime) SELECT ?, data, mtime FROM files '
+                'WHERE path = ?', (dst, src))
+            if cursor.rowcount == 0:
+                self._raise_not_a_file(src)
+
+    def exists(self, path: str) -> bool:
+        return self._exists(self._connection(), normalize_path(path))
+
+    def delete(self, path: str, recursive: bool = False) -> None:
+        path = normalize_path(path)
+        with self.transaction() as connection:
+            cursor = connection.execute('DELETE FROM files WHERE path = ?', (path,))
+            if cursor.rowcount or not self._exists(connection, path):
+                return
+            if not recursive:
+                raise IsADirectoryError(f'Is a directory: {path}')
+            lower, upper = _subtree_range(path)
+            for table in ('files', 'directories'):
+                if upper is None:
+                    connection.execute(f'DELETE FROM {table}')
+                else:
+                    connection.execute(
+                        f'DELETE FROM {table} WHERE path >= ? AND path < ?', (lower, upper))
+            connection.execute('DELETE FROM directories WHERE path = ?', (path,))
+
+    def makedirs(self, path: str) -> None:
+        path = normalize_path(path)
+        if path:
+            self._connection().executemany(
+                'INSERT OR IGNORE INTO directories (path) VALUES (?)',
+                [(directory,) for directory in parent_paths(path)[1:] + [path]],
+            )
+
+    # -- Listing interface
+
+    def list(self, path: str, recursive: bool = False) -> List[str]:
+        """ List the content of a directory.
+
+        The non-recursive listing skips over the content of the sub-directories, and costs one
+        query per listed entry.
+        """
+        path = normalize_path(path)
+        connection = self._connection()
+        lower, upper = _subtree_range(path)
+        if recursive:
+            rows = self._range_query(connection, 'SELECT path FROM files', lower, upper)
+            names = [row[0][len(lower):] for row in rows]
+            if not names and not self._exists(connection, path):
+                raise FileNotFoundError(f'No such directory: {path}')
+            return names
+
+        names = set()
+        cursor = lower
+        while True:
+            rows = self._range_query(
+                connection, 'SELECT path FROM files', cursor, upper, 'ORDER BY path LIMIT 1')
+            if not rows:
+                break
+            name, separator, _ = rows[0][0][len(lower):].partition('/')
+            names.add(name)
+            # Skip the content of the sub-directory, or move past the file
+            cursor = lower + name + ('0' if separator else '\x00')
+        for row in self._range_query(connection, 'SELECT path FROM directories', lower, upper):
+            names.add(row[0][len(lower):].partition('/')[0])
+        if not names and not self._exists(connection, path):
+            raise FileNotFoundError(f'No such directory: {path}')
+        return list(names)
+
+    def stat_many(self, paths: Sequence[str]) -> List[Optional[FileStat]]:
+        normalized = [normalize_path(path) for path in paths]
+        connection = self._connection()
+        found = {}
+        unique_paths = sorted(set(normalized))
+        for start in range(0, len(unique_paths), SQLITE_MAX_PARAMETERS):
+            batch = unique_paths[start:start + SQLITE_MAX_PARAMETERS]
+            rows = connection.execute(
+                f'SELECT path, length(data), mtime FROM files '
+                f'WHERE path IN ({", ".join("?" * len(batch))})',
+                batch,
+            )
+            for path, size, mtime in rows:
+                found[path] = FileStat(size=size, mtime=mtime, is_dir=False)
+        for path in unique_paths:
+            if path not in found and self._exists(connection, path):
+                found[path] = FileStat(size=0, mtime=None, is_dir=True)
+        return [found.get(path) for path in normalized]
+
+    # -- Concurrency interface
+
+    def create_exclusive(self, path: str, data: bytes = b'') -> bool:
+        cursor = self._connection().execute(
+            'INSERT OR IGNORE INTO files (path, data, mtime) VALUES (?, ?, ?)',
+            (normalize_path(path), data, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    # -- Zero-copy interface
+
+    def map(self, path: str) -> Buffer:
+        return self.read(path)
+
+    # -- Partial read interface
+
+    def size(self, path: str) -> int:
+        path = normalize_path(path)
+        row = self._connection().execute(
+            'SELECT length(data) FROM files WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            self._raise_not_a_file(path)
+        return row[0]
+
+    def read_range(self, path: str, offset: int, length: Optional[int] = None) -> bytes:
+        path = normalize_path(path)
+        connection = self._connection()
+        if offset < 0:
+            size = self.size(path)
+            offset = max(size + offset, 0)
+        if length is None:
+            row = connection.execute(
+                'SELECT substr(data, ?) FROM files WHERE path = ?', (offset + 1, path)
+            ).fetchone()
+        else:
+            row = connection.execute(
+                'SELECT substr(data, ?, ?) FROM files WHERE path = ?', (offset + 1, length, path)
+            ).fetchone()
+        if row is None:
+            self._raise_not_a_file(path)
+        return bytes(row[0])
+
+    def stream(self, path: str, buffer_size: int = DEFAULT_STREAM_BUFFER_BYTES
+               ) -> Iterator[bytes]:
+        with self._open_reader(normalize_path(path)) as f:
+            while True:
+                block = f.read(buffer_size)
+                if not block:
+                    return
+                yield block
+
+    # -- SqliteDatastore public interface
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """ Group the operations of the current thread in a single transaction.
+
+        The operations made by the current thread inside the `with` block are committed
+        together at the end of the block, or rolled back if an exception is raised. Other
+        threads and processes are blocked from writing until then. Transactions can be nested:
+        only the outermost one is committed.
+
+        Example
+        -------
+        >>> with datastore.transaction():
+        ...     for i, item in enumerate(items):
+        ...         datastore.write(f'items/{i}', item)
+        """
+        connection = self._connection()
+        depth = getattr(self._local, 'transaction_depth', 0)
+        if depth == 0:
+            connection.execute('BEGIN IMMEDIATE')
+        self._local.transaction_depth = depth + 1
+        try:
+            yield connection
+        except BaseException:
+            self._local.transaction_depth = depth
+            if depth == 0:
+                connection.execute('ROLLBACK')
+            raise
+        self._local.transaction_depth = depth
+        if depth == 0:
+            connection.execute('COMMIT')
+
+    def close(self) -> None:
+        """ Close the connections to the database, of all threads. """
+        with self._connections_lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    # -- SqliteDatastore private interface
+
+    def _connect(self) -> sqlite3.Connection:
+        # Transactions are managed explicitly, each statement is committed otherwise
+        connection = sqlite3.connect(
+            self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None,
+            check_same_thread=False)
+        connection.execute('PRAGMA journal_mode = WAL')
+        # Durable at each checkpoint instead of each commit, safe with WAL
+        connection.execute('PRAGMA synchronous = NORMAL')
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        """ The connection of the current thread.
+
+        The connection is closed when the thread exits, e.g. the threads of the pools used by
+        `Activity.read_many`, so that connections and file descriptors do not pile up.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+            key = next(self._connection_keys)
+            with self._connections_lock:
+                self._connections[key] = connection
+            # The callback does not reference the data store, which can outlive the thread
+            weakref.finalize(threading.current_thread(), _close_connection,
+                             self._connections, self._connections_lock, key)
+        return connection
+
+    def _open_reader(self, path: str) -> _BlobReader:
+        """ Open a file for reading, from a consistent snapshot of the database. """
+        in_transaction = getattr(self._local, 'transaction_depth', 0) > 0
+        if in_transaction:
+            # Read the data written in the current transaction
+            connection = self._connection()
+        else:
+            connection = self._connect()
+            connection.execute('BEGIN')
+        try:
+            row = connection.execute(
+                'SELECT rowid, length(data) FROM files WHERE path = ?', (path,)).fetchone()
+            if row is None:
+                self._raise_not_a_file(path)
+            rowid, size = row
+            return _BlobReader(connection, rowid, size, owns_connection=not in_transaction)
+        except BaseException:
+            if not in_transaction:
+                connection.close()
+            raise
+
+    def _raise_not_a_file(self, path: str) -> None:
+        if self.exists(path):
+            raise IsADirectoryError(f'Is a directory: {path}')
+        raise FileNotFoundError(f'No such file: {path}')
+
+    @staticmethod
+    def _range_query(connection, query: str, lower: str, upper: Optional[str],
+                     suffix: str = '') -> List[tuple]:
+        """ Run a query on the paths between `lower` (included) and `upper` (excluded). """
+        if upper is None:
+            return connection.execute(f'{query} WHERE path >= ? {suffix}', (lower,)).fetchall()
+        return connection.execute(
+            f'{query} WHERE path >= ? AND path < ? {suffix}', (lower, upper)).fetchall()
+
+    @staticmethod
+    def _is_file(connection, path: str) -> bool:
+        return connection.execute(
+            'SELECT 1 FROM files WHERE path = ?', (path,)).fetchone() is not None
+
+    @classmethod
+    def _exists(cls, connection, path: str) -> bool:
+        """ True if `path` is a file, or a directory (explicit, or containing files). """
+        if not path or cls._is_file(connection, path):
+            return True
+        lower, upper = _subtree_range(path)
+        for table in ('directories', 'files'):
+            row = connection.execute(
+                f'SELECT 1 FROM {table} WHERE path = ? OR (path >= ? AND path < ?) LIMIT 1',
+                (path, lower, upper),
+            ).fetchone()
+            if row is not None:
+                return True
+        return False
@@ -0,0 +1,47 @@
+import io
+import os
+from typing import List
+import uuid
+
+from pond.storage.datastore import Datastore
+
+
+def normalize_path(path: str) -> str:
+    """ Canonical form of a path: no leading, trailing, or repeated slashes. """
+    return '/'.join(part for part in path.split('/') if part and part != '.')
+
+
+def parent_paths(path: str) -> List[str]:
+    """ All the parent directories of a normalized path, including the root ''. """
+    parts = path.split('/')
+    return ['/'.join(parts[:i]) for i in range(len(parts))]
+
+
+def temporary_path(complete_path: str) -> str:
+    """ Unique hidden path next to a local file, used to write the file atomically.
+
+    The file is written at the temporary path, and then moved to `complete_path` with
+    `os.replace`.
+    """
+    dirname, basename = os.path.split(complete_path)
+    return os.path.join(dirname, f'.{basename}.{uuid.uuid4().hex}.tmp')
+
+
+class MemoryFile(io.BytesIO):
+    """ File open for writing in memory, written to a data store when it is closed.
+
+    Used by the data stores that do not keep their files on a file system.
+    """
+
+    def __init__(self, datastore: Datastore, path: str, initial: bytes = b'',
+                 append: bool = False):
+        super().__init__(initial)
+        self._datastore = datastore
+        self._path = path
+        if append:
+            self.seek(0, io.SEEK_END)
+
+    def close(self):
+        if not self.closed:
+            self._datastore.write(self._path, self.getvalue())
+        super().close()
@@ -1,11 +1,25 @@
+from concurrent.futures import Executor
 import datetime
-from typing import Optional
+import functools
+import posixpath
+import shutil
+import threading
+from typing import Callable, List, Optional
+import uuid
 
 from pond.artifact import Artifact
+from pond.artifact.artifact import content_hash as compute_content_hash
+from pond.chunk_store import CHUNK_LIST_EXTENSION, ChunkStore
+from pond.codecs import Codec, NoneCodec, get_codec
 from pond.conventions import (
+    METADATA_DIRNAME,
+    ManifestFormat,
+    chunk_store_location,
     version_data_location,
     version_location,
     version_manifest_location,
+    version_staging_location,
+    version_trash_location,
     version_uri,
 )
 from pond.exceptions import VersionDoesNotExist
@@ -15,87 +29,407 @@ from pond.storage.datastore import Datastore
 from pond.version_name import VersionName
 
 
+#: Value of the 'storage' version metadata, for versions stored in content-defined chunks
+CHUNKED_STORAGE = 'chunks'
+
+
 class Version:
 
-    def __init__(self, artifact_name: str, version_name: VersionName, artifact: Artifact,
-                 manifest: Optional[Manifest] = None):
+    def __init__(self, artifact_name: str, version_name: VersionName,
+                 artifact: Optional[Artifact], manifest: Optional[Manifest] = None,
+                 artifact_loader: Optional[Callable[[], Artifact]] = None):
         """ Manages a version: its manifest, name, and artifact.
+
+        If `artifact` is None and `artifact_loader` is given, the artifact is loaded by calling
+        `artifact_loader` the first time that it is accessed.
         """
         self.artifact_name = artifact_name
         self.version_name = version_name
         self.manifest = manifest
-        self.artifact = artifact
+        self._artifact = artifact
+        self._artifact_loader = artifact_loader if artifact is None else None
+        self._artifact_lock = threading.Lock()
+
+    @property
+    def artifact(self) -> Artifact:
+        """ The artifact of the version, loaded on first access if the version is lazy. """
+        if self._artifact_loader is not None:
+            # Concurrent accesses load the artifact once
+            with self._artifact_lock:
+                if self._artifact_loader is not None:
+                    self._artifact = self._artifact_loader()
+                    self._artifact_loader = None
+        return self._artifact
+
+    @artifact.setter
+    def artifact(self, artifact: Artifact) -> None:
+        self._artifact = artifact
+        self._artifact_loader = None
+
+    @property
+    def is_loaded(self) -> bool:
+        """ False if the artifact of a lazy version has not been accessed yet. """
+        return self._artifact_loader is None
+
+    def __getstate__(self):
+        # Locks cannot be pickled, e.g. to send a version to another process
+        state = self.__dict__.copy()
+        del state['_artifact_lock']
+        return state
 
-    def get_metadata(self, location, datastore, data_filename):
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._artifact_lock = threading.Lock()
+
+    def get_metadata(self, location, datastore, data_filename, codec_name=NoneCodec.name,
+                     content_hash=None, storage=None):
         version_metadata = {
             'uri': self.get_uri(location, datastore),
             'filename': data_filename,
+            'codec': codec_name,
             'date_time': datetime.datetime.now(),
             'artifact_name': self.artifact_name,
         }
+        if content_hash is not None:
+            version_metadata['content_hash'] = content_hash
+        if storage is not None:
+            version_metadata['storage'] = storage
         version_metadata_source = DictMetadataSource(name='version', metadata=version_metadata)
         return version_metadata_source
 
-    def write(self, location: str, datastore: Datastore, manifest: Manifest):
+    def write(self, location: str, datastore: Datastore, manifest: Manifest,
+              replace: bool = False, executor: Optional[Executor] = None,
+              codec: Optional[Codec] = None, chunked: bool = False,
+              manifest_format: ManifestFormat = ManifestFormat.YAML):
+        """ Write the version, and publish it atomically.
+
+        The version is first written in a staging folder (see `stage`), and then published by
+        renaming the folder to its final location (see `publish`). Readers never see a partially
+        written version.
+
+        Parameters
+        ----------
+        location: str
+            Root location of the versioned artifact in the data store.
+        datastore: Datastore
+            Data store object, representing the location where the artifacts are read/written.
+        manifest: Manifest
+            Metadata to store with the data. The version metadata is added to it.
+        replace: bool
+            If True, an existing version with the same name is replaced.
+        executor: Executor, optional
+            Executor where the artifact is serialized, see `stage`.
+        codec: Codec, optional
+            Codec used to compress the data file, see `stage`.
+        chunked: bool
+            If True, the data is stored in content-defined chunks, see `stage`.
+        manifest_format: ManifestFormat
+            File format of the manifest, see `stage`.
+        """
+        staging_location = self.stage(
+            location, datastore, manifest, executor=executor, codec=codec, chunked=chunked,
+            manifest_format=manifest_format, replace=replace)
+        try:
+            self.publish(location, datastore, staging_location, replace=replace,
+                         manifest_format=manifest_format)
+        except BaseException:
+            datastore.delete(staging_location, recursive=True)
+            raise
+
+    def stage(self, location: str, datastore: Datastore, manifest: Manifest,
+              executor: Optional[Executor] = None, codec: Optional[Codec] = None,
+              chunked: bool = False,
+              manifest_format: ManifestFormat = ManifestFormat.YAML,
+              replace: bool = False) -> str:
+        """ Write the version in a staging folder, without publishing it.
+
+        The data file is written first, and the manifest last: a manifest marks a complete
+        version. If writing fails, the staging folder is deleted.
+
+        Parameters
+        ----------
+        location: str
+            Root location of the versioned artifact in the data store.
+        datastore: Datastore
+            Data store object, representing the location where the artifacts are read/written.
+        manifest: Manifest
+            Metadata to store with the data. The version metadata is added to it.
+        executor: Executor, optional
+            Executor where the artifact is serialized, e.g. a process pool for CPU-heavy
+            artifacts. If None, the artifact is serialized directly to the data file. See
+            `Artifact.write_datastore`.
+        codec: Codec, optional
+            Codec used to compress the data file. The name of the codec is stored in the
+            manifest. If None, the data file is not compressed.
+        chunked: bool
+            If True, the serialized artifact is split in content-defined chunks, stored once
+            for all the versions of the artifact (see `pond.chunk_store.ChunkStore`), and the
+            data file is the list of chunks of the version. Successive versions with small
+            differences then share most of their chunks. The chunks are compressed with `codec`.
+        manifest_format: ManifestFormat
+            File format of the manifest. All the versions of an artifact must use the same
+            format, since the readers find the manifest by its filename.
+        replace: bool
+            If True, the version replaces an existing version: its data file is put in a
+            sub-folder with a unique name, so that it can be published next to the data file
+            of the replaced version (see `publish`).
+
+        Returns
+        -------
+        str
+            The location of the staging folder, to be passed to `publish`.
+        """
         # TODO: manifest is modified in-place, is that an issue?
 
-        #: location of the version folder
-        version_location_ = version_location(location, self.version_name)
+        #: location of the staging folder
+        staging_location = version_staging_location(
+            location, self.version_name, uuid.uuid4().hex)
         #: location of the manifest file
-        manifest_location = version_manifest_location(version_location_)
+        manifest_location = version_manifest_location(staging_location, manifest_format)
 
         #: filename for the saved data
         data_basename = f'{self.artifact_name}_{str(self.version_name)}'
-        data_filename = self.artifact.filename(data_basename)
+        codec = get_codec(codec)
+        if chunked:
+            data_filename = self.artifact.filename(data_basename) + CHUNK_LIST_EXTENSION
+        else:
+            data_filename = self.artifact.filename(data_basename) + codec.extension
+        if replace:
+            data_filename = f'{uuid.uuid4().hex}/{data_filename}'
 
-        version_metadata_source = self.get_metadata(location, datastore, data_filename)
-        manifest.add_section(version_metadata_source)
-        artifact_metadata_source = self.artifact.get_artifact_metadata()
-        manifest.add_section(artifact_metadata_source)
-        manifest.to_yaml(manifest_location, datastore)
+        try:
+            data_location = version_data_location(staging_location, data_filename)
+            # The data file is in a sub-folder when replacing a version
+            datastore.makedirs(posixpath.dirname(data_location))
+            if chunked:
+                content_hash = self._write_chunks(
+                    location, datastore, data_location, executor=executor, codec=codec)
+            else:
+                content_hash = self.artifact.write_datastore(
+                    datastore, data_location, executor=executor, codec=_compressing(codec))
 
-        datastore.makedirs(version_location_)
-        data_location = version_data_location(version_location_, data_filename)
-        with datastore.open(data_location, 'wb') as f:
-            self.artifact.write_bytes(f)
+            version_metadata_source = self.get_metadata(
+                location, datastore, data_filename, codec_name=codec.name,
+                content_hash=content_hash, storage=CHUNKED_STORAGE if chunked else None)
+            manifest.add_section(version_metadata_source)
+            artifact_metadata_source = self.artifact.get_artifact_metadata()
+            manifest.add_section(artifact_metadata_source)
+            manifest.to_file(manifest_location, datastore)
+        except BaseException:
+            datastore.delete(staging_location, recursive=True)
+            raise
 
         # save stored manifest
         self.manifest = manifest
+        return staging_location
 
-    # todo store and recover artifact_class from manifest
-    @classmethod
-    def read(cls, version_name, artifact_class, location, datastore):
+    def publish(self, location: str, datastore: Datastore, staging_location: str,
+                replace: bool = False, delete_replaced: bool = True,
+                manifest_format: ManifestFormat = ManifestFormat.YAML) -> Optional[str]:
+        """ Publish a staged version, by renaming its staging folder to the version folder.
+
+        An existing version is replaced in place, and readers always find either the replaced
+        version or the new one: the new data file is moved next to the replaced one (it has a
+        unique name, see `stage`), then the manifest of the version is overwritten with the new
+        manifest, which points at the new data file. `Datastore.write` replaces a file
+        atomically. The other files of the version folder, e.g. the replaced data file, are
+        deleted last.
+
+        Data stores that do not support renaming, or listing, are supported without these
+        guarantees: the files are copied, see `move_version_folder`.
+
+        Parameters
+        ----------
+        location: str
+            Root location of the versioned artifact in the data store.
+        datastore: Datastore
+            Data store object, representing the location where the artifacts are read/written.
+        staging_location: str
+            The staging folder, as returned by `stage`.
+        replace: bool
+            If True, an existing version with the same name is replaced. The version must have
+            been staged with `replace=True`.
+        delete_replaced: bool
+            If False, the replaced version is moved to a trash folder instead of being deleted,
+            so that it can be restored.
+        manifest_format: ManifestFormat
+            File format of the manifest, see `stage`.
+
+        Raises
+        ------
+        FileExistsError
+            If the version already exists, and `replace` is False.
+
+        Returns
+        -------
+        Optional[str]
+            The trash folder where the replaced version has been moved, if it has not been
+            deleted, or None.
+        """
         #: location of the version folder
-        version_location_ = version_location(location, version_name)
-        #: location of the manifest file
-        manifest_location = version_manifest_location(version_location_)
+        version_location_ = version_location(location, self.version_name)
+        if not (replace and datastore.exists(version_location_)):
+            move_version_folder(datastore, staging_location, version_location_, manifest_format)
+            return None
 
-        if not datastore.exists(manifest_location):
-            raise VersionDoesNotExist(location, str(version_name))
-        manifest = Manifest.from_yaml(manifest_location, datastore)
+        manifest_location = version_manifest_location(version_location_, manifest_format)
+        try:
+            replaced_manifest = datastore.read(manifest_location)
+        except FileNotFoundError:
+            # A version folder without manifest, e.g. written by an older version of `pond`
+            replaced_manifest = None
+        replaced_entries = _version_folder_entries(datastore, version_location_, manifest_format)
 
-        version_metadata = manifest.collect_section('version')
-        data_filename = version_metadata['filename']
+        data_filename = self.manifest.collect_section('version')['filename']
         data_location = version_data_location(version_location_, data_filename)
-        user_metadata = manifest.collect_section('user')
-        with datastore.open(data_location, 'rb') as f:
-            artifact = artifact_class.read_bytes(f, metadata=user_metadata)
+        _move_file(datastore, version_data_location(staging_location, data_filename),
+                   data_location)
+        try:
+            datastore.write(manifest_location, datastore.read(
+                version_manifest_location(staging_location, manifest_format)))
+        except BaseException:
+            _delete_data_file(datastore, version_location_, data_filename)
+            raise
+        datastore.delete(staging_location, recursive=True)
+
+        if delete_replaced:
+            entry_locations = [version_data_location(version_location_, entry)
+                               for entry in replaced_entries]
+            for entry_location, stat in zip(entry_locations,
+                                            datastore.stat_many(entry_locations)):
+                datastore.delete(entry_location, recursive=stat is not None and stat.is_dir)
+            return None
+
+        # A complete copy of the replaced version, to restore it
+        trash_location = version_trash_location(location, self.version_name, uuid.uuid4().hex)
+        datastore.makedirs(trash_location)
+        for entry in replaced_entries:
+            _move_file(datastore, version_data_location(version_location_, entry),
+                       version_data_location(trash_location, entry))
+        if replaced_manifest is not None:
+            datastore.write(version_manifest_location(trash_location, manifest_format),
+                            replaced_manifest)
+        return trash_location
+
+    # todo store and recover artifact_class from manifest
+    @classmethod
+    def read(cls, version_name, artifact_class, location, datastore,
+             executor: Optional[Executor] = None,
+             manifest_format: ManifestFormat = ManifestFormat.YAML, lazy: bool = False,
+             **kwargs):
+        """ Read a version from the data store.
+
+        Parameters
+        ----------
+        version_name: VersionName
+            Name of the version.
+        artifact_class: Type[Artifact]
+            Class of the artifact.
+        location: str
+            Root location of the versioned artifact in the data store.
+        datastore: Datastore
+            Data store object, representing the location where the artifacts are read/written.
+        executor: Executor, optional
+            Executor where the artifact is deserialized, e.g. a process pool for CPU-heavy
+            artifacts. If None, the artifact is deserialized directly from the data file. See
+            `Artifact.read_datastore`.
+        manifest_format: ManifestFormat
+            File format of the manifest.
+        lazy: bool
+            If True, only the manifest is read. The artifact is read the first time that the
+            `artifact` attribute of the version is accessed. If the version is overwritten in
+            the meantime, reading the artifact fails.
+        kwargs: dict
+            Additional parameters for the reader of the artifact, e.g. a selection of columns.
+
+        Raises
+        ------
+        VersionDoesNotExist
+            If the version does not exist.
+
+        Returns
+        -------
+        Version
+            The version, including its artifact and manifest.
+        """
+        manifest = cls.read_manifest(version_name, location, datastore, manifest_format)
+        read_artifact = functools.partial(
+            cls._read_artifact, version_name, artifact_class, location, datastore, manifest,
+            executor=executor, **kwargs)
 
         version = cls(
-            artifact_name=version_metadata['artifact_name'],
+            artifact_name=manifest.collect_section('version')['artifact_name'],
             version_name=version_name,
-            artifact=artifact,
+            artifact=None if lazy else read_artifact(),
             manifest=manifest,
+            artifact_loader=read_artifact if lazy else None,
         )
 
         return version
 
+    @staticmethod
+    def _read_artifact(version_name: VersionName, artifact_class, location: str,
+                       datastore: Datastore, manifest: Manifest,
+                       executor: Optional[Executor] = None, **kwargs) -> Artifact:
+        """ Read the artifact of a version, given its manifest. """
+        #: location of the version folder
+        version_location_ = version_location(location, version_name)
+        version_metadata = manifest.collect_section('version')
+        data_filename = version_metadata['filename']
+        data_location = version_data_location(version_location_, data_filename)
+        user_metadata = manifest.collect_section('user')
+        if version_metadata.get('storage') == CHUNKED_STORAGE:
+            artifact = Version._read_chunks(
+                artifact_class, location, datastore, data_location, metadata=user_metadata,
+                executor=executor, **kwargs)
+        else:
+            # Versions written before codecs were introduced are not compressed
+            codec = get_codec(version_metadata.get('codec'))
+            artifact = artifact_class.read_datastore(
+                datastore, data_location, metadata=user_metadata, executor=executor,
+                codec=_compressing(codec), **kwargs)
+        return artifact
+
+    @staticmethod
+    def read_manifest(version_name: VersionName, location: str, datastore: Datastore,
+                      manifest_format: ManifestFormat = ManifestFormat.YAML) -> Manifest:
+        """ Read the manifest of a version, without reading its artifact.
+
+        Parameters
+        ----------
+        version_name: VersionName
+            Name of the version.
+        location: str
+            Root location of the versioned artifact in the data store.
+        datastore: Datastore
+            Data store object, representing the location where the artifacts are read/written.
+        manifest_format: ManifestFormat
+            File format of the manifest.
+
+        Raises
+        ------
+        VersionDoesNotExist
+            If the version does not exist.
+
+        Returns
+        -------
+        Manifest
+            The manifest of the version.
+        """
+        version_location_ = version_location(location, version_name)
+        manifest_location = version_manifest_location(version_location_, manifest_format)
+        try:
+            return Manifest.from_file(manifest_location, datastore)
+        except FileNotFoundError:
+            raise VersionDoesNotExist(location, str(version_name))
+
     def get_uri(self, location, datastore):
         """ Build URI for a specific location and datastore. """
         uri = version_uri(datastore.id, location, self.artifact_name, self.version_name)
         return uri
 
-    def exists(self, location: str, datastore: Datastore):
+    def exists(self, location: str, datastore: Datastore,
+               manifest_format: ManifestFormat = ManifestFormat.YAML):
         """ Does this version already exists on disk?
 
         Parameters
@@ -106,10 +440,118 @@ class Version:
             a project or experiment.
         datastore: Datastore
             Data store object, representing the location where the artifacts are read/written.
+        manifest_format: ManifestFormat
+            File format of the manifest.
         """
         #: location of the version folder
         version_location_ = version_location(location, self.version_name)
         #: location of the manifest file
-        manifest_location = version_manifest_location(version_location_)
+        manifest_location = version_manifest_location(version_location_, manifest_format)
 
         return datastore.exists(manifest_location)
+
+    def _write_chunks(self, location: str, datastore: Datastore, data_location: str,
+                      executor: Optional[Executor] = None, codec: Optional[Codec] = None) -> str:
+        """ Serialize the artifact, and store it in the chunk store of the versioned artifact.
+
+        Returns the content hash of the serialized artifact.
+        """
+        if executor is None:
+            data = self.artifact.to_bytes()
+        else:
+            data = executor.submit(self.artifact.to_bytes).result()
+        chunk_store = ChunkStore(datastore, chunk_store_location(location), codec=codec)
+        chunk_store.write(data_location, data)
+        return compute_content_hash(data)
+
+    @staticmethod
+    def _read_chunks(artifact_class, location: str, datastore: Datastore, data_location: str,
+                     metadata=None, executor: Optional[Executor] = None, **kwargs) -> Artifact:
+        """ Read an artifact stored in the chunk store of the versioned artifact.
+
+        The chunks are read while the artifact is deserialized, unless an executor is given.
+        """
+        chunk_store = ChunkStore(datastore, chunk_store_location(location))
+        if executor is None:
+            with chunk_store.open(data_location) as f:
+                return artifact_class.read_bytes(f, metadata, **kwargs)
+        data = chunk_store.read(data_location)
+        return executor.submit(artifact_class.from_bytes, data, metadata, **kwargs).result()
+
+
+def _compressing(codec: Codec) -> Optional[Codec]:
+    """ The codec to pass to the artifact, None if the codec does not compress. """
+    return None if isinstance(codec, NoneCodec) else codec
+
+
+def move_version_folder(datastore: Datastore, src: str, dst: str,
+                        manifest_format: ManifestFormat = ManifestFormat.YAML) -> None:
+    """ Move a complete version folder, e.g. to publish a staged version.
+
+    The folder is renamed atomically. Data stores that do not support renaming (see
+    `Datastore.rename`) get a non-atomic fallback: the data file is copied first, and the manifest
+    last, so that readers do not find the version before its data file.
+
+    Raises
+    ------
+    FileExistsError
+        If `dst` already exists.
+    """
+    try:
+        datastore.rename(src, dst)
+        return
+    except NotImplementedError:
+        pass
+    if datastore.exists(dst):
+        raise FileExistsError(f'Cannot move {src}, {dst} already exists')
+    manifest_location = version_manifest_location(src, manifest_format)
+    data_filename = Manifest.from_file(manifest_location, datastore).collect_section(
+        'version')['filename']
+    _move_file(datastore, version_data_location(src, data_filename),
+               version_data_location(dst, data_filename))
+    _move_file(datastore, manifest_location, version_manifest_location(dst, manifest_format))
+    datastore.delete(src, recursive=True)
+
+
+def _move_file(datastore: Datastore, src: str, dst: str) -> None:
+    """ Rename a file, or copy and delete it if the data store does not support renaming. """
+    try:
+        datastore.rename(src, dst)
+        return
+    except NotImplementedError:
+        pass
+    if datastore.exists(dst):
+        raise FileExistsError(f'Cannot move {src}, {dst} already exists')
+    datastore.makedirs(posixpath.dirname(dst))
+    with datastore.open(src, 'rb') as src_file, datastore.open(dst, 'wb') as dst_file:
+        shutil.copyfileobj(src_file, dst_file)
+    datastore.delete(src)
+
+
+def _version_folder_entries(datastore: Datastore, version_location_: str,
+                            manifest_format: ManifestFormat) -> List[str]:
+    """ The files and folders of a version, except its metadata folder.
+
+    Data stores that do not support listing (see `Datastore.list`) give the data file named in
+    the manifest of the version.
+    """
+    try:
+        return [entry for entry in datastore.list(version_location_)
+                if entry != METADATA_DIRNAME]
+    except NotImplementedError:
+        pass
+    manifest_location = version_manifest_location(version_location_, manifest_format)
+    try:
+        manifest = Manifest.from_file(manifest_location, datastore)
+    except FileNotFoundError:
+        return []
+    return [manifest.collect_section('version')['filename']]
+
+
+def _delete_data_file(datastore: Datastore, version_location_: str, data_filename: str) -> None:
+    """ Delete a data file, and the unique sub-folder of the data file of a replacing version. """
+    folder = posixpath.dirname(data_filename)
+    if folder:
+        datastore.delete(version_data_location(version_location_, folder), recursive=True)
+    else:
+        datastore.delete(version_data_location(version_location_, data_filename))
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, date, timedelta
-from typing import Any, Type, Optional, Union
+from typing import Any, Dict, Type, Optional, Union
 import re
 
 from pond.exceptions import IncompatibleVersionName, InvalidVersionName
@@ -13,6 +13,10 @@ def _compare_classnames(this: Any, that: Any) -> int:
     return 0 if a == b else (-1 if a < b else 1)
 
 
+#: All the subclasses of `VersionName`, by class ID
+_VERSION_NAME_CLASSES: Dict[str, Type['VersionName']] = {}
+
+
 class VersionName(ABC):
     """ Base class for all kind of version naming conventions.
 
@@ -27,16 +31,18 @@ class VersionName(ABC):
         return cls.__name__
 
     @classmethod
-    def subclass_from_id(cls, class_id: str) -> Type['Artifact']:
-        """ Find a subclass from its class ID. """
-        subclasses = cls.__subclasses__()
-        for subclass in subclasses:
-            if subclass.class_id() == class_id:
-                break
-        else:
+    def subclass_from_id(cls, class_id: str) -> Type['VersionName']:
+        """ Find a subclass, at any depth, from its class ID. """
+        subclass = _VERSION_NAME_CLASSES.get(class_id)
+        if subclass is None or not issubclass(subclass, cls):
             raise InvalidVersionName(class_id)
         return subclass
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # If several classes have the same ID, the last defined one is found
+        _VERSION_NAME_CLASSES[cls.class_id()] = cls
+
     @classmethod
     def from_string(cls, version_name: str) -> 'VersionName':
         """Parses a string into a version name.
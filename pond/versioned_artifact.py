@@ -1,30 +1,55 @@
-import json
+from collections import namedtuple
+from concurrent.futures import Executor
 import logging
+import posixpath
 import time
 from typing import List, Type, Optional, Union
 
 from pond.artifact import Artifact
+from pond.chunk_store import ChunkStore
+from pond.codecs import Codec, NoneCodec
 from pond.conventions import (
     DataType,
+    DedupMode,
+    ManifestFormat,
     WriteMode,
+    chunk_store_location,
+    reservations_location,
+    staging_location,
+    trash_location,
+    urijoinpath,
     version_manifest_location,
+    version_data_location,
     version_location,
-    versions_lock_file_location,
+    version_reservation_location,
     versioned_artifact_location,
 )
 from pond.exceptions import (
-    IncompatibleVersionName, VersionAlreadyExists,
+    ArtifactHasNoVersion,
+    ArtifactVersionsIsLocked,
+    IncompatibleVersionName,
+    InvalidVersionName,
+    VersionAlreadyExists,
+    VersionDoesNotExist,
 )
 from pond.metadata.manifest import Manifest
 from pond.storage.datastore import Datastore
-from pond.version import Version
+from pond.version import CHUNKED_STORAGE, Version, move_version_folder
 from pond.version_name import VersionName
+from pond.versions_index import VersionsIndex
 
 
 logger = logging.getLogger(__name__)
 
-# Time to wait before retrying when creating a new version fails
-NEW_VERSION_WAIT_MS = 1000
+#: A version written in a staging folder, and not yet published
+StagedVersion = namedtuple('StagedVersion', ['version', 'staging_location', 'replace'])
+
+# Maximum number of version names tried when creating a new version
+NEW_VERSION_MAX_ATTEMPTS = 1000
+# Bounds of the time to wait when the version name class cannot generate a new name yet (e.g.,
+# date-time version names generated within the same second)
+NEW_VERSION_MIN_WAIT_MS = 1
+NEW_VERSION_MAX_WAIT_MS = 100
 
 
 class VersionedArtifact:
@@ -34,7 +59,9 @@ class VersionedArtifact:
                  location: str,
                  datastore: Datastore,
                  artifact_class: Type[Artifact],
-                 version_name_class: Type[VersionName]):
+                 version_name_class: Type[VersionName],
+                 create: bool = True,
+                 manifest_format: ManifestFormat = ManifestFormat.YAML):
         """ An artifact versioned and stored on disk.
 
         `VersionedArtifact` manages the versioning, data, and metadata, of an artifact.
@@ -53,35 +80,80 @@ class VersionedArtifact:
         version_name_class: Type[VersionName]
             Class used to create increasing version names. The default value,
             `SimpleVersionName` creates version names as `v1`, `v2`, etc.
+        create: bool
+            If True, the versioned artifact folder organization is created on storage if it does
+            not exist. If False, the constructor does not access the storage at all.
+        manifest_format: ManifestFormat
+            File format of the manifests of the versions. It is recorded in the manifest of the
+            versioned artifact when it is created: if the versioned artifact already exists, the
+            recorded format is used instead.
         """
         self.artifact_name = artifact_name
         self.location = location
         self.datastore = datastore
         self.artifact_class = artifact_class
         self.version_name_class = version_name_class
+        self.manifest_format = ManifestFormat(manifest_format)
 
         self.versions_manifest = {
             'artifact_class': artifact_class.class_id(),
             'version_name_class': version_name_class.class_id(),
+            'manifest_format': self.manifest_format.value,
         }
 
         self.versions_location = versioned_artifact_location(location, artifact_name)
         # todo this goes to conventions.py
+        #: List of version names written by older versions of `pond`, only read for migration
         self.versions_list_location = f'{self.versions_location}/versions.json'
         self.versions_manifest_location = f'{self.versions_location}/manifest.yml'
+        self.versions_index = VersionsIndex(
+            versions_location=self.versions_location,
+            datastore=datastore,
+            version_name_class=version_name_class,
+        )
+        #: Last version name allocated by this object, used as a hint for the next allocation
+        self._last_created_version_name = None
 
-        if not self.datastore.exists(self.versions_location):
+        if create and not self.datastore.exists(self.versions_location):
             # Create the versioned artifact folder organization if it does not exist
             self.datastore.makedirs(self.versions_location)
-            self._write_version_names([])
+            self.versions_index.rewrite([])
             self.versions_manifest['artifact_class'] = artifact_class.class_id()
             self.versions_manifest['version_name_class'] = version_name_class.class_id()
             self._write_manifest()
+        elif create:
+            # All the versions of an existing artifact have the same manifest format
+            try:
+                self.manifest_format = _recorded_manifest_format(self._read_manifest())
+            except FileNotFoundError:
+                # Being created by another process, with the same classes and format
+                pass
+            self.versions_manifest['manifest_format'] = self.manifest_format.value
 
     # --- VersionedArtifact class interface
 
     @classmethod
     def from_datastore(cls, artifact_name: str, location: str, datastore: Datastore):
+        """ Load an existing versioned artifact from storage.
+
+        This is a read-only operation: the only access to storage is reading the manifest of the
+        versioned artifact.
+
+        Parameters
+        ----------
+        artifact_name: str
+            Name of the artifact.
+        location: str
+            Root location in the data store where artifacts are read/written.
+        datastore: Datastore
+            Data store object, representing the storage where the artifacts are read/written.
+
+        Returns
+        -------
+        VersionedArtifact
+            The versioned artifact, with the artifact and version name classes found in its
+            manifest.
+        """
         versions_location = versioned_artifact_location(location, artifact_name)
         versions_manifest_location = f'{versions_location}/manifest.yml'
         versions_manifest = datastore.read_yaml(versions_manifest_location)
@@ -97,12 +169,18 @@ class VersionedArtifact:
             datastore=datastore,
             artifact_class=artifact_class,
             version_name_class=version_name_class,
+            create=False,
+            manifest_format=_recorded_manifest_format(versions_manifest),
         )
         return versioned_artifact
 
     # --- VersionedArtifact public interface
 
-    def read(self, version_name: Optional[Union[str, VersionName]] = None) -> Version:
+    def read(self,
+             version_name: Optional[Union[str, VersionName]] = None,
+             executor: Optional[Executor] = None,
+             lazy: bool = False,
+             **kwargs) -> Version:
         """ Read a version of the artifact.
 
         Parameters
@@ -110,6 +188,14 @@ class VersionedArtifact:
         version_name: Union[str, VersionName], optional
             Version name, given as a string (more common) or as VersionName instance. If None,
             the latest version name for the given artifact is used.
+        executor: Executor, optional
+            Executor where the artifact is deserialized, e.g. a process pool for CPU-heavy
+            artifacts. If None, the artifact is deserialized in the calling thread.
+        lazy: bool
+            If True, only the manifest of the version is read, and the artifact is read on the
+            first access to `Version.artifact`.
+        kwargs: dict
+            Additional parameters for the reader of the artifact, e.g. a selection of columns.
 
         Raises
         ------
@@ -133,6 +219,10 @@ class VersionedArtifact:
             artifact_class=self.artifact_class,
             datastore=self.datastore,
             location=self.versions_location,
+            executor=executor,
+            manifest_format=self.manifest_format,
+            lazy=lazy,
+            **kwargs,
         )
 
         return version
@@ -141,7 +231,11 @@ class VersionedArtifact:
               data: DataType,
               manifest: Manifest,
               version_name: Optional[Union[str, VersionName]] = None,
-              write_mode: WriteMode = WriteMode.ERROR_IF_EXISTS):
+              write_mode: WriteMode = WriteMode.ERROR_IF_EXISTS,
+              executor: Optional[Executor] = None,
+              codec: Optional[Codec] = None,
+              dedup: DedupMode = DedupMode.NONE,
+              chunked: bool = False):
         """ Write some data to storage.
 
         Parameters
@@ -155,6 +249,21 @@ class VersionedArtifact:
             the latest version name for the given artifact is used.
         write_mode: WriteMode
             Write mode, either WriteMode.ERROR_IF_EXISTS or WriteMode.OVERWRITE.
+        executor: Executor, optional
+            Executor where the artifact is serialized, e.g. a process pool for CPU-heavy
+            artifacts. If None, the artifact is serialized in the calling thread.
+        codec: Codec, optional
+            Codec used to compress the data. If None, the data is not compressed.
+        dedup: DedupMode
+            What to do if the data file is identical to the one of the latest version, as
+            detected from their content hash. With DedupMode.SKIP, no version is written, and
+            the latest version is returned. With DedupMode.LINK, the new version is written, but
+            its data file is a hard link to the one of the latest version, if the data store
+            supports links. The data is always serialized to compute its hash.
+        chunked: bool
+            If True, the data is stored in content-defined chunks, shared by all the versions
+            of the artifact: only the chunks that differ from the existing versions are written.
+            Use `collect_garbage` to delete the chunks of deleted versions.
 
         Raises
         ------
@@ -169,80 +278,198 @@ class VersionedArtifact:
         Version
             The version object read from storage.
         """
-        # todo lock
+        staged = self.stage(data, manifest, version_name=version_name, write_mode=write_mode,
+                            executor=executor, codec=codec, chunked=chunked)
+        try:
+            duplicate = None
+            if dedup != DedupMode.NONE:
+                duplicate = self._find_duplicate(staged)
+            if duplicate is not None and dedup == DedupMode.LINK:
+                self._link_duplicate_data(staged, duplicate)
+                duplicate = None
+            if duplicate is None:
+                self.publish(staged)
+        except BaseException:
+            self.discard(staged)
+            raise
+
+        if duplicate is not None:
+            uri = duplicate.get_uri(self.location, self.datastore)
+            logger.info(f"Data identical to the latest version, not written: {uri}")
+            self.discard(staged)
+            return duplicate
+        return staged.version
+
+    def stage(self,
+              data: DataType,
+              manifest: Manifest,
+              version_name: Optional[Union[str, VersionName]] = None,
+              write_mode: WriteMode = WriteMode.ERROR_IF_EXISTS,
+              executor: Optional[Executor] = None,
+              codec: Optional[Codec] = None,
+              chunked: bool = False) -> StagedVersion:
+        """ Write some data to a staging folder, without publishing it.
 
+        The version is visible to readers only after it has been published with `publish`.
+        Use `discard` to delete a staged version instead. The arguments are the same as for
+        `write`.
+
+        Returns
+        -------
+        StagedVersion
+            The staged version, to be passed to `publish` or `discard`.
+        """
         if version_name is None:
-            prev_version_name = self.latest_version_name(raise_if_none=False)
-            version_name = self.version_name_class.next(prev_version_name)
+            version_name = self._create_version_name()
+            is_reserved = True
+        else:
+            if isinstance(version_name, str):
+                version_name = VersionName.from_string(version_name)
 
-        if isinstance(version_name, str):
-            version_name = VersionName.from_string(version_name)
+            if not isinstance(version_name, self.version_name_class):
+                raise IncompatibleVersionName(
+                    version_name=version_name,
+                    version_name_class=self.version_name_class,
+                )
+            is_reserved = self._reserve_version_name(version_name)
+
+        try:
+            user_metadata = manifest.collect_section('user', default_metadata={})
+            artifact = self.artifact_class(data, metadata=user_metadata)
+            version = Version(self.artifact_name, version_name, artifact)
+
+            # A version name that could not be reserved is being written by another process
+            replace = False
+            if not is_reserved or version.exists(
+                    self.versions_location, self.datastore, self.manifest_format):
+                if write_mode == WriteMode.ERROR_IF_EXISTS:
+                    uri = version.get_uri(self.location, self.datastore)
+                    raise VersionAlreadyExists(uri)
+                elif write_mode == WriteMode.OVERWRITE:
+                    uri = version.get_uri(self.location, self.datastore)
+                    logger.info(f"Replacing existing version: {uri}")
+                    replace = True
+
+            staging_location = version.stage(
+                self.versions_location, self.datastore, manifest, executor=executor, codec=codec,
+                chunked=chunked, manifest_format=self.manifest_format, replace=replace)
+        except BaseException:
+            # The version name reserved above is released, so that it can be used again
+            if is_reserved:
+                self._release_version_name(version_name)
+            raise
+        return StagedVersion(version=version, staging_location=staging_location, replace=replace)
+
+    def publish(self, staged: StagedVersion, delete_replaced: bool = True) -> Optional[str]:
+        """ Publish a staged version, and register it in the index.
 
-        if not isinstance(version_name, self.version_name_class):
-            raise IncompatibleVersionName(
-                version_name=version_name,
-                version_name_class=self.version_name_class,
-            )
-
-        user_metadata = manifest.collect_section('user', default_metadata={})
-        artifact = self.artifact_class(data, metadata=user_metadata)
-        version = Version(self.artifact_name, version_name, artifact)
-
-        if version.exists(self.versions_location, self.datastore):
-            if write_mode == WriteMode.ERROR_IF_EXISTS:
-                uri = version.get_uri(self.location, self.datastore)
-                raise VersionAlreadyExists(uri)
-            elif write_mode == WriteMode.OVERWRITE:
-                uri = version.get_uri(self.location, self.datastore)
-                logger.info(f"Deleting existing version before overwriting: {uri}")
-                version_location_ = version_location(self.versions_location, version_name)
-                self.datastore.delete(version_location_, recursive=True)
-
-        version.write(self.versions_location, self.datastore, manifest)
-        self._register_version_name(version_name)
+        Parameters
+        ----------
+        staged: StagedVersion
+            The version returned by `stage`.
+        delete_replaced: bool
+            If False, a replaced version is not deleted, so that it can be restored with
+            `unpublish`.
 
-        return version
+        Returns
+        -------
+        Optional[str]
+            The location where the replaced version has been moved, if it has not been deleted,
+            or None.
+        """
+        version = staged.version
+        replaced_location = version.publish(
+            self.versions_location,
+            self.datastore,
+            staged.staging_location,
+            replace=staged.replace,
+            delete_replaced=delete_replaced,
+            manifest_format=self.manifest_format,
+        )
+        self._register_version_name(version.version_name)
+        return replaced_location
+
+    def discard(self, staged: StagedVersion) -> None:
+        """ Delete a staged version that has not been published.
+
+        A new version name reserved by `stage` is released, so that it can be used again,
+        unless another writer has published a version with this name in the meantime, e.g.
+        with `WriteMode.OVERWRITE`.
+
+        Parameters
+        ----------
+        staged: StagedVersion
+            The version returned by `stage`.
+        """
+        self.datastore.delete(staged.staging_location, recursive=True)
+        # Only new versions hold the reservation of their name
+        if not staged.replace and not staged.version.exists(
+                self.versions_location, self.datastore, self.manifest_format):
+            self._release_version_name(staged.version.version_name)
+
+    def unpublish(self, staged: StagedVersion, replaced_location: Optional[str] = None) -> None:
+        """ Remove a published version, restoring the version it replaced if any.
+
+        The name of a new version is released, so that it can be used again.
+
+        Parameters
+        ----------
+        staged: StagedVersion
+            The version returned by `stage`, and then published.
+        replaced_location: str, optional
+            The location of the replaced version, as returned by `publish`.
+        """
+        version_name = staged.version.version_name
+        version_location_ = version_location(self.versions_location, version_name)
+        self.datastore.delete(version_location_, recursive=True)
+        if replaced_location is not None:
+            move_version_folder(self.datastore, replaced_location, version_location_,
+                                self.manifest_format)
+        else:
+            self.versions_index.remove(version_name)
+        if not staged.replace:
+            self._release_version_name(version_name)
 
     def all_version_names(self) -> List[VersionName]:
-        """Get all locked (and existing) artifact version names.
+        """Get all registered artifact version names.
 
-        Locked versions might not be existing yet, they are just reserved names.
+        The names are read from the index of committed versions, or from the list of versions
+        ("versions.json") for artifacts written before the index existed. In the latter case,
+        registered versions might not be existing.
 
         Returns
         -------
         List[VersionName]
-            A list of all locked version names
+            A list of all registered version names
         """
-        try:
-            raw_versions = json.loads(self.datastore.read(self.versions_list_location))
-        except FileNotFoundError:
-            raw_versions = []
-        versions = [VersionName.from_string(raw_version) for raw_version in list(raw_versions)]
-        return sorted(versions)
+        names = self.versions_index.read()
+        if names is None:
+            names = self._read_legacy_version_names()
+        return names
 
     def version_names(self) -> List[VersionName]:
         """Get all existing artifact version names.
 
-        Versions are considered as "existing" as soon as they have a "manifest.yml"
+        Versions are considered as "existing" as soon as they are published. The names are read
+        from the index of committed versions. Artifacts written before the index existed fall
+        back to listing the version folders on storage; call `rebuild_index` to avoid that.
 
         Returns
         -------
         List[VersionName]
             A list of all existing version names
         """
-        # todo create version_exists
-        return [
-            name for name in self.all_version_names()
-            if self.datastore.exists(
-                version_manifest_location(
-                    version_location(self.versions_location, name)
-                )
-            )
-        ]
+        names = self.versions_index.read()
+        if names is None:
+            names = self._scan_version_names()
+        return names
 
     def latest_version_name(self, raise_if_none=True) -> VersionName:
         """Get the name of the latest version. If none is defined, will raise an exception
 
+        The name is read from the latest version pointer in the index, so that it costs a single
+        read independently of the number of versions.
+
         Raises
         ------
         ArtifactHasNoVersion
@@ -253,10 +480,15 @@ class VersionedArtifact:
         VersionName
             The name of the latest version
         """
+        latest = self.versions_index.latest()
+        if latest is not None:
+            return latest
+
+        # No pointer: the artifact has no version, or it was written before the index existed
         versions = self.version_names()
         if not versions:
             if raise_if_none:
-                raise ArtifactHasNoVersion(self.location)
+                raise ArtifactHasNoVersion(self.versions_location)
             else:
                 return None
         return versions[-1]
@@ -280,6 +512,9 @@ class VersionedArtifact:
     def delete_version(self, version_name: Union[str, VersionName]) -> None:
         """Delete a version, will not fail if the version did not exist
 
+        The reservation of the version name is deleted too, so that a new version can be
+        written with the same name.
+
         Parameters
         ----------
         version_name: Union[str, VersionName]
@@ -288,56 +523,235 @@ class VersionedArtifact:
         if not isinstance(version_name, VersionName):
             version_name = VersionName.from_string(version_name)
 
-        self.datastore.delete(version_location(self.location, version_name), recursive=True)
+        self.datastore.delete(
+            version_location(self.versions_location, version_name), recursive=True)
 
-        # todo: need to lock versions.json here
-        names = self.all_version_names()
-        if version_name in names:
-            names.remove(version_name)
-        self._write_version_names(names)
-        # todo: need to unlock versions.json here
+        self._create_index_if_missing()
+        self.versions_index.remove(version_name)
+        self.datastore.delete(version_reservation_location(self.versions_location, version_name))
+
+    def rebuild_index(self) -> List[VersionName]:
+        """Regenerate the index of committed versions from storage.
+
+        Use this to repair the index, or to create it for artifacts written with older versions
+        of `pond`.
+
+        Returns
+        -------
+        List[VersionName]
+            A list of all existing version names
+        """
+        names = self._scan_version_names()
+        self.versions_index.rewrite(names)
+        return names
+
+    def collect_garbage(self) -> int:
+        """Delete the chunks that are not used by any version anymore.
+
+        Versions written with `chunked=True` share their chunks, which are not deleted with the
+        versions. The staged and replaced versions abandoned by interrupted writes, and the
+        reservations of the version names that have no version, are deleted too. This must not
+        run while versions of the artifact are being written.
+
+        Returns
+        -------
+        int
+            Number of deleted chunks.
+        """
+        version_names = self.version_names()
+        self._delete_abandoned_versions(version_names)
+
+        chunk_store = ChunkStore(self.datastore, chunk_store_location(self.versions_location))
+        referenced = set()
+        for version_name in version_names:
+            manifest = Version.read_manifest(
+                version_name, self.versions_location, self.datastore, self.manifest_format)
+            version_metadata = manifest.collect_section('version')
+            if version_metadata.get('storage') == CHUNKED_STORAGE:
+                data_location = version_data_location(
+                    version_location(self.versions_location, version_name),
+                    version_metadata['filename'],
+                )
+                referenced |= chunk_store.referenced_chunks(data_location)
+        return chunk_store.collect_garbage(referenced)
 
     # --- VersionedArtifact private interface
 
-    def _create_version_name(self, retry: bool = True) -> VersionName:
-        versions_lock_file = versions_lock_file_location(self.location)
-        if self.datastore.exists(versions_lock_file):
-            # In case another process just created the data dir and did non update yet the versions
-            # list, let's wait a little and retry once
-            if retry:
-                time.sleep(NEW_VERSION_WAIT_MS / 1000)
-                return self._create_version_name(False)
-            else:
-                raise ArtifactVersionsIsLocked(self.location)
-        # todo: this is not safe in case of concurrency.
-        self.datastore.write_string(versions_lock_file, '')
+    def _create_version_name(self) -> VersionName:
+        """Allocate a new version name, unique even when several processes write concurrently.
+
+        Starting after the latest version (or after the last name allocated by this object, if
+        more recent), candidate names are reserved until one reservation succeeds. When the
+        version name class cannot generate a new name yet, we wait with a bounded exponential
+        backoff before trying again.
+
+        Raises
+        ------
+        ArtifactVersionsIsLocked
+            If no version name could be reserved after `NEW_VERSION_MAX_ATTEMPTS` attempts.
+        """
+        prev_name = self.latest_version_name(raise_if_none=False)
+        last_created_name = self._last_created_version_name
+        if prev_name is None or (last_created_name is not None and last_created_name > prev_name):
+            prev_name = last_created_name
+        name = self.version_name_class.next(prev_name)
+
+        wait_ms = NEW_VERSION_MIN_WAIT_MS
+        for _ in range(NEW_VERSION_MAX_ATTEMPTS):
+            if self._reserve_version_name(name):
+                self._last_created_version_name = name
+                return name
+            next_name = self.version_name_class.next(name)
+            if str(next_name) == str(name):
+                time.sleep(wait_ms / 1000)
+                wait_ms = min(2 * wait_ms, NEW_VERSION_MAX_WAIT_MS)
+            name = next_name
+        raise ArtifactVersionsIsLocked(self.versions_location)
+
+    def _find_duplicate(self, staged: StagedVersion) -> Optional[Version]:
+        """ The latest version, if its data file is identical to the staged one.
+
+        The data files are identical if they have the same content hash, and are stored in the
+        same way: same storage (chunked or not), codec, and file extension. The content hash
+        alone is not enough, e.g. a chunked version and a plain version of the same data have
+        the same content hash, but different data files.
+        """
+        staged_signature = self._data_file_signature(
+            staged.version.version_name, staged.version.manifest)
+        latest_version_name = self.latest_version_name(raise_if_none=False)
+        if (staged_signature['content_hash'] is None
+                or latest_version_name in (None, staged.version.version_name)):
+            return None
         try:
-            names = self.all_version_names()
-            name = names[-1].next() if names else FIRST_VERSION_NAME
-            new_version_name = self._register_version_name(name)
-        finally:
-            self.datastore.delete(versions_lock_file)
+            manifest = Version.read_manifest(
+                latest_version_name, self.versions_location, self.datastore, self.manifest_format)
+        except VersionDoesNotExist:
+            return None
+        if self._data_file_signature(latest_version_name, manifest) != staged_signature:
+            return None
+        return Version(self.artifact_name, latest_version_name, staged.version.artifact,
+                       manifest=manifest)
+
+    def _data_file_signature(self, version_name: VersionName, manifest: Manifest) -> dict:
+        """ What identifies the data file of a version, apart from its name. """
+        version_metadata = manifest.collect_section('version')
+        # The data file of a replacing version is in a sub-folder, see `Version.stage`
+        filename = posixpath.basename(version_metadata.get('filename', ''))
+        basename = f'{self.artifact_name}_{str(version_name)}'
+        extension = filename[len(basename):] if filename.startswith(basename) else filename
+        return {
+            'content_hash': version_metadata.get('content_hash'),
+            'storage': version_metadata.get('storage'),
+            # Versions written before codecs were introduced are not compressed
+            'codec': version_metadata.get('codec') or NoneCodec.name,
+            'extension': extension,
+        }
 
-        return new_version_name
+    def _link_duplicate_data(self, staged: StagedVersion, duplicate: Version) -> None:
+        """ Replace the staged data file by a link to the identical data file of `duplicate`.
 
-    def _register_version_name(self, name: VersionName) -> VersionName:
-        # todo: need to lock versions.json here
-        names = self.all_version_names()
+        If the data store does not support links, the staged data file is kept.
+        """
+        filename = staged.version.manifest.collect_section('version')['filename']
+        data_location = version_data_location(staged.staging_location, filename)
+        duplicate_filename = duplicate.manifest.collect_section('version')['filename']
+        duplicate_data_location = version_data_location(
+            version_location(self.versions_location, duplicate.version_name), duplicate_filename)
 
-        if name not in names:
-            names.append(name)
-            self._write_version_names(names)
-            # todo: need to unlock versions.json here
+        link_location = data_location + '.link'
+        try:
+            self.datastore.link(duplicate_data_location, link_location)
+        except (NotImplementedError, OSError) as error:
+            logger.info(f"Cannot link to identical data file, keeping a copy: {error}")
+            return
+        self.datastore.delete(data_location)
+        self.datastore.rename(link_location, data_location)
+
+    def _delete_abandoned_versions(self, version_names: List[VersionName]) -> None:
+        """Delete the staging and trash folders, and the reservations without a version"""
+        self.datastore.delete(staging_location(self.versions_location), recursive=True)
+        self.datastore.delete(trash_location(self.versions_location), recursive=True)
+        existing = {str(name) for name in version_names}
+        try:
+            reserved = self.datastore.list(reservations_location(self.versions_location))
+        except (FileNotFoundError, NotImplementedError):
+            reserved = []
+        for name in reserved:
+            if name not in existing:
+                self.datastore.delete(
+                    urijoinpath(reservations_location(self.versions_location), name))
+
+    def _reserve_version_name(self, name: VersionName) -> bool:
+        """Atomically reserve a version name, return False if it was already reserved"""
+        reservation_location = version_reservation_location(self.versions_location, name)
+        return self.datastore.create_exclusive(reservation_location)
+
+    def _release_version_name(self, name: VersionName) -> None:
+        """Delete the reservation of a version name that has not been published"""
+        reservation_location = version_reservation_location(self.versions_location, name)
+        self.datastore.delete(reservation_location)
+        if self._last_created_version_name == name:
+            self._last_created_version_name = None
+
+    def _register_version_name(self, name: VersionName) -> None:
+        """Record a committed version in the index"""
+        self._create_index_if_missing()
+        self.versions_index.add(name)
+
+    def _create_index_if_missing(self) -> None:
+        """Create the index for artifacts written before it existed"""
+        if not self.versions_index.exists():
+            self.rebuild_index()
+
+    def _read_legacy_version_names(self) -> List[VersionName]:
+        """Read the version names from "versions.json", written by older versions of `pond`"""
+        try:
+            raw_versions = self.datastore.read_json(self.versions_list_location)
+        except FileNotFoundError:
+            raw_versions = []
+        versions = [self.version_name_class.from_string(raw_version)
+                    for raw_version in raw_versions]
+        return sorted(versions)
 
-        return name
+    def _scan_version_names(self) -> List[VersionName]:
+        """Find existing version names from the folders of the versioned artifact
 
-    def _write_version_names(self, names: List[VersionName]) -> None:
-        """Sort, serialize and write version names"""
-        strings = [str(name) for name in sorted(names)]
-        self.datastore.write_json(self.versions_list_location, strings)
+        Versions are published by renaming their complete staging folder, so every version
+        folder is an existing version: a single listing finds them, whatever their number. Data
+        stores that cannot list their content fall back to checking the manifest of each version
+        in the legacy list of versions.
+        """
+        try:
+            entries = self.datastore.list(self.versions_location)
+        except FileNotFoundError:
+            return []
+        except NotImplementedError:
+            names = sorted(set(self._read_legacy_version_names()))
+            manifest_locations = [
+                version_manifest_location(
+                    version_location(self.versions_location, name), self.manifest_format)
+                for name in names
+            ]
+            stats = self.datastore.stat_many(manifest_locations)
+            return [name for name, stat in zip(names, stats) if stat is not None]
+
+        names = []
+        for entry in entries:
+            try:
+                names.append(self.version_name_class.from_string(entry))
+            except InvalidVersionName:
+                # Not a version folder, e.g. the "_pond" folder
+                continue
+        return sorted(names)
 
     def _write_manifest(self):
         self.datastore.write_yaml(self.versions_manifest_location, self.versions_manifest)
 
     def _read_manifest(self):
         return self.datastore.read_yaml(self.versions_manifest_location)
+
+
+def _recorded_manifest_format(versions_manifest: dict) -> ManifestFormat:
+    """ Format of the manifests of the versions, YAML for artifacts created before it was
+    recorded. """
+    return ManifestFormat(versions_manifest.get('manifest_format', ManifestFormat.YAML))
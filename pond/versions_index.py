@@ -0,0 +1,215 @@
+from typing import List, Optional, Set, Tuple, Type
+
+from pond.conventions import (
+    TXT_ENCODING,
+    latest_version_location,
+    versions_index_location,
+    versions_log_location,
+)
+from pond.storage.datastore import Datastore
+from pond.version_name import VersionName
+
+
+# The log is compacted into the snapshot every time it grows by this many bytes
+VERSIONS_LOG_COMPACTION_BYTES = 16 * 1024
+
+_ADDED = '+'
+_REMOVED = '-'
+
+
+class VersionsIndex:
+
+    def __init__(self,
+                 versions_location: str,
+                 datastore: Datastore,
+                 version_name_class: Type[VersionName],
+                 compaction_bytes: int = VERSIONS_LOG_COMPACTION_BYTES):
+        """ Index of the committed versions of a versioned artifact.
+
+        The index is stored in the `_pond` folder of the versioned artifact, and is made of:
+        - a log, where each committed or deleted version is recorded by appending one line
+          ("+v3" or "-v3"). Registering a version costs one small append, and a few small reads
+          and writes to update the latest version pointer.
+        - a snapshot, where the log is periodically compacted. It contains the sorted list of
+          version names, and the offset in the log up to which the records have been included.
+        - a pointer to the latest version, so that the latest version name can be found with a
+          single read.
+
+        Parameters
+        ----------
+        versions_location: str
+            Root location of the versioned artifact in the data store.
+        datastore: Datastore
+            Data store object, representing the storage where the artifacts are read/written.
+        version_name_class: Type[VersionName]
+            Class of the version names in the index.
+        compaction_bytes: int
+            The log is compacted into the snapshot every time it grows by this many bytes.
+        """
+        self.versions_location = versions_location
+        self.datastore = datastore
+        self.version_name_class = version_name_class
+        self.compaction_bytes = compaction_bytes
+
+        self.snapshot_location = versions_index_location(versions_location)
+        self.log_location = versions_log_location(versions_location)
+        self.latest_location = latest_version_location(versions_location)
+
+    # --- VersionsIndex public interface
+
+    def exists(self) -> bool:
+        """ Returns True if the index has been created. """
+        return self.datastore.exists(self.snapshot_location)
+
+    def read(self) -> Optional[List[VersionName]]:
+        """ Read the names of all committed versions.
+
+        Returns
+        -------
+        Optional[List[VersionName]]
+            The sorted version names, or None if the index has not been created.
+        """
+        names, _ = self._read_snapshot_and_log()
+        if names is None:
+            return None
+        return self._sorted_version_names(names)
+
+    def latest(self) -> Optional[VersionName]:
+        """ Read the latest version name from the latest version pointer.
+
+        Returns
+        -------
+        Optional[VersionName]
+            The latest version name, or None if there is no pointer. This happens when the
+            artifact has no version, or when the index has not been created.
+        """
+        try:
+            latest = self.datastore.read_string(self.latest_location)
+        except FileNotFoundError:
+            return None
+        return self.version_name_class.from_string(latest)
+
+    def add(self, name: VersionName) -> None:
+        """ Record a committed version.
+
+        Parameters
+        ----------
+        name: VersionName
+            Name of the committed version.
+        """
+        log_offset = self._append(_ADDED, name)
+        latest = self.latest()
+        if latest is not None and latest >= name:
+            return
+        self.datastore.write_string(self.latest_location, str(name))
+
+        # Writers adding versions concurrently can overwrite the pointer with an older version,
+        # after it has been read. The pointer is checked once more, against this version and the
+        # versions added after it, read from the end of the log.
+        records, _ = self._read_log(log_offset)
+        added = {record_name for operation, record_name in records if operation == _ADDED}
+        newest = max([name] + self._sorted_version_names(added))
+        latest = self.latest()
+        if latest is None or latest < newest:
+            self.datastore.write_string(self.latest_location, str(newest))
+
+    def remove(self, name: VersionName) -> None:
+        """ Record a deleted version.
+
+        Parameters
+        ----------
+        name: VersionName
+            Name of the deleted version.
+        """
+        self._append(_REMOVED, name)
+        if self.latest() == name:
+            self._write_latest(self.read())
+
+    def rewrite(self, names: List[VersionName]) -> None:
+        """ Replace the content of the index.
+
+        Parameters
+        ----------
+        names: List[VersionName]
+            Names of all the committed versions.
+        """
+        try:
+            log_offset = self.datastore.size(self.log_location)
+        except FileNotFoundError:
+            log_offset = 0
+        names = sorted(names)
+        self._write_snapshot([str(name) for name in names], log_offset)
+        self._write_latest(names)
+
+    def compact(self) -> None:
+        """ Fold the log records into the snapshot, and refresh the latest version pointer. """
+        names, log_offset = self._read_snapshot_and_log()
+        if names is None:
+            names = set()
+        sorted_names = self._sorted_version_names(names)
+        self._write_snapshot([str(name) for name in sorted_names], log_offset)
+        self._write_latest(sorted_names)
+
+    # --- VersionsIndex private interface
+
+    def _append(self, operation: str, name: VersionName) -> int:
+        """ Append a record to the log, and return the log offset just after it. """
+        record = f'{operation}{name}\n'.encode(TXT_ENCODING)
+        end = self.datastore.append(self.log_location, record)
+        start = end - len(record)
+        if start // self.compaction_bytes != end // self.compaction_bytes:
+            self.compact()
+        return end
+
+    def _read_snapshot_and_log(self) -> Tuple[Optional[Set[str]], int]:
+        """ Read the snapshot, and apply the log records that follow it.
+
+        Returns the set of version names (None if neither the snapshot nor the log exist), and
+        the log offset up to which the records have been applied.
+        """
+        try:
+            snapshot = self.datastore.read_json(self.snapshot_location)
+            names = set(snapshot['versions'])
+            log_offset = snapshot['log_offset']
+        except FileNotFoundError:
+            names = None
+            log_offset = 0
+
+        records, log_offset = self._read_log(log_offset)
+        if records and names is None:
+            names = set()
+        for operation, name in records:
+            if operation == _ADDED:
+                names.add(name)
+            else:
+                names.discard(name)
+        return names, log_offset
+
+    def _read_log(self, log_offset: int) -> Tuple[List[Tuple[str, str]], int]:
+        """ Read the log records that follow an offset.
+
+        Returns the records, as (operation, version name) pairs, and the log offset just after
+        the last one.
+        """
+        try:
+            tail = self.datastore.read_range(self.log_location, log_offset)
+        except FileNotFoundError:
+            tail = b''
+
+        # Ignore an incomplete last record, in case it is being appended right now
+        tail = tail[:tail.rfind(b'\n') + 1]
+        records = [(record[0], record[1:]) for record in tail.decode(TXT_ENCODING).splitlines()]
+        return records, log_offset + len(tail)
+
+    def _sorted_version_names(self, names: Set[str]) -> List[VersionName]:
+        return sorted(self.version_name_class.from_string(name) for name in names)
+
+    def _write_snapshot(self, names: List[str], log_offset: int) -> None:
+        snapshot = {'versions': names, 'log_offset': log_offset}
+        self.datastore.write_json(self.snapshot_location, snapshot)
+
+    def _write_latest(self, sorted_names: List[VersionName]) -> None:
+        if sorted_names:
+            self.datastore.write_string(self.latest_location, str(sorted_names[-1]))
+        else:
+            self.datastore.delete(self.latest_location)
@@ -20,6 +20,8 @@ def get_requirements(filename):
 # extra requirements
 extras_require = {
     'pandas': get_requirements('requirements-pandas.txt'),
+    'parquet': get_requirements('requirements-parquet.txt'),
+    'codecs': get_requirements('requirements-codecs.txt'),
     'dask': get_requirements('requirements-dask.txt'),
     'spark': get_requirements('requirements-spark.txt')
 }
@@ -1,4 +1,7 @@
+import pytest
+
 from pond.artifact import Artifact
+from pond.exceptions import InvalidArtifactClass
 
 
 class MockArtifact(Artifact):
@@ -53,3 +56,20 @@ def test_write(tmp_path):
     # check that write_bytes has been  called with the right arguments
     assert artifact.filename == path
     assert artifact.write_kwargs == kwargs
+
+
+def test_subclass_from_id():
+    class IntermediateArtifact(MockArtifact):
+        pass
+
+    class DeepArtifact(IntermediateArtifact):
+        @classmethod
+        def class_id(cls):
+            return 'deep'
+
+    assert Artifact.subclass_from_id('deep') is DeepArtifact
+    assert MockArtifact.subclass_from_id('IntermediateArtifact') is IntermediateArtifact
+    with pytest.raises(InvalidArtifactClass):
+        DeepArtifact.subclass_from_id('IntermediateArtifact')
+    with pytest.raises(InvalidArtifactClass):
+        Artifact.subclass_from_id('DoesNotExist')
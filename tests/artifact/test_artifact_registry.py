@@ -1,7 +1,11 @@
+from fractions import Fraction
+import sys
+import textwrap
+
 import pytest
 
 from pond.artifact import Artifact
-from pond.artifact.artifact_registry import ArtifactRegistry
+from pond.artifact.artifact_registry import ArtifactRegistry, global_artifact_registry
 from pond.exceptions import FormatNotFound, ArtifactNotFound
 
 
@@ -57,3 +61,96 @@ def test_get_available_artifacts(registry):
 
     expected = [(MockArtifactCSV, 'csv'), (MockArtifactExcel, 'xlsx')]
     assert artifact_classes == expected
+
+
+def test_lookup_subclass(registry):
+    class MyList(list):
+        pass
+
+    class MyDerivedList(MyList):
+        pass
+
+    # The artifacts of the closest base class are found
+    assert registry.get_artifact(MyDerivedList) == MockArtifactExcel
+    assert registry.get_artifact(MyDerivedList, format='csv') == MockArtifactCSV
+
+    # The cached results are invalidated by new registrations
+    registry.register(MockArtifactCSV, MyList, format='mylist')
+    assert registry.get_artifact(MyDerivedList) == MockArtifactCSV
+    assert registry.get_available_artifacts(MyDerivedList) == [(MockArtifactCSV, 'mylist')]
+    assert registry.get_artifact(list) == MockArtifactExcel
+
+
+def test_lookup_numpy_array():
+    np = pytest.importorskip('numpy')
+    # Registered lazily in the global registry, for `np.ndarray`
+    artifact_class = global_artifact_registry.get_artifact(np.zeros(3).__class__)
+    assert artifact_class.class_id() == 'NumpyArrayArtifact'
+    artifact_class = global_artifact_registry.get_artifact(np.ndarray, format='npy')
+    assert artifact_class.class_id() == 'NumpyArrayNpyArtifact'
+
+
+LAZY_MODULE_SOURCE = textwrap.dedent("""
+    from fractions import Fraction
+
+    from pond.artifact import Artifact
+    from pond.artifact.artifact_registry import global_artifact_registry
+
+
+    class {class_id}(Artifact):
+        pass
+
+
+    global_artifact_registry.register({class_id}, Fraction, format='{class_id}')
+""")
+
+
+@pytest.fixture()
+def lazy_module(tmp_path, monkeypatch):
+    """ Write a module registering an artifact in the global registry when it is imported. """
+    def write(module, class_id):
+        (tmp_path / f'{module}.py').write_text(LAZY_MODULE_SOURCE.format(class_id=class_id))
+        monkeypatch.delitem(sys.modules, module, raising=False)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return write
+
+
+def test_register_lazy(lazy_module):
+    lazy_module('lazy_artifact_module', 'LazyFractionArtifact')
+    global_artifact_registry.register_lazy(
+        'lazy_artifact_module', 'fractions.Fraction', class_ids=['LazyFractionArtifact'])
+    assert 'lazy_artifact_module' not in sys.modules
+
+    # The module is imported when the data class is looked up
+    artifact_class = global_artifact_registry.get_artifact(Fraction, format='LazyFractionArtifact')
+    assert artifact_class.class_id() == 'LazyFractionArtifact'
+    assert 'lazy_artifact_module' in sys.modules
+
+
+def test_register_lazy_class_id(lazy_module):
+    lazy_module('lazy_class_id_module', 'LazyClassIdArtifact')
+    global_artifact_registry.register_lazy(
+        'lazy_class_id_module', 'fractions.Fraction', class_ids=['LazyClassIdArtifact'])
+
+    # The module is imported when the class ID is looked up, e.g. to read a version
+    artifact_class = Artifact.subclass_from_id('LazyClassIdArtifact')
+    assert artifact_class.class_id() == 'LazyClassIdArtifact'
+    assert global_artifact_registry.get_artifact(Fraction, format='LazyClassIdArtifact') \
+        is artifact_class
+
+
+def test_register_entry_points(lazy_module, tmp_path):
+    lazy_module('lazy_entry_point_module', 'LazyEntryPointArtifact')
+    dist_info = tmp_path / 'pond_test_plugin-1.0.dist-info'
+    dist_info.mkdir()
+    (dist_info / 'METADATA').write_text('Name: pond-test-plugin\nVersion: 1.0\n')
+    (dist_info / 'entry_points.txt').write_text(
+        '[pond.test_artifacts]\n'
+        'fractions.Fraction = lazy_entry_point_module:LazyEntryPointArtifact\n'
+    )
+
+    registry = ArtifactRegistry(entry_point_group='pond.test_artifacts')
+    assert 'lazy_entry_point_module' not in sys.modules
+    assert registry.load_class_id('LazyEntryPointArtifact')
+    assert 'lazy_entry_point_module' in sys.modules
+    assert not registry.load_class_id('LazyEntryPointArtifact')
@@ -0,0 +1,86 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+from pond import Activity
+from pond.artifact.chunked_array_artifact import ChunkedArrayArtifact, default_chunk_shape
+from pond.storage.file_datastore import FileDatastore
+
+
+class SmallChunksArtifact(ChunkedArrayArtifact):
+    chunk_bytes = 64
+
+
+@pytest.fixture
+def datastore(tmp_path):
+    return FileDatastore(id='foostore', base_path=tmp_path)
+
+
+@pytest.fixture
+def np_array():
+    return np.arange(7 * 11 * 3, dtype=np.float32).reshape(7, 11, 3)
+
+
+@pytest.fixture
+def metadata():
+    metadata = {
+        'source': 'test_chunked a b',
+        'm1': 12.3,
+    }
+    return metadata
+
+
+def test_default_chunk_shape():
+    assert default_chunk_shape((10, 20), itemsize=8, chunk_bytes=10 * 20 * 8) == (10, 20)
+    assert default_chunk_shape((10, 20), itemsize=8, chunk_bytes=10 * 10 * 8) == (10, 10)
+    assert default_chunk_shape((0, 5), itemsize=8, chunk_bytes=8) == (1, 1)
+
+
+def test_write_then_read(datastore, np_array, metadata):
+    SmallChunksArtifact(np_array, metadata).write_datastore(datastore, 'a/test.chunks')
+    index = datastore.read_json('a/test.chunks/index.json')
+    assert index['shape'] == [7, 11, 3]
+    n_chunks = int(np.prod([np.ceil(s / c) for s, c in zip(index['shape'], index['chunks'])]))
+    assert n_chunks > 1
+    assert len(list((datastore.base_path / 'a/test.chunks').iterdir())) == n_chunks + 1
+
+    artifact = SmallChunksArtifact.read_datastore(datastore, 'a/test.chunks')
+    assert_array_equal(artifact.data, np_array)
+    assert artifact.data.dtype == np_array.dtype
+    assert artifact.metadata == {k: str(v) for k, v in metadata.items()}
+
+
+@pytest.mark.parametrize('selection', [
+    np.s_[2:5],
+    np.s_[3, 1:9, 2],
+    np.s_[-1, ::3],
+    np.s_[::-2, 10:2:-3, :],
+    np.s_[5:2],
+    (),
+])
+def test_read_selection(datastore, np_array, selection):
+    SmallChunksArtifact(np_array).write_datastore(datastore, 'test.chunks')
+    artifact = SmallChunksArtifact.read_datastore(datastore, 'test.chunks', selection=selection)
+    assert_array_equal(artifact.data, np_array[selection])
+
+
+def test_read_selection_reads_intersecting_chunks_only(datastore, np_array, monkeypatch):
+    SmallChunksArtifact(np_array).write_datastore(datastore, 'test.chunks')
+    read_paths = []
+    original_read = datastore.read
+
+    def read(path):
+        read_paths.append(path)
+        return original_read(path)
+
+    monkeypatch.setattr(datastore, 'read', read)
+    SmallChunksArtifact.read_datastore(datastore, 'test.chunks', selection=np.s_[0, 0, 0])
+    assert read_paths == ['test.chunks/index.json', 'test.chunks/0.0.0']
+
+
+def test_activity_read_selection(datastore, np_array):
+    activity = Activity(source='test', location='test_location', datastore=datastore)
+    activity.write(np_array, name='tensor', artifact_class=ChunkedArrayArtifact)
+
+    assert_array_equal(activity.read('tensor', selection=np.s_[1:3, 4]), np_array[1:3, 4])
+    assert_array_equal(activity.read('tensor'), np_array)
@@ -0,0 +1,67 @@
+import mmap
+
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+from pond.artifact.numpy_array_npy_artifact import NumpyArrayNpyArtifact
+from pond.storage.file_datastore import FileDatastore
+
+
+@pytest.fixture
+def np_array():
+    data = np.array(
+        [[1.2, 3.1, 7.4],
+         [np.nan, 1.0, np.nan]],
+    )
+    return data
+
+
+@pytest.fixture
+def metadata():
+    metadata = {
+        'source': 'test_to_npy a b',
+        'm1': 12.3,
+    }
+    return metadata
+
+
+def test_write_then_read_bytes(tmp_path, np_array, metadata):
+    artifact = NumpyArrayNpyArtifact(np_array, metadata)
+    path = tmp_path / NumpyArrayNpyArtifact.filename('test')
+    artifact.write(path)
+
+    with open(path, 'rb') as f:
+        content = NumpyArrayNpyArtifact.read_bytes(f)
+    assert_array_equal(np_array, content.data)
+    assert content.metadata == {k: str(v) for k, v in metadata.items()}
+
+    # The file is still a valid .npy file
+    assert_array_equal(np.load(path), np_array)
+    assert_array_equal(np.load(path, mmap_mode='r'), np_array)
+
+
+def test_read_datastore_is_memory_mapped(tmp_path, metadata):
+    datastore = FileDatastore(id='foostore', base_path=tmp_path)
+    data = np.asfortranarray(np.arange(24, dtype=np.int32).reshape(4, 6))
+    with datastore.open('test.npy', 'wb') as f:
+        NumpyArrayNpyArtifact(data, metadata).write_bytes(f)
+
+    artifact = NumpyArrayNpyArtifact.read_datastore(datastore, 'test.npy')
+    assert_array_equal(artifact.data, data)
+    assert artifact.data.flags.f_contiguous
+    # The array is a view on the memory-mapped file
+    base = artifact.data
+    while isinstance(base, np.ndarray):
+        base = base.base
+    assert isinstance(base.obj, mmap.mmap)
+    assert not artifact.data.flags.writeable
+    assert artifact.metadata == {k: str(v) for k, v in metadata.items()}
+
+
+def test_read_without_metadata(tmp_path, np_array):
+    np.save(tmp_path / 'test.npy', np_array)
+    with open(tmp_path / 'test.npy', 'rb') as f:
+        content = NumpyArrayNpyArtifact.read_bytes(f, metadata={'a': 'b'})
+    assert_array_equal(np_array, content.data)
+    assert content.metadata == {'a': 'b'}
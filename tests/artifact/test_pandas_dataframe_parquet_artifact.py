@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pond import Activity
+from pond.artifact.artifact_registry import global_artifact_registry
+from pond.artifact.pandas_dataframe_artifact import PandasDataFrameArtifact
+from pond.artifact.pandas_dataframe_parquet_artifact import PandasDataFrameParquetArtifact
+from pond.storage.file_datastore import FileDatastore
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def pandas_df():
+    data = pd.DataFrame(
+        data={
+            'C0': [1.2, -0.1, np.nan],
+            'C1': pd.array([3, 2, None], dtype='Int64'),
+            'C2': ['a', 'b', None],
+            'C3': pd.to_datetime(['2022-01-01', '2022-06-01', '2023-01-01']),
+        },
+        index=pd.Index(['I0', 'I1', 'I2'], name='foo_index'),
+    )
+    return data
+
+
+@pytest.fixture
+def metadata():
+    metadata = {
+        'source': 'test_to_parquet a b',
+        'm1': 12.3,
+    }
+    return metadata
+
+
+def test_write_then_read_bytes(tmp_path, pandas_df, metadata):
+    original = PandasDataFrameParquetArtifact(pandas_df, metadata)
+    original.write(tmp_path / 'test.parquet')
+
+    with open(tmp_path / 'test.parquet', 'rb') as f:
+        artifact = PandasDataFrameParquetArtifact.read_bytes(f)
+
+    # The dtypes are preserved
+    pd.testing.assert_frame_equal(artifact.data, original.data)
+    assert artifact.metadata == {k: str(v) for k, v in original.metadata.items()}
+
+
+def test_read_columns_and_filters(tmp_path, pandas_df, metadata):
+    PandasDataFrameParquetArtifact(pandas_df, metadata).write(tmp_path / 'test.parquet')
+
+    with open(tmp_path / 'test.parquet', 'rb') as f:
+        artifact = PandasDataFrameParquetArtifact.read_bytes(
+            f, columns=['C0', 'C3'], filters=[('C3', '>=', pd.Timestamp('2022-06-01'))])
+
+    pd.testing.assert_frame_equal(artifact.data, pandas_df.loc[['I1', 'I2'], ['C0', 'C3']])
+    assert artifact.metadata == {k: str(v) for k, v in metadata.items()}
+
+
+def test_registry(pandas_df):
+    artifact_class = global_artifact_registry.get_artifact(pd.DataFrame, format='parquet')
+    assert artifact_class is PandasDataFrameParquetArtifact
+    # CSV is still the default
+    assert global_artifact_registry.get_artifact(pd.DataFrame) is PandasDataFrameArtifact
+
+
+def test_activity_read_columns(tmp_path, pandas_df):
+    datastore = FileDatastore(id='foostore', base_path=tmp_path)
+    activity = Activity(source='test', location='test_location', datastore=datastore)
+    activity.write(pandas_df, name='df', format='parquet')
+
+    data = activity.read('df', columns=['C1'])
+    pd.testing.assert_frame_equal(data, pandas_df[['C1']])
+    pd.testing.assert_frame_equal(activity.read('df'), pandas_df)
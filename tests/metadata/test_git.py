@@ -73,3 +73,49 @@ def test_missing_git_repository_default(tmp_path):
     finally:
         # Restore the old path
         os.chdir(old_path)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = git.Repo.init(tmp_path / 'pond')
+    repo.create_remote('origin', 'git@gitserver.com:author/pond.git')
+    _commit(repo, 'first')
+    return repo
+
+
+def _commit(repo, message):
+    actor = git.Actor('John Doe', 'john@doe.com')
+    return repo.index.commit(message, author=actor, committer=actor).hexsha
+
+
+def test_collect_from_files(repo):
+    source = GitMetadataSource(git_repo=repo)
+    metadata = source.collect()
+    assert metadata == source._collect_with_gitpython()
+
+    # New commit, new branch, refs packed: the cached metadata is invalidated
+    sha = _commit(repo, 'second')
+    assert source.collect()['sha'] == sha
+    repo.create_head('feature').checkout()
+    assert source.collect()['branch'] == 'feature'
+    repo.git.pack_refs('--all')
+    assert source.collect() == source._collect_with_gitpython()
+
+
+def test_collect_is_cached(repo):
+    source = GitMetadataSource(git_repo=repo)
+    expected = source.collect()
+    with patch('pond.metadata.git.git_repo_name', side_effect=AssertionError):
+        assert source.collect() == expected
+        # Other sources on the same repository share the cache
+        assert GitMetadataSource(git_repo=git.Repo(repo.working_tree_dir)).collect() == expected
+
+
+def test_collect_detached_head(repo):
+    sha = repo.head.commit.hexsha
+    _commit(repo, 'second')
+    repo.git.checkout(sha)
+    source = GitMetadataSource(git_repo=repo)
+    with patch.object(source, '_collect_with_gitpython', return_value={'sha': sha}) as collect:
+        assert source.collect() == {'sha': sha}
+    collect.assert_called_once()
@@ -30,3 +30,16 @@ def test_to_form_yaml(tmp_path, nested_metadata):
     reloaded = Manifest.from_yaml(manifest_location, datastore)
     assert reloaded.collect() == nested_metadata
 
+
+@pytest.mark.parametrize('filename', ['manifest.yml', 'manifest.json'])
+def test_to_from_file(tmp_path, nested_metadata, filename):
+    manifest = Manifest.from_nested_dict(nested_metadata)
+
+    datastore = FileDatastore(id='foostore', base_path=str(tmp_path))
+    manifest.to_file(filename, datastore)
+
+    # The format is given by the extension
+    if filename.endswith('.json'):
+        assert datastore.read_json(filename) == nested_metadata
+    reloaded = Manifest.from_file(filename, datastore)
+    assert reloaded.collect() == nested_metadata
@@ -0,0 +1,31 @@
+import asyncio
+
+from pond.storage.async_datastore import ExecutorAsyncDatastore
+from pond.storage.file_datastore import FileDatastore
+
+
+def test_executor_async_datastore(tmp_path):
+    datastore = ExecutorAsyncDatastore(FileDatastore(id='foostore', base_path=tmp_path))
+    assert datastore.id == 'foostore'
+
+    async def read_write():
+        await datastore.makedirs('foo')
+        await datastore.write('foo/data.bin', b'012')
+        await datastore.write_string('foo/data.txt', 'abc')
+        async with datastore.open('foo/file.bin', 'wb') as f:
+            await f.write(b'xyz')
+        async with datastore.open('foo/file.bin', 'rb') as f:
+            await f.seek(1)
+            content = await f.read()
+        results = await asyncio.gather(
+            datastore.read('foo/data.bin'),
+            datastore.read_string('foo/data.txt'),
+            datastore.exists('foo/data.bin'),
+        )
+        await datastore.delete('foo', recursive=True)
+        return content, results, await datastore.exists('foo')
+
+    content, results, exists_after_delete = asyncio.run(read_write())
+    assert content == b'yz'
+    assert results == [b'012', 'abc', True]
+    assert not exists_after_delete
@@ -0,0 +1,142 @@
+import os
+import time
+
+import pytest
+
+from pond import Activity
+from pond.artifact.dict_artifact import DictArtifact
+from pond.conventions import WriteMode, is_immutable_location
+from pond.storage.caching_datastore import CachingDatastore
+from pond.storage.file_datastore import FileDatastore
+
+
+@pytest.fixture
+def backend(tmp_path):
+    base_path = tmp_path / 'backend'
+    base_path.mkdir()
+    return FileDatastore(id='foostore', base_path=str(base_path))
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'cache')
+
+
+def test_is_immutable_location():
+    assert is_immutable_location('loc/foo/v1/foo_v1.csv')
+    assert is_immutable_location('loc/foo/v1/_pond/manifest.yml')
+    assert is_immutable_location('loc/foo/v1/_pond/manifest.json')
+    assert is_immutable_location('loc/foo/_pond/chunks/ab/abcd')
+    assert not is_immutable_location('loc/foo/_pond/index.json')
+    assert not is_immutable_location('loc/foo/_pond/latest')
+    assert not is_immutable_location('loc/foo/_pond/staging/v1.1234/_pond/manifest.yml')
+    assert not is_immutable_location('loc/foo/manifest.yml')
+    assert not is_immutable_location('loc/foo/versions.json')
+    # Only the version folders and the chunk store are immutable
+    assert is_immutable_location('foo/v2/0123abcd/foo_v2.csv')
+    assert not is_immutable_location('loc/foo/data.csv')
+    assert not is_immutable_location('loc/foo/vendor/data.csv')
+    assert not is_immutable_location('v1/foo_v1.csv')
+    assert not is_immutable_location('loc/foo/v1')
+    assert not is_immutable_location('loc/foo/v1/_pond/other.yml')
+    assert not is_immutable_location('loc/foo/_pond/trash/v1.1234/foo_v1.csv')
+    assert not is_immutable_location('loc/foo/_pond/reserved/v1')
+    assert not is_immutable_location('loc/foo/_pond/chunks')
+
+
+def test_read_through(backend, cache_dir):
+    ds = CachingDatastore(backend, cache_dir)
+    assert ds.id == 'foostore'
+    backend.write('loc/foo/v1/data.txt', b'data')
+    backend.write('loc/foo/_pond/latest', b'v1')
+
+    assert ds.read('loc/foo/v1/data.txt') == b'data'
+    assert ds.stats().misses == 1
+    with ds.open('loc/foo/v1/data.txt', 'rb') as f:
+        assert f.read() == b'data'
+    assert bytes(ds.map('loc/foo/v1/data.txt')) == b'data'
+    assert ds.stats().hits == 2
+    assert ds.read('loc/foo/_pond/latest') == b'v1'
+
+    # Immutable files are served from the cache, mutable files are not cached
+    backend.write('loc/foo/v1/data.txt', b'changed')
+    backend.write('loc/foo/_pond/latest', b'v2')
+    assert ds.read('loc/foo/v1/data.txt') == b'data'
+    assert ds.read('loc/foo/_pond/latest') == b'v2'
+
+    with pytest.raises(FileNotFoundError):
+        ds.read('loc/foo/v2/data.txt')
+
+
+def test_writes_invalidate(backend, cache_dir):
+    ds = CachingDatastore(backend, cache_dir)
+    backend.write('loc/foo/v1/data.txt', b'data')
+    assert ds.read('loc/foo/v1/data.txt') == b'data'
+
+    ds.write('loc/foo/v1/data.txt', b'new data')
+    assert ds.read('loc/foo/v1/data.txt') == b'new data'
+
+    ds.delete('loc/foo/v1', recursive=True)
+    assert not ds.exists('loc/foo/v1/data.txt')
+    with pytest.raises(FileNotFoundError):
+        ds.read('loc/foo/v1/data.txt')
+
+
+def test_eviction(backend, cache_dir):
+    ds = CachingDatastore(backend, cache_dir, max_bytes=2500)
+    for i in range(1, 4):
+        backend.write(f'loc/foo/v{i}/data.txt', bytes(1000))
+        ds.read(f'loc/foo/v{i}/data.txt')
+        # Distinct access times
+        time.sleep(0.01)
+
+    # The least recently read file has been evicted
+    assert ds.stats().evictions == 1
+    assert not os.path.exists(ds._local_path('loc/foo/v1/data.txt'))
+    assert os.path.exists(ds._local_path('loc/foo/v3/data.txt'))
+    assert ds.read('loc/foo/v1/data.txt') == bytes(1000)
+
+    # Files larger than the budget are not cached
+    backend.write('loc/foo/v9/data.txt', bytes(5000))
+    assert ds.read('loc/foo/v9/data.txt') == bytes(5000)
+    assert not os.path.exists(ds._local_path('loc/foo/v9/data.txt'))
+
+
+def test_metadata_ttl(backend, cache_dir):
+    ds = CachingDatastore(backend, cache_dir, metadata_ttl=60)
+    backend.write('loc/foo/_pond/latest', b'v1')
+    assert ds.read('loc/foo/_pond/latest') == b'v1'
+    backend.write('loc/foo/_pond/latest', b'v2')
+    assert ds.read('loc/foo/_pond/latest') == b'v1'
+    with ds.open('loc/foo/_pond/latest', 'r') as f:
+        assert f.read() == 'v1'
+
+    ds.write('loc/foo/_pond/latest', b'v3')
+    assert ds.read('loc/foo/_pond/latest') == b'v3'
+
+
+def test_activity(backend, cache_dir):
+    activity = Activity(source='test', location='loc',
+                        datastore=CachingDatastore(backend, cache_dir))
+    activity.write({'a': 1}, name='foo', artifact_class=DictArtifact)
+    activity.write({'a': 2}, name='foo', artifact_class=DictArtifact)
+    assert activity.read('foo', 'v1') == {'a': 1}
+    assert activity.read('foo') == {'a': 2}
+    activity.write({'a': 3}, name='foo', version_name='v1', artifact_class=DictArtifact,
+                   write_mode=WriteMode.OVERWRITE)
+    assert activity.read('foo', 'v1') == {'a': 3}
+
+
+def test_partial_reads(backend, cache_dir):
+    ds = CachingDatastore(backend, cache_dir)
+    backend.write('loc/foo/v1/data.txt', b'0123456789')
+
+    # Partial reads of files that are not cached do not add them to the cache
+    assert ds.read_range('loc/foo/v1/data.txt', -3) == b'789'
+    assert ds.size('loc/foo/v1/data.txt') == 10
+    assert ds.stats().misses == 0
+
+    assert list(ds.stream('loc/foo/v1/data.txt', buffer_size=4)) == [b'0123', b'4567', b'89']
+    assert ds.stats().misses == 1
+    assert ds.read_range('loc/foo/v1/data.txt', 2, 3) == b'234'
+    assert ds.stats().hits == 1
@@ -146,3 +146,130 @@ def test_delete_file(tmp_path):
 
     ds.delete(filename)
     assert not ds.exists(filename)
+
+
+def test_create_exclusive(tmp_path):
+    ds = FileDatastore(id='foostore', base_path=tmp_path)
+
+    assert ds.create_exclusive('a/b/reserved', b'first')
+    assert not ds.create_exclusive('a/b/reserved', b'second')
+    # The content of the file is not modified by the failed attempt
+    assert ds.read('a/b/reserved') == b'first'
+
+
+def test_append(tmp_path):
+    ds = FileDatastore(id='foostore', base_path=tmp_path)
+
+    # The file and intermediate directories are created if needed
+    assert ds.append('a/b/log.txt', b'abc\n') == 4
+    assert ds.append('a/b/log.txt', b'de\n') == 7
+    assert ds.read('a/b/log.txt') == b'abc\nde\n'
+
+
+def test_rename(tmp_path):
+    ds = FileDatastore(id='foostore', base_path=tmp_path)
+    ds.write('a/data.bin', b'something')
+    ds.write('b/data.bin', b'else')
+
+    # Intermediate directories are created
+    ds.rename('a', 'c/d')
+    assert not ds.exists('a')
+    assert ds.read('c/d/data.bin') == b'something'
+
+    with pytest.raises(FileExistsError):
+        ds.rename('b', 'c/d')
+    with pytest.raises(FileNotFoundError):
+        ds.rename('a', 'e')
+
+
+def test_rename_onto_existing_path(tmp_path, monkeypatch):
+    ds = FileDatastore(id='foostore', base_path=tmp_path)
+    ds.write('a/data.bin', b'something')
+    ds.write('b/data.bin', b'else')
+    ds.write('c.bin', b'c')
+    ds.write('d.bin', b'd')
+    # The existing paths are detected by the renaming itself, even if they are created by
+    # another process after any check
+    monkeypatch.setattr(os.path, 'exists', lambda path: False)
+
+    with pytest.raises(FileExistsError):
+        ds.rename('b', 'a')
+    with pytest.raises(FileExistsError):
+        ds.rename('c.bin', 'd.bin')
+    assert ds.read('a/data.bin') == b'something'
+    assert ds.read('b/data.bin') == b'else'
+    assert ds.read('c.bin') == b'c'
+    assert ds.read('d.bin') == b'd'
+
+    ds.rename('c.bin', 'e/c.bin')
+    assert ds.read('e/c.bin') == b'c'
+    assert not os.path.isfile(os.path.join(tmp_path, 'c.bin'))
+
+
+def test_map(tmp_path):
+    ds = FileDatastore(id='foostore', base_path=tmp_path)
+    ds.write('a/data.bin', b'0123456789')
+    ds.write('a/empty.bin', b'')
+
+    buffer = ds.map('a/data.bin')
+    assert buffer[2:5] == b'234'
+    assert len(buffer) == 10
+    assert ds.map('a/empty.bin') == b''
+    with pytest.raises(FileNotFoundError):
+        ds.map('a/does_not_exist.bin')
+
+
+def test_link(tmp_path):
+    ds = FileDatastore(id='foostore', base_path=tmp_path)
+    ds.write('a/data.bin', b'012')
+
+    ds.link('a/data.bin', 'b/c/data.bin')
+    assert ds.read('b/c/data.bin') == b'012'
+    assert os.path.samefile(tmp_path / 'a/data.bin', tmp_path / 'b/c/data.bin')
+    with pytest.raises(FileExistsError):
+        ds.link('a/data.bin', 'b/c/data.bin')
+
+
+def test_list(tmp_path):
+    ds = FileDatastore(base_path=str(tmp_path), id='foostore')
+    ds.write('dir/a.txt', b'a')
+    ds.makedirs('dir/sub')
+    assert sorted(ds.list('dir')) == ['a.txt', 'sub']
+    with pytest.raises(FileNotFoundError):
+        ds.list('does_not_exist')
+
+
+def test_partial_reads(tmp_path):
+    ds = FileDatastore(base_path=str(tmp_path), id='foostore')
+    ds.write('a/data', b'0123456789')
+    assert ds.size('a/data') == 10
+    assert ds.read_range('a/data', 2, 3) == b'234'
+    assert ds.read_range('a/data', 8, 100) == b'89'
+    assert ds.read_range('a/data', 20, 5) == b''
+    assert ds.read_range('a/data', 4) == b'456789'
+    assert ds.read_range('a/data', -3) == b'789'
+    assert ds.read_range('a/data', -3, 2) == b'78'
+    assert list(ds.stream('a/data', buffer_size=4)) == [b'0123', b'4567', b'89']
+    with pytest.raises(FileNotFoundError):
+        ds.size('does_not_exist')
+    with pytest.raises(FileNotFoundError):
+        ds.read_range('does_not_exist', 0, 1)
+
+
+def test_list_recursive_and_stat_many(tmp_path):
+    ds = FileDatastore(base_path=str(tmp_path), id='foostore')
+    ds.write('a/b/c.txt', b'abc')
+    ds.write('a/d.txt', b'd')
+    ds.write('e.txt', b'')
+    assert sorted(ds.list('a', recursive=True)) == ['b/c.txt', 'd.txt']
+    assert sorted(ds.list('', recursive=True)) == ['a/b/c.txt', 'a/d.txt', 'e.txt']
+
+    stats = ds.stat_many(['a/d.txt', 'a/b/c.txt', 'a/missing', 'a/b', 'missing/f', 'a/d.txt'])
+    assert [stat.size for stat in stats[:2]] == [1, 3]
+    assert stats[0].mtime == os.path.getmtime(tmp_path / 'a' / 'd.txt')
+    assert not stats[0].is_dir
+    assert stats[2] is None
+    assert stats[3].is_dir
+    assert stats[4] is None
+    assert stats[5] == stats[0]
+    assert ds.stat_many([]) == []
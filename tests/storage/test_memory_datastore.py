@@ -0,0 +1,180 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from pond import Activity
+from pond.storage.file_datastore import FileDatastore
+from pond.storage.memory_datastore import MemoryDatastore
+
+
+@pytest.fixture
+def ds():
+    return MemoryDatastore(id='foostore')
+
+
+def test_read_write(ds):
+    data = b'pond'
+    ds.write('a/b/c.txt', data)
+    assert ds.read('a/b/c.txt') is data
+    assert ds.read('/a//b/c.txt') is data
+    assert bytes(ds.map('a/b/c.txt')) == data
+    assert ds.exists('a/b/c.txt')
+    assert ds.exists('a/b')
+    assert not ds.exists('a/c')
+    with pytest.raises(FileNotFoundError):
+        ds.read('a/c')
+    with pytest.raises(IsADirectoryError):
+        ds.read('a/b')
+    assert ds.size_bytes == 4
+
+
+def test_open(ds):
+    with ds.open('file.txt', 'w') as f:
+        f.write('hello ')
+        # The file is stored when it is closed
+        assert not ds.exists('file.txt')
+    with ds.open('file.txt', 'a') as f:
+        f.write('world')
+    with ds.open('file.txt', 'r') as f:
+        assert f.read() == 'hello world'
+    with ds.open('file.txt', 'rb') as f:
+        f.seek(6)
+        assert f.read() == b'world'
+    with pytest.raises(FileExistsError):
+        ds.open('file.txt', 'xb')
+    with pytest.raises(FileNotFoundError):
+        ds.open('does_not_exist', 'rb')
+
+
+def test_append(ds):
+    assert ds.append('log', b'abc') == 3
+    assert ds.append('log', b'de') == 5
+    assert ds.read('log') == b'abcde'
+
+
+def test_delete_and_makedirs(ds):
+    ds.write('a/b/c.txt', b'c')
+    ds.write('a/d.txt', b'd')
+    ds.makedirs('a/e/f')
+    assert sorted(ds.list('a')) == ['b', 'd.txt', 'e']
+    assert sorted(ds.list('')) == ['a']
+
+    with pytest.raises(IsADirectoryError):
+        ds.delete('a')
+    ds.delete('a/d.txt')
+    assert not ds.exists('a/d.txt')
+    ds.delete('a', recursive=True)
+    assert not ds.exists('a')
+    assert not ds.exists('a/b/c.txt')
+    assert not ds.exists('a/e/f')
+    # Deleting a missing file does nothing
+    ds.delete('a')
+
+
+def test_rename_and_link(ds):
+    ds.write('staging/v1/data', b'data')
+    ds.write('staging/v1/_pond/manifest.yml', b'manifest')
+    ds.rename('staging/v1', 'v1')
+    assert ds.read('v1/data') == b'data'
+    assert ds.read('v1/_pond/manifest.yml') == b'manifest'
+    assert not ds.exists('staging/v1')
+    assert ds.list('staging') == []
+
+    ds.write('other', b'')
+    with pytest.raises(FileExistsError):
+        ds.rename('other', 'v1/data')
+    with pytest.raises(FileNotFoundError):
+        ds.rename('does_not_exist', 'foo')
+
+    ds.link('v1/data', 'v2/data')
+    assert ds.read('v2/data') is ds.read('v1/data')
+    with pytest.raises(FileExistsError):
+        ds.link('v1/data', 'v2/data')
+
+
+def test_create_exclusive(ds):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: ds.create_exclusive('reserved/v1'), range(32)))
+    assert results.count(True) == 1
+
+
+def test_snapshot_and_flush(ds, tmp_path):
+    ds.write('a/b.txt', b'b')
+    snapshot = ds.snapshot()
+    ds.write('a/b.txt', b'modified')
+    ds.write('c.txt', b'c')
+    assert snapshot.read('a/b.txt') == b'b'
+    assert not snapshot.exists('c.txt')
+
+    file_datastore = FileDatastore(id='foostore', base_path=str(tmp_path))
+    ds.flush(file_datastore, 'a')
+    assert file_datastore.read('a/b.txt') == b'modified'
+    assert not file_datastore.exists('c.txt')
+
+
+def test_activity(ds):
+    activity = Activity(source='test', location='loc', datastore=ds)
+    df = pd.DataFrame({'a': [1, 2]})
+    activity.write(df, name='df')
+    activity.write(df * 2, name='df')
+    pd.testing.assert_frame_equal(activity.read('df', 'v1'), df)
+    pd.testing.assert_frame_equal(activity.read('df'), df * 2)
+
+
+def test_partial_reads(ds):
+    ds.write('a/data', b'0123456789')
+    assert ds.size('a/data') == 10
+    assert ds.read_range('a/data', 2, 3) == b'234'
+    assert ds.read_range('a/data', 8, 100) == b'89'
+    assert ds.read_range('a/data', -3) == b'789'
+    assert list(ds.stream('a/data', buffer_size=4)) == [b'0123', b'4567', b'89']
+
+
+def test_list_recursive_and_stat_many(ds):
+    ds.write('a/b/c.txt', b'abc')
+    ds.write('a/d.txt', b'd')
+    assert sorted(ds.list('a', recursive=True)) == ['b/c.txt', 'd.txt']
+
+    stats = ds.stat_many(['a/d.txt', 'a/b/c.txt', 'a/missing', 'a/b'])
+    assert [stat.size for stat in stats[:2]] == [1, 3]
+    assert stats[0].mtime is not None
+    assert stats[2] is None
+    assert stats[3].is_dir
+    ds.rename('a', 'f')
+    assert ds.stat_many(['f/d.txt'])[0].mtime == stats[0].mtime
+
+
+def test_append_grows_in_place(ds):
+    ds.write('log', b'a')
+    for _ in range(3):
+        ds.append('log', b'b')
+    data = ds.read('log')
+    assert ds.append('log', b'c') == 5
+    # The content read before the append does not change
+    assert data == b'abbb'
+    assert ds.read('log') == b'abbbc'
+    assert ds.read_range('log', 1, 2) == b'bb'
+    assert ds.snapshot().read('log') == b'abbbc'
+    ds.write('log', b'new')
+    assert ds.read('log') == b'new'
+
+
+def test_list_after_rename_and_delete(ds):
+    ds.write('a/b/c.txt', b'abc')
+    ds.write('a/b/d/e.txt', b'e')
+    ds.write('ab/f.txt', b'f')
+    ds.rename('a/b', 'g/h')
+    assert sorted(ds.list('')) == ['a', 'ab', 'g']
+    assert ds.list('a') == []
+    assert sorted(ds.list('g', recursive=True)) == ['h/c.txt', 'h/d/e.txt']
+    assert ds.read('g/h/d/e.txt') == b'e'
+
+    ds.delete('g/h/d', recursive=True)
+    assert ds.list('g/h') == ['c.txt']
+    assert not ds.exists('g/h/d/e.txt')
+    ds.delete('g/h/c.txt')
+    assert ds.list('g/h') == []
+    ds.delete('', recursive=True)
+    assert ds.list('') == []
+    assert ds.list('', recursive=True) == []
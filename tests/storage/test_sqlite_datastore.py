@@ -0,0 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from pond import Activity
+from pond.storage.sqlite_datastore import SqliteDatastore
+
+
+@pytest.fixture
+def ds(tmp_path):
+    datastore = SqliteDatastore(id='foostore', path=str(tmp_path / 'pond.db'))
+    yield datastore
+    datastore.close()
+
+
+def test_read_write(ds):
+    ds.write('a/b/c.txt', b'pond')
+    assert ds.read('/a//b/c.txt') == b'pond'
+    assert bytes(ds.map('a/b/c.txt')) == b'pond'
+    ds.write('a/b/c.txt', b'overwritten')
+    assert ds.read('a/b/c.txt') == b'overwritten'
+    assert ds.exists('a/b/c.txt')
+    assert ds.exists('a/b')
+    assert not ds.exists('a/c')
+    with pytest.raises(FileNotFoundError):
+        ds.read('a/c')
+    with pytest.raises(IsADirectoryError):
+        ds.read('a/b')
+
+
+def test_open(ds):
+    with ds.open('file.txt', 'w') as f:
+        f.write('hello ')
+    with ds.open('file.txt', 'a') as f:
+        f.write('world')
+    with ds.open('file.txt', 'r') as f:
+        assert f.read() == 'hello world'
+    with ds.open('file.txt', 'rb') as f:
+        f.seek(6)
+        # The reader sees the file as it was when it was opened
+        ds.write('file.txt', b'modified')
+        assert f.read() == b'world'
+    with pytest.raises(FileExistsError):
+        ds.open('file.txt', 'xb')
+    with pytest.raises(FileNotFoundError):
+        ds.open('does_not_exist', 'rb')
+
+
+def test_append(ds):
+    assert ds.append('log', b'abc') == 3
+    assert ds.append('log', b'de') == 5
+    assert ds.read('log') == b'abcde'
+
+
+def test_delete_and_makedirs(ds):
+    ds.write('a/b/c.txt', b'c')
+    ds.write('a/d.txt', b'd')
+    ds.write('a-b.txt', b'e')
+    ds.makedirs('a/e/f')
+    assert sorted(ds.list('a')) == ['b', 'd.txt', 'e']
+    assert sorted(ds.list('')) == ['a', 'a-b.txt']
+    with pytest.raises(FileNotFoundError):
+        ds.list('missing')
+
+    with pytest.raises(IsADirectoryError):
+        ds.delete('a')
+    ds.delete('a/d.txt')
+    assert not ds.exists('a/d.txt')
+    ds.delete('a', recursive=True)
+    assert not ds.exists('a')
+    assert not ds.exists('a/b/c.txt')
+    assert not ds.exists('a/e/f')
+    assert ds.exists('a-b.txt')
+    # Deleting a missing file does nothing
+    ds.delete('a')
+
+
+def test_rename_and_link(ds):
+    ds.write('staging/v1/data', b'data')
+    ds.write('staging/v1/_pond/manifest.yml', b'manifest')
+    ds.makedirs('staging/v1/empty')
+    ds.makedirs('staging/v2')
+    ds.rename('staging/v1', 'v1')
+    assert ds.read('v1/data') == b'data'
+    assert ds.read('v1/_pond/manifest.yml') == b'manifest'
+    assert sorted(ds.list('v1')) == ['_pond', 'data', 'empty']
+    assert ds.list('staging') == ['v2']
+
+    ds.write('other', b'')
+    with pytest.raises(FileExistsError):
+        ds.rename('other', 'v1/data')
+    with pytest.raises(FileNotFoundError):
+        ds.rename('does_not_exist', 'foo')
+
+    ds.link('v1/data', 'v2/data')
+    assert ds.read('v2/data') == b'data'
+    with pytest.raises(FileExistsError):
+        ds.link('v1/data', 'v2/data')
+
+
+def test_create_exclusive(ds):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: ds.create_exclusive('reserved/v1'), range(32)))
+    assert results.count(True) == 1
+
+
+def test_transaction(ds):
+    with ds.transaction():
+        for i in range(100):
+            ds.write(f'items/{i}', str(i).encode())
+        with ds.transaction():
+            ds.append('items/0', b'0')
+    assert len(ds.list('items')) == 100
+    assert ds.read('items/0') == b'00'
+
+    with pytest.raises(RuntimeError):
+        with ds.transaction():
+            ds.write('items/0', b'rolled back')
+            raise RuntimeError()
+    assert ds.read('items/0') == b'00'
+
+
+def test_partial_reads(ds):
+    ds.write('a/data', b'0123456789')
+    assert ds.size('a/data') == 10
+    assert ds.read_range('a/data', 2, 3) == b'234'
+    assert ds.read_range('a/data', 8, 100) == b'89'
+    assert ds.read_range('a/data', -3) == b'789'
+    assert list(ds.stream('a/data', buffer_size=4)) == [b'0123', b'4567', b'89']
+
+
+def test_list_recursive_and_stat_many(ds):
+    ds.write('a/b/c.txt', b'abc')
+    ds.write('a/d.txt', b'd')
+    assert sorted(ds.list('a', recursive=True)) == ['b/c.txt', 'd.txt']
+
+    stats = ds.stat_many(['a/d.txt', 'a/b/c.txt', 'a/missing', 'a/b'])
+    assert [stat.size for stat in stats[:2]] == [1, 3]
+    assert stats[0].mtime is not None
+    assert stats[2] is None
+    assert stats[3].is_dir
+
+
+def test_activity(ds):
+    activity = Activity(source='test', location='loc', datastore=ds)
+    df = pd.DataFrame({'a': [1, 2]})
+    activity.write(df, name='df')
+    activity.write(df * 2, name='df')
+    pd.testing.assert_frame_equal(activity.read('df', 'v1'), df)
+    pd.testing.assert_frame_equal(activity.read('df'), df * 2)
+
+
+def test_connections_closed_with_threads(ds):
+    ds.write('a', b'pond')
+    for _ in range(20):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert list(executor.map(ds.read, ['a'] * 8)) == [b'pond'] * 8
+    # The connections of the threads that have exited are closed
+    assert len(ds._connections) <= 1 + 4
@@ -2,12 +2,15 @@ import pytest
 
 from pond import Activity
 from pond.artifact import Artifact
+from pond.artifact.dict_artifact import DictArtifact
 from pond.artifact.artifact_registry import ArtifactRegistry
-from pond.conventions import WriteMode, versioned_artifact_location
-from pond.exceptions import VersionAlreadyExists
+from pond.artifact_cache import ArtifactCache
+from pond.conventions import DedupMode, WriteMode, versioned_artifact_location
+from pond.exceptions import BulkOperationFailed, VersionAlreadyExists, VersionDoesNotExist
 from pond.metadata.metadata_source import MetadataSource
 from pond.storage.file_datastore import FileDatastore
 from pond.version_name import SimpleVersionName
+from pond.versioned_artifact import VersionedArtifact
 
 
 # test: inputs are saved as metadata
@@ -206,3 +209,310 @@ def test_write_mode_overwrite(activity):
     # v1 has got new data
     artifact = activity.read_artifact(name='meh', version_name='v1')
     assert artifact.data == '234'
+
+
+class RecordingDatastore(FileDatastore):
+    """ FileDatastore recording all the calls to its interface. """
+
+    def __init__(self, id, base_path):
+        super().__init__(id, base_path)
+        self.calls = []
+
+    def open(self, path, mode):
+        self.calls.append(('open', path, mode))
+        return super().open(path, mode)
+
+    def write(self, path, data):
+        self.calls.append(('write', path))
+        return super().write(path, data)
+
+    def exists(self, path):
+        self.calls.append(('exists', path))
+        return super().exists(path)
+
+    def makedirs(self, path):
+        self.calls.append(('makedirs', path))
+        return super().makedirs(path)
+
+
+def test_read_does_not_write(tmp_path):
+    datastore = RecordingDatastore(id='foostore', base_path=tmp_path)
+    activity = Activity(source='test_pond.py', datastore=datastore, location='test_location')
+    activity.write({'a': 1}, name='meh', artifact_class=DictArtifact)
+
+    datastore.calls = []
+    assert activity.read('meh') == {'a': 1}
+    first_read_calls = datastore.calls
+    assert all(call[0] == 'open' and call[2] == 'rb' for call in first_read_calls)
+
+    # The versioned artifact is cached: reading again costs the latest version pointer, the
+    # version manifest, and the data file
+    datastore.calls = []
+    assert activity.read('meh') == {'a': 1}
+    assert [call[1] for call in datastore.calls] == [
+        'test_location/meh/_pond/latest',
+        'test_location/meh/v1/_pond/manifest.yml',
+        'test_location/meh/v1/meh_v1.json',
+    ]
+    assert len(first_read_calls) == len(datastore.calls) + 1
+
+
+def test_invalidate_cache(activity):
+    activity.write('123', name='meh', artifact_class=MockArtifact)
+    activity.read('meh')
+    assert 'meh' in activity._versioned_artifacts
+
+    activity.invalidate_cache('meh')
+    assert 'meh' not in activity._versioned_artifacts
+
+    activity.read('meh')
+    activity.invalidate_cache()
+    assert activity._versioned_artifacts == {}
+
+
+def test_read_with_artifact_cache(tmp_path):
+    datastore = RecordingDatastore(id='foostore', base_path=tmp_path)
+    cache = ArtifactCache()
+    activity = Activity(source='test_pond.py', datastore=datastore, location='test_location',
+                        artifact_cache=cache)
+    activity.write({'a': 1}, name='meh', artifact_class=DictArtifact)
+
+    version = activity.read_version('meh', version_name='v1')
+    assert cache.stats().misses == 1
+
+    # Cached versions are read without accessing the datastore
+    datastore.calls = []
+    assert activity.read_version('meh', version_name='v1') is version
+    assert datastore.calls == []
+    assert cache.stats().hits == 1
+
+    # Reading the latest version only needs to resolve the latest version name
+    assert activity.read_version('meh') is version
+    assert len(datastore.calls) == 1
+    assert activity.read_history == {'pond://foostore/test_location/meh/v1'}
+
+    # Writing a new version keeps the other versions in the cache
+    activity.write({'a': 3}, name='meh', artifact_class=DictArtifact)
+    assert cache.stats().n_items == 1
+    assert activity.read_version('meh', version_name='v1') is version
+    assert activity.read('meh') == {'a': 3}
+
+    # Overwriting the version invalidates it in the cache
+    activity.write({'a': 2}, name='meh', artifact_class=DictArtifact, version_name='v1',
+                   write_mode=WriteMode.OVERWRITE)
+    assert activity.read('meh', version_name='v1') == {'a': 2}
+
+    activity.invalidate_cache('meh')
+    assert cache.stats().n_items == 0
+
+
+def test_read_version_lazy(tmp_path):
+    datastore = RecordingDatastore(id='foostore', base_path=tmp_path)
+    cache = ArtifactCache()
+    activity = Activity(source='test_pond.py', datastore=datastore, location='test_location',
+                        artifact_cache=cache)
+    activity.write({'a': 1}, name='meh', artifact_class=DictArtifact, metadata={'x': 'y'})
+
+    # Only the manifest is read, the lazy version is not cached
+    datastore.calls = []
+    version = activity.read_version('meh', lazy=True)
+    assert not version.is_loaded
+    assert version.manifest.collect_section('user') == {'x': 'y'}
+    assert not any('meh_v1' in str(call) for call in datastore.calls)
+    assert cache.stats().n_items == 0
+    assert activity.read_history == {'pond://foostore/test_location/meh/v1'}
+
+    assert version.artifact.data == {'a': 1}
+    assert any('meh_v1' in str(call) for call in datastore.calls)
+
+    # A cached version is returned as it is
+    cached_version = activity.read_version('meh')
+    assert activity.read_version('meh', lazy=True) is cached_version
+
+    versions = activity.read_many_versions(['meh', ('meh', 'v1')], lazy=True)
+    assert [version.artifact.data for version in versions] == [{'a': 1}, {'a': 1}]
+
+
+def test_read_many(activity):
+    activity.write({'a': 1}, name='foo', artifact_class=DictArtifact)
+    activity.write({'a': 2}, name='foo', artifact_class=DictArtifact)
+    activity.write({'b': 3}, name='bar', artifact_class=DictArtifact)
+
+    data = activity.read_many(['foo', ('foo', 'v1'), 'bar', ('bar', SimpleVersionName(1))])
+    assert data == [{'a': 2}, {'a': 1}, {'b': 3}, {'b': 3}]
+    assert activity.read_history == {
+        'pond://foostore/test_location/foo/v1',
+        'pond://foostore/test_location/foo/v2',
+        'pond://foostore/test_location/bar/v1',
+    }
+
+
+def test_read_many_partial_failure(activity):
+    activity.write({'a': 1}, name='foo', artifact_class=DictArtifact)
+
+    with pytest.raises(BulkOperationFailed) as excinfo:
+        activity.read_many(['foo', ('foo', 'v7'), 'does_not_exist'], max_workers=2)
+
+    # Completed reads are not lost
+    assert excinfo.value.results == [{'a': 1}, None, None]
+    assert sorted(excinfo.value.errors) == [1, 2]
+    assert isinstance(excinfo.value.errors[1], VersionDoesNotExist)
+    assert activity.read_history == {'pond://foostore/test_location/foo/v1'}
+
+
+def test_write_many(activity):
+    activity.read_history.add('pond://foostore/test_location/input/v1')
+    versions = activity.write_many([
+        {'data': {'a': 1}, 'name': 'foo', 'artifact_class': DictArtifact},
+        {'data': {'a': 2}, 'name': 'foo', 'artifact_class': DictArtifact},
+        {'data': {'b': 3}, 'name': 'bar', 'artifact_class': DictArtifact,
+         'metadata': {'split': 'test'}},
+    ])
+
+    assert sorted(str(version.version_name) for version in versions[:2]) == ['v1', 'v2']
+    assert activity.read_many(['bar']) == [{'b': 3}]
+    manifest = activity.read_version('bar').manifest
+    assert manifest.collect_section('user') == {'split': 'test'}
+    activity_metadata = manifest.collect_section('activity')
+    assert activity_metadata['inputs'] == "['pond://foostore/test_location/input/v1']"
+    assert len(activity.write_history) == 3
+
+
+def test_write_many_partial_failure(activity):
+    activity.write({'a': 1}, name='foo', artifact_class=DictArtifact)
+
+    with pytest.raises(BulkOperationFailed) as excinfo:
+        activity.write_many([
+            {'data': {'a': 2}, 'name': 'foo', 'artifact_class': DictArtifact},
+            {'data': {'a': 3}, 'name': 'foo', 'version_name': 'v1',
+             'artifact_class': DictArtifact},
+        ])
+
+    assert excinfo.value.results[1] is None
+    assert isinstance(excinfo.value.errors[1], VersionAlreadyExists)
+    # The successful write is recorded
+    assert activity.write_history == {
+        'pond://foostore/test_location/foo/v1',
+        'pond://foostore/test_location/foo/v2',
+    }
+    assert activity.read('foo') == {'a': 2}
+
+
+def test_write_many_atomic(activity):
+    activity.write({'a': 1}, name='foo', artifact_class=DictArtifact)
+
+    with pytest.raises(BulkOperationFailed) as excinfo:
+        activity.write_many([
+            {'data': {'b': 1}, 'name': 'bar', 'artifact_class': DictArtifact},
+            {'data': {'a': 2}, 'name': 'foo', 'version_name': 'v1',
+             'write_mode': WriteMode.OVERWRITE, 'artifact_class': DictArtifact},
+            {'data': {'a': 3}, 'name': 'foo', 'version_name': 'v1',
+             'artifact_class': DictArtifact},
+        ], atomic=True)
+
+    # None of the versions is visible
+    assert excinfo.value.results == [None, None, None]
+    assert list(excinfo.value.errors) == [2]
+    assert activity.read('foo') == {'a': 1}
+    with pytest.raises(Exception):
+        activity.read('bar')
+    assert len(activity.write_history) == 1
+
+    versions = activity.write_many([
+        {'data': {'b': 1}, 'name': 'bar', 'artifact_class': DictArtifact},
+        {'data': {'a': 2}, 'name': 'foo', 'version_name': 'v1',
+         'write_mode': WriteMode.OVERWRITE, 'artifact_class': DictArtifact},
+    ], atomic=True)
+    assert str(versions[1].version_name) == 'v1'
+    assert activity.read_many(['bar', 'foo']) == [{'b': 1}, {'a': 2}]
+
+
+def test_write_many_atomic_serialization_failure(activity):
+    with pytest.raises(BulkOperationFailed) as excinfo:
+        activity.write_many([
+            {'data': {'b': 1}, 'name': 'bar', 'version_name': 'v1',
+             'artifact_class': DictArtifact},
+            {'data': {'a': object()}, 'name': 'foo', 'version_name': 'v1',
+             'artifact_class': DictArtifact},
+        ], atomic=True)
+    assert list(excinfo.value.errors) == [1]
+
+    # The version names reserved by the failed write can be used again
+    activity.write_many([
+        {'data': {'b': 1}, 'name': 'bar', 'version_name': 'v1', 'artifact_class': DictArtifact},
+        {'data': {'a': 1}, 'name': 'foo', 'version_name': 'v1', 'artifact_class': DictArtifact},
+    ], atomic=True)
+    assert activity.read_many(['bar', 'foo']) == [{'b': 1}, {'a': 1}]
+
+
+def test_write_many_atomic_rollback(activity, monkeypatch):
+    activity.write({'a': 1}, name='foo', artifact_class=DictArtifact)
+    original_publish = VersionedArtifact.publish
+
+    def publish(self, staged, delete_replaced=True):
+        if self.artifact_name == 'bar':
+            raise OSError('Publishing failed')
+        return original_publish(self, staged, delete_replaced=delete_replaced)
+
+    monkeypatch.setattr(VersionedArtifact, 'publish', publish)
+    with pytest.raises(BulkOperationFailed) as excinfo:
+        activity.write_many([
+            {'data': {'a': 2}, 'name': 'foo', 'version_name': 'v1',
+             'write_mode': WriteMode.OVERWRITE, 'artifact_class': DictArtifact},
+            {'data': {'a': 3}, 'name': 'foo', 'artifact_class': DictArtifact},
+            {'data': {'b': 1}, 'name': 'bar', 'artifact_class': DictArtifact},
+        ], atomic=True)
+
+    assert list(excinfo.value.errors) == [2]
+    # The published versions have been removed, and the replaced version restored
+    assert activity.read('foo') == {'a': 1}
+    versioned_artifact = activity._get_versioned_artifact('foo')
+    assert [str(name) for name in versioned_artifact.all_version_names()] == ['v1']
+
+    # The names of the removed new versions can be used again
+    monkeypatch.undo()
+    activity.write({'a': 3}, name='foo', artifact_class=DictArtifact, version_name='v2')
+    activity.write({'b': 1}, name='bar', artifact_class=DictArtifact, version_name='v1')
+    assert activity.read_many(['foo', 'bar']) == [{'a': 3}, {'b': 1}]
+
+
+def test_write_with_codec(activity):
+    pytest.importorskip('zstandard')
+    activity.write({'a': 1}, name='foo', artifact_class=DictArtifact, codec='zstd', level=5)
+    activity.write({'a': 2}, name='foo', artifact_class=DictArtifact)
+
+    assert activity.read('foo', 'v1') == {'a': 1}
+    assert activity.read('foo', 'v2') == {'a': 2}
+    version_metadata = activity.read_version('foo', 'v1').manifest.collect_section('version')
+    assert version_metadata['codec'] == 'zstd'
+
+
+def test_write_dedup(activity):
+    v1 = activity.write({'a': 1}, name='foo', artifact_class=DictArtifact)
+    version = activity.write({'a': 1}, name='foo', artifact_class=DictArtifact,
+                             dedup=DedupMode.SKIP)
+    assert version.version_name == v1.version_name
+
+    with pytest.raises(ValueError):
+        activity.write_many([{'data': {'a': 1}, 'name': 'foo', 'artifact_class': DictArtifact,
+                              'dedup': DedupMode.SKIP}], atomic=True)
+
+
+def test_write_chunked(activity):
+    activity.write({'a': 1}, name='foo', artifact_class=DictArtifact, chunked=True, codec='zlib')
+    activity.write({'a': 2}, name='foo', artifact_class=DictArtifact, chunked=True)
+
+    assert activity.read('foo', 'v1') == {'a': 1}
+    assert activity.read('foo', 'v2') == {'a': 2}
+    assert activity.collect_garbage('foo') == 0
+    activity.write({'a': 3}, name='foo', version_name='v2', artifact_class=DictArtifact,
+                   write_mode=WriteMode.OVERWRITE, chunked=True)
+    assert activity.collect_garbage('foo') == 1
+    assert activity.read('foo', 'v2') == {'a': 3}
+
+
+def test_write_numpy_array_without_artifact_class(activity):
+    np = pytest.importorskip('numpy')
+    data = np.arange(6).reshape(2, 3)
+    activity.write(data, name='array')
+    np.testing.assert_array_equal(activity.read('array'), data)
@@ -0,0 +1,87 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from pond.artifact.dict_artifact import DictArtifact
+from pond.artifact_cache import ArtifactCache, data_size
+from pond.version import Version
+from pond.version_name import SimpleVersionName
+
+
+def make_version(data, version_number=1):
+    return Version(
+        artifact_name='foo',
+        version_name=SimpleVersionName(version_number),
+        artifact=DictArtifact(data),
+    )
+
+
+def test_data_size():
+    assert data_size(np.zeros((10, 10))) == 800
+    df = pd.DataFrame({'a': np.zeros(10)})
+    assert data_size(df) == df.memory_usage(deep=True).sum()
+    assert data_size(df['a']) == df['a'].memory_usage(deep=True)
+    assert data_size({'a': 1}) > 0
+
+    # Containers are measured recursively
+    items = [str(i) * 1000 for i in range(100, 200)]
+    assert data_size({'items': items}) > 100 * 3000
+    assert data_size([np.zeros(100)] * 3) == sys.getsizeof([None] * 3) + 800
+    cycle = []
+    cycle.append(cycle)
+    assert data_size(cycle) == sys.getsizeof(cycle)
+
+
+def test_get_and_put():
+    cache = ArtifactCache()
+    version = make_version({'a': 1})
+
+    assert cache.get('pond://foo/v1') is None
+    cache.put('pond://foo/v1', version)
+    assert cache.get('pond://foo/v1') is version
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.n_items == 1
+    assert stats.size_bytes == data_size(version.artifact.data)
+
+
+def test_lru_eviction():
+    size = data_size(np.zeros(100))
+    cache = ArtifactCache(max_bytes=2 * size)
+    cache.put('v1', make_version(np.zeros(100), 1))
+    cache.put('v2', make_version(np.zeros(100), 2))
+    # v1 is now the most recently used
+    cache.get('v1')
+
+    cache.put('v3', make_version(np.zeros(100), 3))
+    assert cache.get('v2') is None
+    assert cache.get('v1') is not None
+    assert cache.get('v3') is not None
+    assert cache.stats().evictions == 1
+    assert cache.stats().size_bytes == 2 * size
+
+    # Versions larger than the whole budget are not cached
+    cache.put('v4', make_version(np.zeros(1000), 4))
+    assert cache.get('v4') is None
+    assert cache.stats().n_items == 2
+
+
+def test_invalidate():
+    cache = ArtifactCache()
+    cache.put('pond://store/loc/foo/v1', make_version({'a': 1}, 1))
+    cache.put('pond://store/loc/foo/v2', make_version({'a': 2}, 2))
+    cache.put('pond://store/loc/foo2/v1', make_version({'a': 3}, 1))
+
+    cache.invalidate('pond://store/loc/foo/v1')
+    assert cache.stats().n_items == 2
+
+    cache.invalidate('pond://store/loc/foo/', prefix=True)
+    assert cache.get('pond://store/loc/foo/v2') is None
+    assert cache.get('pond://store/loc/foo2/v1') is not None
+
+    cache.clear()
+    assert cache.stats().n_items == 0
+    assert cache.stats().size_bytes == 0
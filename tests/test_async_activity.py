@@ -0,0 +1,68 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from pond import AsyncActivity
+from pond.artifact.dict_artifact import DictArtifact
+from pond.exceptions import BulkOperationFailed
+from pond.storage.file_datastore import FileDatastore
+
+
+@pytest.fixture
+def async_activity(tmp_path):
+    datastore = FileDatastore(id='foostore', base_path=tmp_path)
+    return AsyncActivity(
+        source='test_async_activity.py',
+        datastore=datastore,
+        location='test_location',
+        author='John Doe',
+        max_workers=4,
+    )
+
+
+def test_write_then_read(async_activity):
+
+    async def write_then_read():
+        await asyncio.gather(*(
+            async_activity.write({'i': i}, name=f'foo{i}', artifact_class=DictArtifact)
+            for i in range(10)
+        ))
+        return await asyncio.gather(*(async_activity.read(f'foo{i}') for i in range(10)))
+
+    data = asyncio.run(write_then_read())
+    assert data == [{'i': i} for i in range(10)]
+    assert len(async_activity.read_history) == 10
+    assert len(async_activity.write_history) == 10
+
+
+def test_read_many_partial_failure(async_activity):
+
+    async def read_many():
+        await async_activity.write({'a': 1}, name='foo', artifact_class=DictArtifact)
+        return await async_activity.read_many(['foo', ('foo', 'v7')])
+
+    with pytest.raises(BulkOperationFailed) as excinfo:
+        asyncio.run(read_many())
+    assert excinfo.value.results == [{'a': 1}, None]
+    assert list(excinfo.value.errors) == [1]
+
+
+def test_serialization_in_process_pool(tmp_path):
+    datastore = FileDatastore(id='foostore', base_path=tmp_path)
+    with ProcessPoolExecutor(max_workers=2) as serialization_executor:
+        async_activity = AsyncActivity(
+            source='test_async_activity.py',
+            datastore=datastore,
+            location='test_location',
+            serialization_executor=serialization_executor,
+        )
+
+        async def write_then_read():
+            await async_activity.write_many([
+                {'data': {'a': 1}, 'name': 'foo', 'artifact_class': DictArtifact},
+                {'data': {'b': 2}, 'name': 'bar', 'artifact_class': DictArtifact},
+            ])
+            return await async_activity.read_many(['foo', 'bar'])
+
+        assert asyncio.run(write_then_read()) == [{'a': 1}, {'b': 2}]
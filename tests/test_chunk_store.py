@@ -0,0 +1,102 @@
+import io
+
+import numpy as np
+import pytest
+
+from pond.chunk_store import ChunkStore, chunk_boundaries
+from pond.codecs import get_codec
+from pond.storage.file_datastore import FileDatastore
+
+
+def random_bytes(size, seed=0):
+    return np.random.RandomState(seed).randint(0, 256, size=size, dtype=np.uint8).tobytes()
+
+
+@pytest.fixture
+def chunk_store(tmp_path):
+    datastore = FileDatastore(id='foostore', base_path=str(tmp_path))
+    return ChunkStore(datastore, 'chunks', min_size=256, avg_size=1024, max_size=4096)
+
+
+def test_chunk_boundaries():
+    data = random_bytes(100_000)
+    boundaries = chunk_boundaries(data, min_size=256, avg_size=1024, max_size=4096)
+    assert boundaries[-1] == len(data)
+    sizes = np.diff([0] + boundaries)
+    assert sizes[:-1].min() >= 256
+    assert sizes.max() <= 4096
+    assert 20 < len(boundaries) < 200
+
+    assert chunk_boundaries(b'') == []
+    # Data without any boundary is cut at the maximum size
+    assert chunk_boundaries(b'\x00' * 10_000, min_size=256, avg_size=1024,
+                            max_size=4096) == [4096, 8192, 10_000]
+
+
+def test_chunk_boundaries_are_content_defined():
+    data = random_bytes(100_000)
+    edited = data[:50_000] + b'inserted' + data[50_000:]
+    boundaries = chunk_boundaries(data, min_size=256, avg_size=1024, max_size=4096)
+    edited_boundaries = chunk_boundaries(edited, min_size=256, avg_size=1024, max_size=4096)
+
+    # Boundaries before the insertion are identical, and shifted after it
+    assert [b for b in boundaries if b < 49_000] == [b for b in edited_boundaries if b < 49_000]
+    assert [b + 8 for b in boundaries if b > 60_000] == \
+        [b for b in edited_boundaries if b > 60_008]
+
+
+@pytest.mark.parametrize('codec', [None, 'zlib'])
+def test_write_then_read(tmp_path, codec):
+    datastore = FileDatastore(id='foostore', base_path=str(tmp_path))
+    chunk_store = ChunkStore(datastore, 'chunks', codec=get_codec(codec), min_size=256,
+                             avg_size=1024, max_size=4096)
+    data = random_bytes(50_000)
+    chunks = chunk_store.write('file.chunklist', data)
+    assert sum(size for _, size in chunks) == len(data)
+
+    assert chunk_store.read('file.chunklist') == data
+    assert b''.join(chunk_store.iter_chunks('file.chunklist')) == data
+    with chunk_store.open('file.chunklist') as f:
+        assert f.read(10) == data[:10]
+        f.seek(30_000)
+        assert f.read(5000) == data[30_000:35_000]
+        f.seek(-100, io.SEEK_END)
+        assert f.read() == data[-100:]
+
+
+def test_chunks_are_stored_once(chunk_store, monkeypatch):
+    data = random_bytes(50_000)
+    chunks = chunk_store.write('v1.chunklist', data)
+    edited = data[:20_000] + b'edit' + data[20_004:]
+
+    datastore = chunk_store.datastore
+    stat_many_calls = []
+    written = []
+    stat_many = datastore.stat_many
+    monkeypatch.setattr(datastore, 'stat_many',
+                        lambda paths: stat_many_calls.append(paths) or stat_many(paths))
+    monkeypatch.setattr(datastore, 'exists', None)
+    write_chunk = chunk_store._write_chunk
+    monkeypatch.setattr(chunk_store, '_write_chunk',
+                        lambda name, piece: written.append(name) or write_chunk(name, piece))
+    edited_chunks = chunk_store.write('v2.chunklist', edited)
+
+    new_chunks = {name for name, _ in edited_chunks} - {name for name, _ in chunks}
+    assert 1 <= len(new_chunks) <= 2
+    # The stored chunks are found with a single request, and are not written again
+    assert len(stat_many_calls) == 1
+    assert sorted(written) == sorted(new_chunks)
+    assert chunk_store.read('v2.chunklist') == edited
+
+
+def test_collect_garbage(chunk_store):
+    assert chunk_store.collect_garbage(set()) == 0
+    chunk_store.write('v1.chunklist', random_bytes(50_000, seed=1))
+    chunk_store.write('v2.chunklist', random_bytes(50_000, seed=2))
+
+    referenced = chunk_store.referenced_chunks('v2.chunklist')
+    n_chunks = len(chunk_store.referenced_chunks('v1.chunklist'))
+    assert chunk_store.collect_garbage(referenced) == n_chunks
+    assert chunk_store.read('v2.chunklist') == random_bytes(50_000, seed=2)
+    with pytest.raises(FileNotFoundError):
+        chunk_store.read('v1.chunklist')
@@ -0,0 +1,40 @@
+import pytest
+
+import pond.codecs
+from pond.codecs import CODECS, Codec, NoneCodec, ZlibCodec, get_codec
+from pond.exceptions import CodecNotFound
+
+
+@pytest.mark.parametrize('name', sorted(CODECS))
+def test_compress_then_decompress(name):
+    if name == 'zstd':
+        pytest.importorskip('zstandard')
+    elif name == 'lz4':
+        pytest.importorskip('lz4')
+    data = b'pond ' * 1000
+
+    codec = get_codec(name)
+    compressed = codec.compress(data)
+    assert codec.decompress(compressed) == data
+    if name != 'none':
+        assert len(compressed) < len(data)
+
+
+def test_zstd_multithreaded(monkeypatch):
+    pytest.importorskip('zstandard')
+    monkeypatch.setattr(pond.codecs, 'ZSTD_MULTITHREAD_MIN_BYTES', 1024)
+    data = bytes(range(256)) * 1000
+
+    codec = get_codec('zstd', level=1)
+    assert codec.decompress(codec.compress(data)) == data
+
+
+def test_get_codec():
+    assert isinstance(get_codec(None), NoneCodec)
+    codec = get_codec('zlib', level=9)
+    assert isinstance(codec, ZlibCodec)
+    assert codec.level == 9
+    assert get_codec(codec) is codec
+    assert issubclass(CODECS['lz4'], Codec)
+    with pytest.raises(CodecNotFound):
+        get_codec('does_not_exist')
@@ -1,6 +1,8 @@
 from pond.conventions import (
+    JSON_MANIFEST_FILENAME,
     METADATA_DIRNAME,
     MANIFEST_FILENAME,
+    ManifestFormat,
     version_data_location,
     version_manifest_location,
     version_uri,
@@ -25,6 +27,8 @@ def test_manifest_location():
     location = version_manifest_location('abc/')
     expected = f'abc/{METADATA_DIRNAME}/{MANIFEST_FILENAME}'
     assert location == expected
+    location = version_manifest_location('abc/', ManifestFormat.JSON)
+    assert location == f'abc/{METADATA_DIRNAME}/{JSON_MANIFEST_FILENAME}'
 
 
 def test_version_uri(tmp_path):
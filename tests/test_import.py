@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+# Root of the repository, where `pond` can be imported from
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_does_not_import_artifact_libraries():
+    # A fresh interpreter, the test session has already imported them
+    code = (
+        'import sys\n'
+        'import pond\n'
+        'libraries = ("numpy", "pandas", "PIL", "matplotlib")\n'
+        'print(" ".join(m for m in libraries if m in sys.modules))\n'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], check=True, capture_output=True, text=True, cwd=ROOT_DIR,
+    ).stdout
+    assert output.strip() == ''
+
+
+def test_default_dataframe_artifact_is_csv():
+    # Importing an artifact module directly also registers the lazy artifacts of its data class
+    code = (
+        'import pandas as pd\n'
+        'from pond.artifact.pandas_dataframe_artifact import PandasDataFrameArtifact\n'
+        'from pond.artifact.artifact_registry import global_artifact_registry\n'
+        'items = global_artifact_registry.get_available_artifacts(pd.DataFrame)\n'
+        'print(" ".join(item.format for item in items))\n'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], check=True, capture_output=True, text=True, cwd=ROOT_DIR,
+    ).stdout
+    assert output.split() == ['parquet', 'csv']
+
+
+def test_concurrent_reads_in_fresh_process(tmp_path):
+    import pandas as pd
+
+    from pond import Activity
+    from pond.storage.file_datastore import FileDatastore
+
+    activity = Activity(source='test_import.py', datastore=FileDatastore('foostore', tmp_path),
+                        location='test_location')
+    names = [f'df{i}' for i in range(8)]
+    for i, name in enumerate(names):
+        activity.write(pd.DataFrame({'a': [i]}), name=name)
+
+    # The artifact class is imported lazily by all the reading threads at the same time
+    code = (
+        'import sys\n'
+        'from pond import Activity\n'
+        'from pond.storage.file_datastore import FileDatastore\n'
+        'activity = Activity(source="test", datastore=FileDatastore("foostore", sys.argv[1]),\n'
+        '                    location="test_location")\n'
+        f'data = activity.read_many({names!r}, max_workers=8)\n'
+        'print(" ".join(str(df["a"][0]) for df in data))\n'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code, str(tmp_path)], check=True, capture_output=True, text=True,
+        cwd=ROOT_DIR,
+    ).stdout
+    assert output.split() == [str(i) for i in range(8)]
@@ -1,9 +1,13 @@
 from datetime import datetime
+import os
+import pickle
+import zlib
 
 import pandas as pd
 import pytest
 
 from pond.artifact.pandas_dataframe_artifact import PandasDataFrameArtifact
+from pond.codecs import get_codec
 from pond.exceptions import VersionDoesNotExist
 from pond.metadata.metadata_source import MetadataSource
 from pond.metadata.manifest import Manifest
@@ -137,3 +141,170 @@ def test_read_not_existing(tmp_path):
             location=location,
             datastore=store,
         )
+
+
+class FailingArtifact(PandasDataFrameArtifact):
+    def write_bytes(self, file_, **kwargs):
+        file_.write(b'partial content')
+        raise RuntimeError('Writing failed')
+
+
+def test_write_is_staged(tmp_path):
+    store = FileDatastore(id='foostore', base_path=str(tmp_path))
+    data = pd.DataFrame([[1, 2]], columns=['c1', 'c2'])
+    version = Version(
+        artifact_name='meh',
+        version_name=SimpleVersionName(version_number=1),
+        artifact=PandasDataFrameArtifact(data=data),
+    )
+
+    staging_location = version.stage(location='abc', datastore=store, manifest=Manifest())
+    # The staged version is complete, but not visible yet
+    assert store.exists(f'{staging_location}/meh_v1.csv')
+    assert store.exists(f'{staging_location}/_pond/manifest.yml')
+    assert not version.exists('abc', store)
+
+    version.publish(location='abc', datastore=store, staging_location=staging_location)
+    assert version.exists('abc', store)
+    assert not store.exists(staging_location)
+
+
+def test_write_failure_leaves_no_version(tmp_path):
+    store = FileDatastore(id='foostore', base_path=str(tmp_path))
+    data = pd.DataFrame([[1, 2]], columns=['c1', 'c2'])
+    version = Version(
+        artifact_name='meh',
+        version_name=SimpleVersionName(version_number=1),
+        artifact=FailingArtifact(data=data),
+    )
+
+    with pytest.raises(RuntimeError):
+        version.write(location='abc', datastore=store, manifest=Manifest())
+    assert not store.exists('abc/v1')
+    assert os.listdir(tmp_path / 'abc/_pond/staging') == []
+
+
+def test_write_replace(tmp_path):
+    store = FileDatastore(id='foostore', base_path=str(tmp_path))
+    version_name = SimpleVersionName(version_number=1)
+    data = pd.DataFrame([[1, 2]], columns=['c1', 'c2'])
+    version = Version('meh', version_name, PandasDataFrameArtifact(data=data))
+    version.write(location='abc', datastore=store, manifest=Manifest())
+
+    # The version exists, it can only be replaced explicitly
+    data2 = pd.DataFrame([[3, 4]], columns=['c1', 'c2'])
+    version2 = Version('meh', version_name, PandasDataFrameArtifact(data=data2))
+    with pytest.raises(FileExistsError):
+        version2.write(location='abc', datastore=store, manifest=Manifest())
+
+    # Readers find a complete version at any time during the replacement
+    write = store.write
+    read_during_replacement = []
+
+    def reading_write(path, data):
+        if path == 'abc/v1/_pond/manifest.yml':
+            reloaded = Version.read(version_name, PandasDataFrameArtifact, 'abc', store)
+            read_during_replacement.append(reloaded.artifact.data)
+        write(path, data)
+        if path == 'abc/v1/_pond/manifest.yml':
+            reloaded = Version.read(version_name, PandasDataFrameArtifact, 'abc', store)
+            read_during_replacement.append(reloaded.artifact.data)
+
+    store.write = reading_write
+    version2.write(location='abc', datastore=store, manifest=Manifest(), replace=True)
+    pd.testing.assert_frame_equal(read_during_replacement[0], data)
+    pd.testing.assert_frame_equal(read_during_replacement[1], data2)
+
+    reloaded = Version.read(version_name, PandasDataFrameArtifact, 'abc', store)
+    pd.testing.assert_frame_equal(reloaded.artifact.data, data2)
+    # The replaced data file is deleted
+    data_filename = reloaded.manifest.collect_section('version')['filename']
+    assert sorted(os.listdir(tmp_path / 'abc/v1')) == sorted(['_pond', data_filename.split('/')[0]])
+    assert os.listdir(tmp_path / 'abc/_pond/staging') == []
+
+
+def test_write_then_read_with_codec(tmp_path):
+    data = pd.DataFrame([[1, 2]], columns=['c1', 'c2'])
+    version = Version(
+        artifact_name='meh',
+        version_name=SimpleVersionName(version_number=1),
+        artifact=PandasDataFrameArtifact(data),
+    )
+    datastore = FileDatastore(base_path=str(tmp_path), id='foostore')
+    version.write(location='test_location', datastore=datastore, manifest=Manifest(),
+                  codec=get_codec('zlib'))
+
+    version_metadata = version.manifest.collect_section('version')
+    assert version_metadata['codec'] == 'zlib'
+    assert version_metadata['filename'] == 'meh_v1.csv.zlib'
+    raw = datastore.read('test_location/v1/meh_v1.csv.zlib')
+    assert zlib.decompress(raw).startswith(b',c1,c2')
+
+    reloaded = Version.read(
+        version_name=SimpleVersionName(version_number=1),
+        artifact_class=PandasDataFrameArtifact,
+        datastore=datastore,
+        location='test_location',
+    )
+    pd.testing.assert_frame_equal(reloaded.artifact.data, data)
+
+
+def test_read_lazy(tmp_path):
+    data = pd.DataFrame([[1, 2]], columns=['c1', 'c2'])
+    version_name = SimpleVersionName(version_number=1)
+    store = FileDatastore(id='foostore', base_path=str(tmp_path))
+    version = Version(
+        artifact_name='meh',
+        version_name=version_name,
+        artifact=PandasDataFrameArtifact(data=data),
+    )
+    version.write(location='abc', datastore=store,
+                  manifest=Manifest.from_nested_dict({'user': {'a': 'b'}}))
+
+    def read_lazy():
+        return Version.read(version_name=version_name, artifact_class=PandasDataFrameArtifact,
+                            location='abc', datastore=store, lazy=True)
+
+    # Only the manifest is read
+    lazy_version = read_lazy()
+    assert not lazy_version.is_loaded
+    assert lazy_version.manifest.collect_section('user') == {'a': 'b'}
+    assert lazy_version.get_uri('abc', store) == 'pond://foostore/abc/meh/v1'
+    assert not lazy_version.is_loaded
+
+    # The artifact is read on first access, and kept
+    artifact = lazy_version.artifact
+    assert lazy_version.is_loaded
+    pd.testing.assert_frame_equal(artifact.data, data)
+    assert artifact.metadata == {'a': 'b'}
+    store.delete('abc/v1/meh_v1.csv')
+    assert lazy_version.artifact is artifact
+
+    # The data file is not needed until the artifact is accessed
+    lazy_version = read_lazy()
+    with pytest.raises(FileNotFoundError):
+        lazy_version.artifact
+    assert not lazy_version.is_loaded
+
+
+def test_pickle(tmp_path):
+    data = pd.DataFrame([[1, 2]], columns=['c1', 'c2'])
+    version_name = SimpleVersionName(version_number=1)
+    store = FileDatastore(id='foostore', base_path=str(tmp_path))
+    version = Version(
+        artifact_name='meh',
+        version_name=version_name,
+        artifact=PandasDataFrameArtifact(data=data),
+    )
+    version.write(location='abc', datastore=store,
+                  manifest=Manifest.from_nested_dict({'user': {'a': 'b'}}))
+    pd.testing.assert_frame_equal(pickle.loads(pickle.dumps(version)).artifact.data, data)
+
+    # A lazy version is still lazy once unpickled, and loads its artifact on first access
+    lazy_version = Version.read(version_name=version_name, artifact_class=PandasDataFrameArtifact,
+                                location='abc', datastore=store, lazy=True)
+    unpickled = pickle.loads(pickle.dumps(lazy_version))
+    assert not unpickled.is_loaded
+    assert unpickled.version_name == version_name
+    pd.testing.assert_frame_equal(unpickled.artifact.data, data)
+    assert unpickled.is_loaded
@@ -3,7 +3,7 @@ from datetime import datetime
 from unittest.mock import patch
 import pytest
 
-from pond.exceptions import IncompatibleVersionName
+from pond.exceptions import IncompatibleVersionName, InvalidVersionName
 from pond.version_name import (
     DateTimeVersionName,
     SimpleVersionName,
@@ -88,3 +88,13 @@ def test_ordering():
         'v10',
     ]
     assert [str(name) for name in names] == expected
+
+
+def test_subclass_from_id():
+    class DerivedVersionName(SimpleVersionName):
+        pass
+
+    assert VersionName.subclass_from_id('SimpleVersionName') is SimpleVersionName
+    assert VersionName.subclass_from_id('DerivedVersionName') is DerivedVersionName
+    with pytest.raises(InvalidVersionName):
+        SimpleVersionName.subclass_from_id('DateTimeVersionName')
@@ -1,9 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+
 import pytest
 
 from pond.artifact import Artifact
-from pond.conventions import WriteMode, version_data_location, version_location
-from pond.exceptions import IncompatibleVersionName, VersionAlreadyExists
+from pond.conventions import (
+    DedupMode,
+    ManifestFormat,
+    WriteMode,
+    version_data_location,
+    version_location,
+    version_manifest_location,
+)
+from pond.exceptions import ArtifactHasNoVersion, IncompatibleVersionName, VersionAlreadyExists
 from pond.metadata.manifest import Manifest
+from pond.storage.datastore import Datastore
 from pond.storage.file_datastore import FileDatastore
 from pond.version_name import DateTimeVersionName, SimpleVersionName
 from pond.versioned_artifact import VersionedArtifact
@@ -52,7 +64,7 @@ def test_versioned_artifact_write_then_read(versioned_artifact):
 
     # Basic files and directories for the versioned artifact are created when they didn't exist
     assert datastore.exists(versioned_artifact.versions_location)
-    assert datastore.exists(versioned_artifact.versions_list_location)
+    assert datastore.exists(versioned_artifact.versions_index.snapshot_location)
     assert versioned_artifact.version_names() == []
 
     # Create first version
@@ -125,3 +137,345 @@ def test_write_incompatible_version_name_class(versioned_artifact):
             manifest=Manifest(),
             version_name=DateTimeVersionName(),
         )
+
+
+def test_latest_version_name_from_index(versioned_artifact):
+    datastore = versioned_artifact.datastore
+    versioned_artifact.write(data='123', manifest=Manifest())
+    versioned_artifact.write(data='456', manifest=Manifest(), version_name='v5')
+    versioned_artifact.write(data='789', manifest=Manifest(), version_name='v3')
+
+    assert datastore.read_string(versioned_artifact.versions_index.latest_location) == 'v5'
+    assert versioned_artifact.version_names() == [
+        SimpleVersionName(1), SimpleVersionName(3), SimpleVersionName(5)]
+    assert versioned_artifact.latest_version_name() == SimpleVersionName(5)
+    assert versioned_artifact.read().artifact.data == '456'
+
+
+def test_latest_version_name_no_version(versioned_artifact):
+    with pytest.raises(ArtifactHasNoVersion):
+        versioned_artifact.latest_version_name()
+    assert versioned_artifact.latest_version_name(raise_if_none=False) is None
+
+
+def _remove_index(versioned_artifact):
+    """ Make a versioned artifact look like it was written before the index existed. """
+    datastore = versioned_artifact.datastore
+    index = versioned_artifact.versions_index
+    names = [str(name) for name in versioned_artifact.version_names()]
+    datastore.write_json(versioned_artifact.versions_list_location, names)
+    for location in (index.snapshot_location, index.log_location, index.latest_location):
+        datastore.delete(location)
+
+
+def test_rebuild_index(versioned_artifact):
+    datastore = versioned_artifact.datastore
+    versioned_artifact.write(data='123', manifest=Manifest())
+    versioned_artifact.write(data='456', manifest=Manifest())
+
+    # Artifacts written before the index existed can still be read
+    _remove_index(versioned_artifact)
+    assert versioned_artifact.version_names() == [SimpleVersionName(1), SimpleVersionName(2)]
+    assert versioned_artifact.latest_version_name() == SimpleVersionName(2)
+
+    names = versioned_artifact.rebuild_index()
+    assert names == [SimpleVersionName(1), SimpleVersionName(2)]
+    assert datastore.read_json(versioned_artifact.versions_index.snapshot_location) == {
+        'versions': ['v1', 'v2'], 'log_offset': 0}
+    assert datastore.read_string(versioned_artifact.versions_index.latest_location) == 'v2'
+
+
+def test_rebuild_index_finds_version_folders(versioned_artifact, monkeypatch):
+    datastore = versioned_artifact.datastore
+    versioned_artifact.write(data='123', manifest=Manifest())
+    versioned_artifact.write(data='456', manifest=Manifest())
+    # Index lost, without any legacy list of versions, and a staged version
+    index = versioned_artifact.versions_index
+    for location in (index.snapshot_location, index.log_location, index.latest_location):
+        datastore.delete(location)
+    versioned_artifact.stage(data='789', manifest=Manifest(), version_name='v3')
+
+    # The version folders are found with a single listing, without checking each version
+    def stat_many(paths):
+        raise AssertionError('The versions are not checked one by one')
+
+    monkeypatch.setattr(datastore, 'stat_many', stat_many)
+    assert versioned_artifact.rebuild_index() == [SimpleVersionName(1), SimpleVersionName(2)]
+    assert versioned_artifact.latest_version_name() == SimpleVersionName(2)
+
+
+def test_write_migrates_legacy_versions_list(versioned_artifact):
+    versioned_artifact.write(data='123', manifest=Manifest())
+    _remove_index(versioned_artifact)
+
+    versioned_artifact.write(data='456', manifest=Manifest())
+    assert versioned_artifact.versions_index.exists()
+    assert versioned_artifact.version_names() == [SimpleVersionName(1), SimpleVersionName(2)]
+
+
+def test_delete_version(versioned_artifact):
+    datastore = versioned_artifact.datastore
+    versioned_artifact.write(data='123', manifest=Manifest())
+    v2 = versioned_artifact.write(data='456', manifest=Manifest())
+
+    versioned_artifact.delete_version('v2')
+    assert not v2.exists(versioned_artifact.versions_location, datastore)
+    assert versioned_artifact.version_names() == [SimpleVersionName(1)]
+    assert versioned_artifact.latest_version_name() == SimpleVersionName(1)
+
+    versioned_artifact.delete_version('v1')
+    assert versioned_artifact.latest_version_name(raise_if_none=False) is None
+
+
+def test_write_concurrent_version_names_are_unique(versioned_artifact):
+    n_writers = 16
+
+    def write(i):
+        return versioned_artifact.write(data=str(i), manifest=Manifest()).version_name
+
+    with ThreadPoolExecutor(max_workers=n_writers) as executor:
+        version_names = list(executor.map(write, range(n_writers)))
+
+    assert len(set(version_names)) == n_writers
+    # The allocated names are the first ones after the previous latest version
+    assert sorted(version_names) == [SimpleVersionName(i) for i in range(1, n_writers + 1)]
+    # No version is lost in the index
+    assert versioned_artifact.version_names() == sorted(version_names)
+
+
+def test_write_reserved_version_name(versioned_artifact):
+    # A version name reserved by another writer cannot be written again ...
+    versioned_artifact._reserve_version_name(SimpleVersionName(1))
+    with pytest.raises(VersionAlreadyExists):
+        versioned_artifact.write(data='123', manifest=Manifest(), version_name='v1')
+
+    # ... and is skipped when allocating a new version name
+    version = versioned_artifact.write(data='123', manifest=Manifest())
+    assert version.version_name == SimpleVersionName(2)
+
+
+def test_stage_then_publish(versioned_artifact):
+    datastore = versioned_artifact.datastore
+    staged = versioned_artifact.stage(data='123', manifest=Manifest())
+    version = staged.version
+    # A staged version is not visible until it is published
+    assert not version.exists(versioned_artifact.versions_location, datastore)
+    assert versioned_artifact.version_names() == []
+
+    versioned_artifact.publish(staged)
+    assert versioned_artifact.read().artifact.data == '123'
+    assert versioned_artifact.latest_version_name() == version.version_name
+
+    discarded = versioned_artifact.stage(data='456', manifest=Manifest())
+    versioned_artifact.discard(discarded)
+    assert not datastore.exists(discarded.staging_location)
+    assert versioned_artifact.version_names() == [version.version_name]
+
+
+def test_unpublish_restores_replaced_version(versioned_artifact):
+    versioned_artifact.write(data='123', manifest=Manifest())
+    staged = versioned_artifact.stage(
+        data='234', manifest=Manifest(), version_name='v1', write_mode=WriteMode.OVERWRITE)
+    replaced_location = versioned_artifact.publish(staged, delete_replaced=False)
+    assert versioned_artifact.read('v1').artifact.data == '234'
+
+    versioned_artifact.unpublish(staged, replaced_location)
+    assert versioned_artifact.read('v1').artifact.data == '123'
+    assert versioned_artifact.version_names() == [SimpleVersionName(1)]
+
+
+def test_concurrent_publish_keeps_reservation(versioned_artifact):
+    datastore = versioned_artifact.datastore
+    staged = versioned_artifact.stage(data='123', manifest=Manifest(), version_name='v1')
+    # Another writer publishes the same version first
+    overwriting = versioned_artifact.stage(
+        data='456', manifest=Manifest(), version_name='v1', write_mode=WriteMode.OVERWRITE)
+    versioned_artifact.publish(overwriting)
+
+    with pytest.raises(FileExistsError):
+        versioned_artifact.publish(staged)
+    versioned_artifact.discard(staged)
+    assert versioned_artifact.read('v1').artifact.data == '456'
+    # The name of the published version stays reserved
+    assert datastore.list(f'{versioned_artifact.versions_location}/_pond/reserved') == ['v1']
+    with pytest.raises(VersionAlreadyExists):
+        versioned_artifact.write(data='789', manifest=Manifest(), version_name='v1')
+
+
+class BasicDatastore(FileDatastore):
+    """ A data store implementing only the abstract methods of `Datastore`. """
+    append = Datastore.append
+    rename = Datastore.rename
+    link = Datastore.link
+    list = Datastore.list
+    stat_many = Datastore.stat_many
+    create_exclusive = Datastore.create_exclusive
+
+
+def test_write_without_rename_and_list(tmp_path):
+    versioned_artifact = VersionedArtifact(
+        artifact_name='test_artifact',
+        location='test_location',
+        datastore=BasicDatastore(id='foostore', base_path=tmp_path),
+        artifact_class=MockArtifact,
+        version_name_class=SimpleVersionName,
+    )
+    versioned_artifact.write(data='123', manifest=Manifest())
+    versioned_artifact.write(data='456', manifest=Manifest())
+    with pytest.raises(VersionAlreadyExists):
+        versioned_artifact.write(data='789', manifest=Manifest(), version_name='v1')
+    versioned_artifact.write(
+        data='789', manifest=Manifest(), version_name='v1', write_mode=WriteMode.OVERWRITE)
+    assert versioned_artifact.read('v1').artifact.data == '789'
+    assert versioned_artifact.read('v2').artifact.data == '456'
+    assert versioned_artifact.version_names() == [SimpleVersionName(1), SimpleVersionName(2)]
+
+    # A replaced version can be restored
+    staged = versioned_artifact.stage(
+        data='000', manifest=Manifest(), version_name='v1', write_mode=WriteMode.OVERWRITE)
+    replaced_location = versioned_artifact.publish(staged, delete_replaced=False)
+    assert versioned_artifact.read('v1').artifact.data == '000'
+    versioned_artifact.unpublish(staged, replaced_location)
+    assert versioned_artifact.read('v1').artifact.data == '789'
+
+
+def test_write_records_content_hash(versioned_artifact):
+    version = versioned_artifact.write(data='123', manifest=Manifest())
+    version_metadata = version.manifest.collect_section('version')
+    assert version_metadata['content_hash'] == 'sha256:' + hashlib.sha256(b'123').hexdigest()
+
+
+def test_delete_version_then_rewrite(versioned_artifact):
+    versioned_artifact.write(data='123', manifest=Manifest())
+    versioned_artifact.write(data='456', manifest=Manifest())
+    versioned_artifact.delete_version('v2')
+    assert versioned_artifact.version_names() == [SimpleVersionName(1)]
+
+    # The version name can be used again
+    versioned_artifact.write(data='789', manifest=Manifest(), version_name='v2')
+    assert versioned_artifact.read('v2').artifact.data == '789'
+    assert versioned_artifact.latest_version_name() == SimpleVersionName(2)
+
+
+def test_write_failure_releases_version_name(versioned_artifact):
+    # The data cannot be serialized
+    with pytest.raises(TypeError):
+        versioned_artifact.write(data=123, manifest=Manifest(), version_name='v1')
+    with pytest.raises(TypeError):
+        versioned_artifact.write(data=123, manifest=Manifest())
+
+    # The version names can be used again
+    versioned_artifact.write(data='123', manifest=Manifest(), version_name='v1')
+    versioned_artifact.write(data='456', manifest=Manifest())
+    assert versioned_artifact.version_names() == [SimpleVersionName(1), SimpleVersionName(2)]
+
+
+def test_collect_garbage_deletes_abandoned_versions(versioned_artifact):
+    datastore = versioned_artifact.datastore
+    versions_location = versioned_artifact.versions_location
+    versioned_artifact.write(data='123', manifest=Manifest())
+    # A write interrupted after staging
+    staged = versioned_artifact.stage(data='456', manifest=Manifest())
+    assert datastore.exists(staged.staging_location)
+
+    versioned_artifact.collect_garbage()
+    assert not datastore.exists(staged.staging_location)
+    assert datastore.list(f'{versions_location}/_pond/reserved') == ['v1']
+    versioned_artifact.write(data='456', manifest=Manifest(), version_name='v2')
+
+
+def test_write_dedup_skip(versioned_artifact):
+    v1 = versioned_artifact.write(data='123', manifest=Manifest())
+    version = versioned_artifact.write(data='123', manifest=Manifest(), dedup=DedupMode.SKIP)
+
+    assert version.version_name == v1.version_name
+    assert versioned_artifact.version_names() == [SimpleVersionName(1)]
+    # The reserved version name has been released
+    v2 = versioned_artifact.write(data='456', manifest=Manifest(), dedup=DedupMode.SKIP)
+    assert v2.version_name == SimpleVersionName(2)
+
+
+def test_write_dedup_link(versioned_artifact):
+    datastore = versioned_artifact.datastore
+    versioned_artifact.write(data='123', manifest=Manifest())
+    v2 = versioned_artifact.write(data='123', manifest=Manifest(), dedup=DedupMode.LINK)
+
+    assert v2.version_name == SimpleVersionName(2)
+    assert versioned_artifact.read('v2').artifact.data == '123'
+    paths = [
+        datastore.base_path / version_data_location(
+            version_location(versioned_artifact.versions_location, name),
+            f'test_artifact_{name}.mock')
+        for name in ['v1', 'v2']
+    ]
+    assert os.path.samefile(*paths)
+
+    # The data is written if it differs from the latest version
+    v3 = versioned_artifact.write(data='456', manifest=Manifest(), dedup=DedupMode.LINK)
+    assert versioned_artifact.read(v3.version_name).artifact.data == '456'
+
+
+@pytest.mark.parametrize('first_chunked', [True, False])
+def test_write_dedup_link_chunked_and_plain(versioned_artifact, first_chunked):
+    data = 'pond ' * 1000
+    versioned_artifact.write(data=data, manifest=Manifest(), chunked=first_chunked)
+    v2 = versioned_artifact.write(data=data, manifest=Manifest(), dedup=DedupMode.LINK,
+                                  chunked=not first_chunked)
+
+    # Same content hash, but the data files differ: the data is written
+    version = versioned_artifact.read(v2.version_name)
+    assert version.artifact.data == data
+    assert (version.manifest.collect_section('version').get('storage') == 'chunks') \
+        == (not first_chunked)
+    assert versioned_artifact.read('v1').artifact.data == data
+
+
+def test_write_chunked_then_collect_garbage(versioned_artifact):
+    data = 'pond ' * 100_000
+    versioned_artifact.write(data=data, manifest=Manifest(), chunked=True)
+    versioned_artifact.write(data=data + 'more', manifest=Manifest(), chunked=True)
+
+    version = versioned_artifact.read('v2')
+    assert version.artifact.data == data + 'more'
+    version_metadata = version.manifest.collect_section('version')
+    assert version_metadata['storage'] == 'chunks'
+    assert version_metadata['filename'] == 'test_artifact_v2.mock.chunklist'
+    assert version_metadata['content_hash'] == \
+        'sha256:' + hashlib.sha256((data + 'more').encode()).hexdigest()
+
+    # The two versions share all their chunks but the last one
+    assert versioned_artifact.collect_garbage() == 0
+    versioned_artifact.delete_version('v2')
+    assert versioned_artifact.collect_garbage() == 1
+    assert versioned_artifact.read('v1').artifact.data == data
+
+
+def test_json_manifest_format(tmp_path):
+    datastore = FileDatastore(id='foostore', base_path=tmp_path)
+    versioned_artifact = VersionedArtifact(
+        artifact_name='test_artifact',
+        location='test_location',
+        datastore=datastore,
+        artifact_class=MockArtifact,
+        version_name_class=SimpleVersionName,
+        manifest_format=ManifestFormat.JSON,
+    )
+    versioned_artifact.write(data='123', manifest=Manifest())
+    v1_location = version_location(versioned_artifact.versions_location, 'v1')
+    assert datastore.exists(version_manifest_location(v1_location, ManifestFormat.JSON))
+    assert not datastore.exists(version_manifest_location(v1_location))
+
+    # The format is recorded with the versioned artifact, and used by all writers and readers
+    yaml_versioned_artifact = VersionedArtifact(
+        artifact_name='test_artifact',
+        location='test_location',
+        datastore=datastore,
+        artifact_class=MockArtifact,
+        version_name_class=SimpleVersionName,
+    )
+    yaml_versioned_artifact.write(data='456', manifest=Manifest())
+    loaded = VersionedArtifact.from_datastore('test_artifact', 'test_location', datastore)
+    assert loaded.manifest_format == ManifestFormat.JSON
+    assert loaded.read('v1').artifact.data == '123'
+    assert loaded.read('v2').artifact.data == '456'
+    assert loaded.rebuild_index() == [SimpleVersionName(1), SimpleVersionName(2)]
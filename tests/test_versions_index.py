@@ -0,0 +1,111 @@
+import pytest
+
+from pond.storage.file_datastore import FileDatastore
+from pond.version_name import SimpleVersionName
+from pond.versions_index import VersionsIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    datastore = FileDatastore(id='foostore', base_path=tmp_path)
+    index = VersionsIndex(
+        versions_location='test_location/foo',
+        datastore=datastore,
+        version_name_class=SimpleVersionName,
+        compaction_bytes=16,
+    )
+    return index
+
+
+def test_not_created(index):
+    assert not index.exists()
+    assert index.read() is None
+    assert index.latest() is None
+
+
+def test_add_and_remove(index):
+    index.rewrite([])
+    assert index.exists()
+    assert index.read() == []
+
+    index.add(SimpleVersionName(2))
+    index.add(SimpleVersionName(1))
+    assert index.read() == [SimpleVersionName(1), SimpleVersionName(2)]
+    assert index.latest() == SimpleVersionName(2)
+
+    index.remove(SimpleVersionName(2))
+    assert index.read() == [SimpleVersionName(1)]
+    assert index.latest() == SimpleVersionName(1)
+
+    index.remove(SimpleVersionName(1))
+    assert index.read() == []
+    assert index.latest() is None
+
+
+def test_add_is_an_append(index):
+    datastore = index.datastore
+    index.rewrite([SimpleVersionName(1)])
+
+    index.add(SimpleVersionName(2))
+    assert datastore.read(index.log_location) == b'+v2\n'
+    # The snapshot is only rewritten at compaction
+    assert datastore.read_json(index.snapshot_location) == {'versions': ['v1'], 'log_offset': 0}
+
+
+def test_compaction(index):
+    datastore = index.datastore
+    index.rewrite([])
+
+    # Every record is 4 bytes long, compaction happens after every 16 bytes
+    for i in range(1, 6):
+        index.add(SimpleVersionName(i))
+
+    snapshot = datastore.read_json(index.snapshot_location)
+    assert snapshot == {'versions': ['v1', 'v2', 'v3', 'v4'], 'log_offset': 16}
+    # The snapshot and the log tail are merged when reading
+    assert index.read() == [SimpleVersionName(i) for i in range(1, 6)]
+
+
+def test_incomplete_record_is_ignored(index):
+    index.rewrite([])
+    index.add(SimpleVersionName(1))
+    index.datastore.append(index.log_location, b'+v')
+    assert index.read() == [SimpleVersionName(1)]
+
+
+def test_concurrent_adds_do_not_move_latest_backwards(index):
+    datastore = index.datastore
+    index.rewrite([SimpleVersionName(1), SimpleVersionName(2)])
+    other_index = VersionsIndex(index.versions_location, datastore, SimpleVersionName)
+
+    # Another writer adds v4 after v3 has been appended, and before the pointer is written
+    write_string = datastore.write_string
+    interleaved = []
+
+    def interleaving_write_string(path, value):
+        if path == index.latest_location and value == 'v3' and not interleaved:
+            interleaved.append(True)
+            other_index.add(SimpleVersionName(4))
+        write_string(path, value)
+
+    datastore.write_string = interleaving_write_string
+    index.add(SimpleVersionName(3))
+
+    assert interleaved
+    assert index.read() == [SimpleVersionName(i) for i in range(1, 5)]
+    assert index.latest() == SimpleVersionName(4)
+
+
+def test_add_does_not_read_the_index(index, monkeypatch):
+    index.compaction_bytes = 1024
+    index.rewrite([SimpleVersionName(i) for i in range(1, 100)])
+
+    def read_snapshot_and_log():
+        raise AssertionError('The index is read')
+
+    monkeypatch.setattr(index, '_read_snapshot_and_log', read_snapshot_and_log)
+    index.add(SimpleVersionName(100))
+    index.add(SimpleVersionName(50))
+    assert index.latest() == SimpleVersionName(100)
+    monkeypatch.undo()
+    assert index.read() == [SimpleVersionName(i) for i in range(1, 101)]
@@ -1,6 +1,8 @@
 from datetime import date
 
-from pond.yaml import yaml_dump, yaml_load
+import yaml
+
+from pond.yaml import NoDatesSafeLoader, yaml_dump, yaml_load
 
 
 def test_load_yaml():
@@ -25,3 +27,12 @@ value: 123
 version: 2021-02-03
     """.strip()
     assert dumped.strip() == expected.strip()
+
+
+def test_load_same_as_pure_python_loader():
+    source = """
+        date_time: 2021-02-03 04:05:06.000007
+        version: 2021-02-03
+        values: [1, 2.5, true, null, 'é']
+    """
+    assert yaml_load(source) == yaml.load(source, Loader=NoDatesSafeLoader)